@@ -1,15 +1,27 @@
 # app.py
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
+import asyncio
+import time
+import zlib
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel, ValidationError
 import mlflow.pyfunc
+from mlflow.exceptions import MlflowException
+from mlflow.tracking import MlflowClient
 import numpy as np
 import os
 
+from src.serving import MetricsRegistry, MicroBatcher, ModelCache, PoolSaturated, ScoringPool, parse_alias_uri
+from src.serving import ParquetLogWriter, PredictionLog, SQLiteLogWriter
+from src.serving import codecs, metrics
+
 class MockPyFuncWrapper: # mock the model here
-    def __init__(self):
-        # Generate random coefficients and bias every time model is loaded
-        self.coefficients = np.random.rand(4)
-        self.bias = np.random.randn()
+    def __init__(self, seed: int | None = None):
+        # Random coefficients and bias; a seed keeps them equal across scoring processes
+        rng = np.random.default_rng(seed)
+        self.coefficients = rng.random(4)
+        self.bias = rng.standard_normal()
 
     def predict(self, model_input):
         return np.dot(model_input, self.coefficients) + self.bias
@@ -17,20 +29,331 @@ class MockPyFuncWrapper: # mock the model here
 # Load model from MLflow
 mlflow.set_tracking_uri("http://mlflow:5050")
 MLFLOW_MODEL_URI = os.getenv("MLFLOW_MODEL_URI", "models:/station1@champion")
+# "mock" serves MockPyFuncWrapper, "mlflow" loads the registered pyfunc model
+MODEL_SOURCE = os.getenv("MODEL_SOURCE", "mock")
+MODEL_POLL_INTERVAL = float(os.getenv("MODEL_POLL_INTERVAL", "30"))
+MODEL_CACHE_MAX_MODELS = int(os.getenv("MODEL_CACHE_MAX_MODELS", "64"))
+MODEL_CACHE_MAX_BYTES = int(os.getenv("MODEL_CACHE_MAX_BYTES", "0")) or None
+# Opt-in micro-batching of concurrent requests for the same model
+BATCHING_ENABLED = os.getenv("BATCHING_ENABLED", "false").lower() == "true"
+BATCH_MAX_WAIT_MS = float(os.getenv("BATCH_MAX_WAIT_MS", "2"))
+BATCH_MAX_ROWS = int(os.getenv("BATCH_MAX_ROWS", "1024"))
+# Dedicated scoring executor: "thread" or "process"
+SCORING_EXECUTOR = os.getenv("SCORING_EXECUTOR", "thread")
+SCORING_WORKERS = int(os.getenv("SCORING_WORKERS", "4"))
+# Requests admitted beyond this are rejected with 503
+SCORING_MAX_PENDING = int(os.getenv("SCORING_MAX_PENDING", "256"))
+# Prediction traffic log: "none", "parquet" or "sqlite"
+PREDICTION_LOG = os.getenv("PREDICTION_LOG", "none")
+PREDICTION_LOG_PATH = os.getenv("PREDICTION_LOG_PATH", "/storage/predictions")
+PREDICTION_LOG_CAPACITY = int(os.getenv("PREDICTION_LOG_CAPACITY", "100000"))
+PREDICTION_LOG_FLUSH_ROWS = int(os.getenv("PREDICTION_LOG_FLUSH_ROWS", "10000"))
+PREDICTION_LOG_FLUSH_SECONDS = float(os.getenv("PREDICTION_LOG_FLUSH_SECONDS", "10"))
+FEATURE_COLUMNS = os.getenv(
+    "FEATURE_COLUMNS", "temperature,humidity,pressure,wind_speed"
+).split(",")
+
+# Station served when a request does not name one
+DEFAULT_STATION, MODEL_ALIAS = parse_alias_uri(MLFLOW_MODEL_URI)
+
+
+def load_model(model_name: str, version: str):
+    """Load a specific model version, so a moving alias cannot race the load."""
+    if MODEL_SOURCE == "mock":
+        return MockPyFuncWrapper(seed=zlib.crc32(f"{model_name}/{version}".encode()))
+    return mlflow.pyfunc.load_model(f"models:/{model_name}/{version}")
+
+
+def feature_width(model) -> int | None:
+    """Number of features ``model`` takes, or None if it does not tell."""
+    if isinstance(model, mlflow.pyfunc.PyFuncModel):
+        schema = model.metadata.get_input_schema()
+        if schema is not None:
+            return len(schema.inputs)
+        try:
+            # The station models keep their weights on the python model
+            model = model.unwrap_python_model()
+        except MlflowException:
+            return None
+    coefficients = getattr(model, "coefficients", None)
+    return len(coefficients) if coefficients is not None else None
+
+
+def resolve_version(model_name: str, alias: str) -> str:
+    """Return the model version an alias currently points to."""
+    if MODEL_SOURCE == "mock":
+        return "mock"
+    return MlflowClient().get_model_version_by_alias(model_name, alias).version
+
+
+model_cache = ModelCache(
+    MODEL_ALIAS,
+    load_fn=load_model,
+    resolve_version_fn=resolve_version,
+    max_models=MODEL_CACHE_MAX_MODELS,
+    max_bytes=MODEL_CACHE_MAX_BYTES,
+    poll_interval=MODEL_POLL_INTERVAL,
+)
+scoring_pool = ScoringPool(
+    SCORING_EXECUTOR,
+    workers=SCORING_WORKERS,
+    max_pending=SCORING_MAX_PENDING,
+    load_fn=load_model,
+)
+batcher = (
+    MicroBatcher(
+        BATCH_MAX_WAIT_MS,
+        BATCH_MAX_ROWS,
+        score_fn=lambda key, model, X: scoring_pool.submit(key[0], key[1], model, X),
+    )
+    if BATCHING_ENABLED
+    else None
+)
+
+
+def create_prediction_log() -> PredictionLog | None:
+    if PREDICTION_LOG == "none":
+        return None
+    if PREDICTION_LOG == "parquet":
+        writer = ParquetLogWriter(PREDICTION_LOG_PATH)
+    elif PREDICTION_LOG == "sqlite":
+        writer = SQLiteLogWriter(PREDICTION_LOG_PATH)
+    else:
+        raise ValueError(f"Unknown PREDICTION_LOG backend '{PREDICTION_LOG}'")
+    return PredictionLog(
+        writer,
+        FEATURE_COLUMNS,
+        capacity=PREDICTION_LOG_CAPACITY,
+        flush_rows=PREDICTION_LOG_FLUSH_ROWS,
+        flush_seconds=PREDICTION_LOG_FLUSH_SECONDS,
+    )
+
+
+prediction_log = create_prediction_log()
+
+# Prometheus metrics for GET /metrics. Request-path updates go to per-thread
+# shards without locks; state kept elsewhere is read at scrape time
+metrics_registry = MetricsRegistry()
+request_count = metrics_registry.counter(
+    "forecast_requests_total", "Predict requests by response status and body format", ["status", "format"]
+)
+request_latency = metrics_registry.histogram(
+    "forecast_request_duration_seconds", "Predict request latency", metrics.LATENCY_BUCKETS
+).labels()
+phase_latency = metrics_registry.histogram(
+    "forecast_request_phase_seconds",
+    "Predict request latency by phase",
+    metrics.LATENCY_BUCKETS,
+    ["phase"],
+)
+PARSE, MODEL_LOOKUP, PREDICT, SERIALIZE = (
+    phase_latency.labels(phase) for phase in ("parse", "model_lookup", "predict", "serialize")
+)
+request_rows = metrics_registry.histogram(
+    "forecast_request_rows", "Feature rows per predict request", metrics.ROW_BUCKETS
+).labels()
+in_flight = metrics_registry.gauge(
+    "forecast_requests_in_flight", "Predict requests being served"
+).labels()
+# Unknown content types share one label value, so they cannot inflate the series
+FORMAT_LABELS = {codecs.JSON: "json", codecs.ARROW_STREAM: "arrow", codecs.RAW: "raw"}
+
+
+def collect_service_state():
+    """Model versions per station and cache, pool and log counters, read at scrape time."""
+    cache = model_cache.describe()
+    yield (
+        "forecast_model_version_info",
+        "Model version served per cached station",
+        "gauge",
+        [({"station_id": name, "version": m["version"]}, 1) for name, m in cache["models"].items()],
+    )
+    for key in ("hits", "misses", "evictions", "loads", "load_failures", "reloads", "reload_failures"):
+        yield (
+            f"forecast_model_cache_{key}_total",
+            f"Model cache {key.replace('_', ' ')}",
+            "counter",
+            [({}, cache[key])],
+        )
+    yield ("forecast_model_cache_bytes", "Estimated size of the cached models", "gauge", [({}, cache["nbytes"])])
+    scoring = scoring_pool.describe()
+    yield ("forecast_scoring_pending", "Admitted requests queued or scoring", "gauge", [({}, scoring["pending"])])
+    yield (
+        "forecast_scoring_rejected_total",
+        "Requests rejected with 503 by the saturated scoring pool",
+        "counter",
+        [({}, scoring["rejected"])],
+    )
+    if prediction_log is not None:
+        log = prediction_log.describe()
+        yield (
+            "forecast_prediction_log_dropped_rows_total",
+            "Prediction rows dropped by the full log buffer",
+            "counter",
+            [({}, log["dropped_rows"])],
+        )
+
+
+metrics_registry.collector(collect_service_state)
 
 # Define input format
 class ForecastRequest(BaseModel):
     features: list[list[float]]  # 2D list: batch of feature vectors
+    station_id: str | None = None  # registered model name, defaults to MLFLOW_MODEL_URI
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    model_cache.start()
+    scoring_pool.start()
+    if batcher is not None:
+        batcher.start()
+    if prediction_log is not None:
+        prediction_log.start()
+    yield
+    # Flush pending batches into the pool, then drain in-flight scoring work
+    if batcher is not None:
+        batcher.stop()
+    scoring_pool.shutdown()
+    if prediction_log is not None:
+        prediction_log.stop()
+    model_cache.stop()
+
+
+app = FastAPI(lifespan=lifespan)
 
-app = FastAPI()
+@app.post(
+    "/predict",
+    openapi_extra={
+        "requestBody": {
+            "content": {
+                codecs.JSON: {"schema": ForecastRequest.model_json_schema()},
+                codecs.ARROW_STREAM: {},
+                codecs.RAW: {},
+            },
+        },
+    },
+)
+async def predict(request: Request, station_id: str | None = None):
+    """Score a batch of feature rows.
 
-@app.post("/predict")
-def predict(request: ForecastRequest):
-    model = MockPyFuncWrapper() # tba: load real mlflow model mlflow.pyfonc.load_model(MLFLOW_MODEL_URI)
+    Accepts JSON (``ForecastRequest``), an Arrow IPC stream or a raw
+    little-endian float32/float64 matrix described by ``X-Shape`` and
+    ``X-Dtype`` headers. Binary requests are answered in their own format and
+    name the station in the ``station_id`` query parameter.
+    """
+    start = time.perf_counter()
+    content_type = codecs.media_type(request.headers.get("content-type"))
+    status = 500
+    in_flight.inc()
     try:
-        X = np.array(request.features)
-        preds = model.predict(X)
-        # todo: also import traffic saving logic here.
-        return {"predictions": preds.tolist()}
+        response = await _predict(request, content_type, station_id, start)
+        status = 200
+        return response
+    except HTTPException as e:
+        status = e.status_code
+        raise
+    finally:
+        in_flight.dec()
+        request_latency.observe(time.perf_counter() - start)
+        request_count.labels(status, FORMAT_LABELS.get(content_type, "other")).inc()
+
+
+async def _predict(
+    request: Request, content_type: str, station_id: str | None, start: float
+) -> Response:
+    """Serve one predict request, timing its parse, model lookup, predict and serialize phases."""
+    body = await request.body()
+    try:
+        if content_type == codecs.JSON:
+            forecast_request = ForecastRequest.model_validate_json(body)
+            station_id = forecast_request.station_id or station_id
+            X = np.array(forecast_request.features)
+        else:
+            X = codecs.decode_features(content_type, body, request.headers)
+        codecs.check_features(X)
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=e.errors(include_url=False))
+    except codecs.UnsupportedFormat as e:
+        raise HTTPException(status_code=415, detail=str(e))
+    except codecs.InvalidFeatures as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Could not decode request: {e}")
+    parsed = time.perf_counter()
+    PARSE.observe(parsed - start)
+    request_rows.observe(len(X))
+
+    station_id = station_id or DEFAULT_STATION
+    try:
+        scoring_pool.acquire()
+    except PoolSaturated as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    try:
+        # Cache misses block on a model load, keep them off the event loop
+        cached = model_cache.lookup(station_id)
+        if cached is None:
+            cached = await asyncio.to_thread(model_cache.get, station_id)
+        model, version = cached
+        looked_up = time.perf_counter()
+        MODEL_LOOKUP.observe(looked_up - parsed)
+        width = feature_width(model)
+        if width is not None and X.shape[1] != width:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Model {station_id} version {version} takes {width} features, got {X.shape[1]}",
+            )
+        if batcher is not None:
+            future = batcher.submit((station_id, version, X.shape[-1]), model, X)
+        else:
+            future = scoring_pool.submit(station_id, version, model, X)
+        preds = await asyncio.wrap_future(future)
+        predicted = time.perf_counter()
+        PREDICT.observe(predicted - looked_up)
+        if prediction_log is not None:
+            latency_ms = (predicted - start) * 1000.0
+            prediction_log.append(station_id, version, X, preds, latency_ms)
+        serialize_start = time.perf_counter()
+        if content_type != codecs.JSON:
+            content, headers = codecs.encode_predictions(content_type, preds, X.dtype)
+            headers.update({"X-Station-Id": station_id, "X-Model-Version": str(version)})
+            response = Response(content, media_type=content_type, headers=headers)
+        else:
+            # Rendered here rather than by FastAPI, so that it is timed
+            response = JSONResponse(
+                {
+                    "predictions": preds.tolist(),
+                    "station_id": station_id,
+                    "model_version": version,
+                }
+            )
+        SERIALIZE.observe(time.perf_counter() - serialize_start)
+        return response
+    except HTTPException:
+        raise
+    except MlflowException as e:
+        if e.error_code == "RESOURCE_DOES_NOT_EXIST":
+            raise HTTPException(status_code=404, detail=str(e))
+        raise HTTPException(status_code=500, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        scoring_pool.release()
+
+
+@app.get("/model")
+def model_info():
+    """Cached station models, hit/miss/eviction counters and reload latency."""
+    info = model_cache.describe()
+    info["scoring"] = scoring_pool.describe()
+    if batcher is not None:
+        info["batching"] = batcher.describe()
+    if prediction_log is not None:
+        info["prediction_log"] = prediction_log.describe()
+    return info
+
+
+@app.get("/metrics")
+def metrics_endpoint():
+    """Prometheus text format: request latency by phase, rows per request, in-flight requests and model versions."""
+    return Response(metrics_registry.render(), media_type=metrics.CONTENT_TYPE)
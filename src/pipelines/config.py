@@ -1,16 +1,133 @@
+from datetime import datetime
+from typing import Literal
+
 from pydantic import BaseModel, Field
 
 
-class TrainingPipelineConfig(BaseModel):
+class ProfilingConfig(BaseModel):
+    # Opt-in profiling of the steps: wall/CPU time, peak RSS, phase and
+    # per-station timings and external calls, logged as MLflow metrics and a
+    # JSON timeline in profile_dir. profile_step is also profiled with
+    # cProfile, or by sampling stacks into a flamegraph
+    profiling: bool = Field(default=False)
+    profile_dir: str = Field(default="../storage/profiles/")
+    profile_step: str | None = Field(default=None)
+    profile_mode: Literal["sample", "cprofile"] = Field(default="sample")
+
+
+class TrainingPipelineConfig(ProfilingConfig):
     # Model hyperparameters
     dummy: int = Field(default=3000)
+    # Linear station models map these features to the target column
+    feature_columns: list[str] = Field(
+        default=["temperature", "humidity", "pressure", "wind_speed"]
+    )
+    target_column: str = Field(default="target")
+    # Base seed, every station derives its own seed from it
+    seed: int = Field(default=42)
+    # Per-station training pool
+    training_workers: int = Field(default=1)
+    training_executor: Literal["thread", "process"] = Field(default="thread")
+    # Share of every station's rows held out for champion/challenger evaluation
+    holdout_fraction: float = Field(default=0.2)
+    # A challenger must meet these holdout thresholds (mae/rmse upper, r2 lower
+    # bounds) and beat the champion's promotion_metric by promotion_min_improvement
+    promotion_metric: Literal["mae", "rmse", "r2"] = Field(default="rmse")
+    promotion_min_improvement: float = Field(default=0.0)
+    promotion_thresholds: dict[Literal["mae", "rmse", "r2"], float] = Field(
+        default={"mae": 2.0, "rmse": 3.0, "r2": 0.8}
+    )
+    # "mock" generates synthetic data, "store" reads the station store written
+    # by the data loading pipeline
+    data_source: Literal["mock", "store"] = Field(default="mock")
+    storage_dir: str = Field(default="../storage/station_data/")
+    # Only read rows loaded after this store version (None: full history,
+    # negative: relative to the latest version, e.g. -1 for the last load)
+    since_version: int | None = Field(default=None)
+    # Training data is handed to train_models as a memory-mapped Arrow file here.
+    # Steps must share this directory: fine on the local stack, on local_docker
+    # it has to be a volume mounted into every step container
+    training_data_dir: str = Field(default="../storage/training_data/")
+    # Training data files not used for this many days are deleted
+    training_data_retention_days: float = Field(default=7)
+    # Concurrent model registration and alias updates
+    registry_workers: int = Field(default=8)
+    registry_retries: int = Field(default=3)
+    registry_retry_backoff: float = Field(default=0.5)
+    # Opt-in cache of step outputs keyed by the relevant config, the step's code
+    # and fingerprints of its input data; only stations whose rows changed are retrained
+    step_cache: bool = Field(default=False)
+    cache_dir: str = Field(default="../storage/step_cache/")
 
 
 class DataLoadingPipelineConfig(BaseModel):
     dummy: int = Field(default=3000)
     data_source_id: str = Field(default=None)
+    # CSV/Parquet source files, the id of a source is its file name without extension
+    source_dir: str = Field(default="../storage/sources/")
+    # Station/date partitioned Parquet store the sources are appended to
+    storage_dir: str = Field(default="../storage/station_data/")
+    # Rows held in memory at once while streaming a source
+    chunk_size: int = Field(default=100_000)
+    # Sources fetched concurrently
+    fetch_workers: int = Field(default=4)
+    # A source is not fetched again within this many seconds of its last successful fetch
+    cooldown_seconds: float = Field(default=3600.0)
+    # JSON file with the last fetch time and high-water mark of every source
+    state_path: str = Field(default="../storage/source_state.json")
+    # Ids of local stub sources with artificial latency, for testing the loader
+    stub_sources: list[str] = Field(default=[])
+    stub_rows: int = Field(default=1000)
+    stub_latency_seconds: float = Field(default=0.5)
+    # Backfill mode: re-ingest [backfill_start, backfill_end) ignoring cooldowns
+    # and high-water marks; readers keep the backfilled copy of duplicate rows
+    backfill_start: datetime | None = Field(default=None)
+    backfill_end: datetime | None = Field(default=None)
+    # Opt-in cache: a source file is not read again while its signature (size
+    # and mtime, or a sha256 of its contents) is the one it was last loaded with
+    step_cache: bool = Field(default=False)
+    cache_dir: str = Field(default="../storage/step_cache/")
+    cache_checksum: Literal["stat", "sha256"] = Field(default="stat")
 
 
-class MonitoringConfig(BaseModel):
+class MonitoringConfig(ProfilingConfig):
     log_dir: str | None = Field(default="../storage/reports/")
     reference_data_dir: str | None = Field(default=None)
+    # Parquet prediction log of the forecasting service, used as current data
+    current_data_dir: str | None = Field(default=None)
+    # Date-partitioned Parquet snapshots of the current data read by each run
+    snapshot_dir: str | None = Field(default="../storage/monitoring_snapshots/")
+    # Days of snapshots, drift metrics (log_dir/drift_metrics) and HTML reports
+    # to keep; closed days of the Parquet tables are compacted to one file
+    snapshot_retention_days: int = Field(default=30)
+    metrics_retention_days: int = Field(default=365)
+    report_retention_days: int = Field(default=30)
+    # Hourly histogram sketches of the current data; closed hours are sketched
+    # once and a window is the merge of its hours
+    sketch_dir: str = Field(default="../storage/monitoring_sketches/")
+    # Drift windows by name, in hours counted back from the current hour
+    drift_windows: dict[str, int] = Field(default={"24h": 24, "7d": 168})
+    # An hour is closed, and its sketch kept, this long after it ends
+    sketch_grace_minutes: float = Field(default=5.0)
+    # Registered model whose reference profile, stored at promotion, is the
+    # reference; without it a profile of sample data in reference_data_dir is used
+    reference_model: str | None = Field(default=None)
+    reference_alias: str = Field(default="champion")
+    # Current data is streamed through the drift engine in batches of this many rows
+    chunk_size: int = Field(default=500_000)
+    # A column drifts when drift_method reaches drift_threshold, the dataset
+    # when at least drift_share of its columns do
+    drift_method: Literal["psi", "ks", "wasserstein"] = Field(default="psi")
+    drift_threshold: float = Field(default=0.2)
+    drift_share: float = Field(default=0.5)
+    histogram_bins: int = Field(default=100)
+    # Drift per station_id, written as a Parquet table; only stations whose
+    # drifted share reaches drift_share get an Evidently report
+    station_drift: bool = Field(default=True)
+    # Compare each station against the profile stored with its champion
+    # (models are registered under the station id) instead of the common reference
+    station_profiles: bool = Field(default=False)
+    profile_workers: int = Field(default=8)
+    # Evidently HTML report: "off", on a uniform "sampled" subset, or on "full" data
+    evidently_mode: Literal["off", "sampled", "full"] = Field(default="sampled")
+    evidently_sample_rows: int = Field(default=50_000)
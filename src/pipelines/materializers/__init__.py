@@ -0,0 +1,6 @@
+from .station_materializers import StationFramesMaterializer, StationModelsMaterializer
+
+__all__ = [
+    "StationFramesMaterializer",
+    "StationModelsMaterializer",
+]
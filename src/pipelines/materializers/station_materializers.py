@@ -0,0 +1,85 @@
+import json
+import os
+from typing import Any, Dict, Type
+
+import numpy as np
+import pandas as pd
+from zenml.enums import ArtifactType
+from zenml.materializers.base_materializer import BaseMaterializer
+from zenml.metadata.metadata_types import MetadataType
+
+from utils.station_artifacts import StationFrames, StationModels
+
+INDEX_FILE = "index.json"
+WEIGHTS_FILE = "weights.npy"
+
+
+class StationFramesMaterializer(BaseMaterializer):
+    """Store per-station frames as one zstd-compressed Arrow IPC file per station.
+
+    Loading only reads the index; a station's file is read the first time
+    its frame is accessed.
+    """
+
+    ASSOCIATED_TYPES = (StationFrames,)
+    ASSOCIATED_ARTIFACT_TYPE = ArtifactType.DATA
+
+    def load(self, data_type: Type[Any]) -> StationFrames:
+        with self.artifact_store.open(os.path.join(self.uri, INDEX_FILE), "r") as f:
+            files = json.load(f)["files"]
+
+        def _load(station: str) -> pd.DataFrame:
+            import pyarrow as pa
+
+            with self.artifact_store.open(os.path.join(self.uri, files[station]), "rb") as f:
+                return pa.ipc.open_file(pa.py_buffer(f.read())).read_pandas()
+
+        return StationFrames(stations=files, load_fn=_load)
+
+    def save(self, data: StationFrames) -> None:
+        import pyarrow as pa
+
+        options = pa.ipc.IpcWriteOptions(compression="zstd")
+        files = {}
+        for i, (station, frame) in enumerate(data.items()):
+            # Station ids are not necessarily valid file names
+            files[station] = f"station-{i}.arrow"
+            table = pa.Table.from_pandas(frame.reset_index(drop=True), preserve_index=False)
+            sink = pa.BufferOutputStream()
+            with pa.ipc.new_file(sink, table.schema, options=options) as writer:
+                writer.write_table(table)
+            with self.artifact_store.open(os.path.join(self.uri, files[station]), "wb") as f:
+                f.write(sink.getvalue().to_pybytes())
+        with self.artifact_store.open(os.path.join(self.uri, INDEX_FILE), "w") as f:
+            json.dump({"files": files}, f)
+
+    def extract_metadata(self, data: StationFrames) -> Dict[str, MetadataType]:
+        return {"stations": len(data), "rows": sum(len(frame) for frame in data.values())}
+
+
+class StationModelsMaterializer(BaseMaterializer):
+    """Store linear station models as one packed ``[n_stations, n_features + 1]`` array.
+
+    Coefficients and biases go to a single ``.npy`` file, station ids and
+    model parameters to a small JSON index; nothing is pickled.
+    """
+
+    ASSOCIATED_TYPES = (StationModels,)
+    ASSOCIATED_ARTIFACT_TYPE = ArtifactType.MODEL
+
+    def load(self, data_type: Type[Any]) -> StationModels:
+        with self.artifact_store.open(os.path.join(self.uri, INDEX_FILE), "r") as f:
+            info = json.load(f)["models"]
+        with self.artifact_store.open(os.path.join(self.uri, WEIGHTS_FILE), "rb") as f:
+            weights = np.load(f, allow_pickle=False)
+        return StationModels.unpack(weights, info)
+
+    def save(self, data: StationModels) -> None:
+        weights, info = data.pack()
+        with self.artifact_store.open(os.path.join(self.uri, WEIGHTS_FILE), "wb") as f:
+            np.save(f, weights, allow_pickle=False)
+        with self.artifact_store.open(os.path.join(self.uri, INDEX_FILE), "w") as f:
+            json.dump({"models": info}, f)
+
+    def extract_metadata(self, data: StationModels) -> Dict[str, MetadataType]:
+        return {"stations": len(data)}
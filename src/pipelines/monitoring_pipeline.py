@@ -49,6 +49,12 @@ def run(config: dict, env: str):
         reference_data_dir=paths_config.get(
             "reference_data_dir", "../src/reference_data",
         ),
+        current_data_dir=paths_config.get("current_data_dir"),
+        sketch_dir=paths_config.get("sketch_dir", "../storage/monitoring_sketches/"),
+        snapshot_dir=paths_config.get("snapshot_dir", "../storage/monitoring_snapshots/"),
+        reference_model=config.get("reference_model"),
+        **config.get("drift", {}),
+        **config.get("profiling", {}),
     )
 
     # Run the pipeline
@@ -1,6 +1,10 @@
+import argparse
 import importlib
 import os
+import subprocess
 import sys
+import time
+from collections import defaultdict
 from pathlib import Path
 
 import yaml
@@ -17,17 +21,90 @@ def load_config(pipeline_name: str) -> dict:
         return yaml.safe_load(f)
 
 
+def parse_importtime(line: str) -> tuple[int, int, str, int] | None:
+    """Parse a ``-X importtime`` line into (self us, cumulative us, module, depth)."""
+    fields = line[len("import time:"):].split("|")
+    if len(fields) != 3 or not fields[0].strip().isdigit():
+        return None
+    name = fields[2].rstrip("\n")
+    depth = (len(name) - len(name.lstrip(" ")) - 1) // 2
+    return int(fields[0]), int(fields[1]), name.strip(), depth
+
+
+def profile_startup(top: int) -> int:
+    """Run the launcher again under ``-X importtime`` and report its startup.
+
+    Reports the wall time from launch to the first step and the import time
+    per module and per top-level package up to that step. Other output of
+    the run is passed through. Returns the run's exit code.
+    """
+    from utils.startup import FIRST_STEP_MARKER, LAUNCH_TIME_ENV
+
+    env = {**os.environ, LAUNCH_TIME_ENV: repr(time.time())}
+    command = [sys.executable, "-X", "importtime", os.path.abspath(__file__), *sys.argv[1:]]
+    process = subprocess.Popen(command, env=env, stderr=subprocess.PIPE, text=True)
+    imports = []
+    first_step = None
+    for line in process.stderr:
+        if line.startswith("import time:"):
+            entry = parse_importtime(line)
+            if entry is not None and first_step is None:
+                imports.append(entry)
+        elif line.startswith(FIRST_STEP_MARKER):
+            name, seconds = line[len(FIRST_STEP_MARKER):].split()
+            first_step = (name, float(seconds))
+        else:
+            sys.stderr.write(line)
+    returncode = process.wait()
+
+    total = sum(cumulative for _, cumulative, _, depth in imports if depth == 0)
+    packages = defaultdict(int)
+    for self_us, _, name, _ in imports:
+        packages[name.split(".")[0]] += self_us
+    print("\nStartup profile")
+    if first_step is None:
+        print("  no step ran in this process; imports are counted to the end of the run")
+    else:
+        print(f"  launch to first step {first_step[0]}: {first_step[1]:.2f}s")
+    print(f"  imports: {total / 1e6:.2f}s in {len(imports)} modules")
+    print("  by top-level package (self time):")
+    for name, self_us in sorted(packages.items(), key=lambda item: -item[1])[:top]:
+        print(f"    {self_us / 1e6:8.3f}s  {name}")
+    print("  slowest modules (cumulative time):")
+    for _, cumulative, name, _ in sorted(imports, key=lambda entry: -entry[1])[:top]:
+        print(f"    {cumulative / 1e6:8.3f}s  {name}")
+    return returncode
+
+
 def main():
+    parser = argparse.ArgumentParser(
+        description="Run the pipeline named by $PIPELINE with configs/<PIPELINE>.yaml"
+    )
+    parser.add_argument(
+        "--profile-startup",
+        action="store_true",
+        help="report import time per module and the wall time to the first step",
+    )
+    parser.add_argument(
+        "--top", type=int, default=20, help="modules and packages listed by --profile-startup"
+    )
+    args = parser.parse_args()
+
     # Load .env variables
     load_dotenv()
 
+    # Ensure current dir is in the path
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    from utils.startup import LAUNCH_TIME_ENV
+
+    # The profiled run is this launcher again, with the launch time set
+    if args.profile_startup and not os.getenv(LAUNCH_TIME_ENV):
+        sys.exit(profile_startup(args.top))
+
     pipeline_name = os.getenv("PIPELINE", "default")
     env = os.getenv("ENV", "dev")
 
     try:
-        # Ensure current dir is in the path
-        sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
-
         # Load pipeline configuration
         config = load_config(pipeline_name)
         print(f"Loaded configuration for pipeline '{pipeline_name}'")
@@ -1,13 +1,26 @@
-from .data_source_loader import load_data_sources
-from .data_loader import load_training_data
-from .trainer import train_models
-from .validate_and_deploy import validate_and_deploy_models
-from .monitor import generate_evidently_report
-
-__all__ = [
-    "load_data_sources",
-    "load_training_data",
-    "train_models",
-    "validate_and_deploy_models",
-    "generate_evidently_report",
-]
+import importlib
+
+# Steps are imported on first access, so a pipeline only pays for the
+# modules (and their MLflow/Evidently imports) of the steps it uses
+_STEP_MODULES = {
+    "load_data_sources": "data_source_loader",
+    "load_training_data": "data_loader",
+    "train_models": "trainer",
+    "validate_and_deploy_models": "validate_and_deploy",
+    "generate_evidently_report": "monitor",
+}
+
+__all__ = list(_STEP_MODULES)
+
+
+def __getattr__(name: str):
+    module = _STEP_MODULES.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted([*globals(), *__all__])
@@ -1,13 +1,44 @@
 import logging
+import os
+import sys
 import time
 import pandas as pd
 import numpy as np
 from zenml import step
 from zenml.config import DockerSettings
 from config import TrainingPipelineConfig
+import utils.station_store
+import utils.training_store
+from utils.station_store import StoreManifest, read_store
+from utils.step_cache import StepCache, code_fingerprint, fingerprint
+from utils.training_store import TrainingDataHandle, prune_training_data, write_training_data
+from utils.profiling import active_profiler, profile_step
 
 logger = logging.getLogger(__name__)
 
+def load_store_data(config: TrainingPipelineConfig) -> dict[str, pd.DataFrame]:
+    """Read the station store rows loaded after ``config.since_version``, per station.
+
+    The store holds measurements only, so the target is the station's next
+    temperature reading (one step ahead forecast).
+    """
+    data = read_store(
+        config.storage_dir,
+        columns=list(dict.fromkeys(["timestamp", "station_id", "temperature", *config.feature_columns])),
+        since_version=config.since_version,
+    )
+    data = data.sort_values(["station_id", "timestamp"], kind="stable")
+    data[config.target_column] = data.groupby("station_id", sort=False)["temperature"].shift(-1)
+    data = data.dropna(subset=[*config.feature_columns, config.target_column])
+    logger.info(
+        f"Read {len(data)} rows of {data['station_id'].nunique()} stations "
+        f"since store version {config.since_version}"
+    )
+    return {
+        station: frame.reset_index(drop=True)
+        for station, frame in data.groupby("station_id", sort=True)
+    }
+
 
 @step(
     settings={
@@ -17,16 +48,82 @@ logger = logging.getLogger(__name__)
         ),
     },
 )
-def load_training_data(config: TrainingPipelineConfig) -> dict:
-    """Mock version: Generate synthetic training data.
+@profile_step
+def load_training_data(config: TrainingPipelineConfig) -> TrainingDataHandle:
+    """Load training data from the station store, or generate synthetic data.
+
+    The data is written once as a station-sorted Arrow IPC file under
+    ``config.training_data_dir``; only a handle to it is returned, so the
+    rows never go through the artifact store. With ``config.step_cache`` the
+    handle of an earlier run is reused while the config, this code and the
+    store manifest are unchanged and its file still exists. Files not used
+    for ``config.training_data_retention_days`` are deleted.
 
     Args:
-        config: Pipeline configuration
-        data_storage_db: Database connection (not used in mock)
+        config: Pipeline configuration; ``data_source`` selects the station
+            store or synthetic data
 
     Returns:
-        pd.DataFrame: Synthetic training data
+        TrainingDataHandle: Handle of the written training data
     """
+    profiler = active_profiler()
+    cache = StepCache(config.cache_dir, "load_training_data", enabled=config.step_cache)
+    key = fingerprint(
+        code_fingerprint(sys.modules[__name__], utils.station_store, utils.training_store),
+        config.model_dump(
+            include={
+                "data_source",
+                "storage_dir",
+                "since_version",
+                "feature_columns",
+                "target_column",
+                "training_data_dir",
+            }
+        ),
+        # Every load and backfill is a manifest entry, so it covers all store changes
+        StoreManifest(config.storage_dir).versions if config.data_source == "store" else None,
+    )
+    cached = cache.get(key, valid=lambda payload: os.path.exists(payload["path"]))
+    if cached is not None:
+        handle = TrainingDataHandle(**cached)
+        logger.info(f"Reusing cached training data {handle.path} ({handle.num_rows} rows)")
+        # Retention counts from the last use
+        os.utime(handle.path)
+        _prune(config, handle)
+        cache.log_summary()
+        return handle
+
+    start = time.perf_counter()
+    with profiler.phase(config.data_source):
+        frames = load_store_data(config) if config.data_source == "store" else generate_mock_data()
+    with profiler.phase("write"):
+        handle = write_training_data(
+            sorted(frames.items()),
+            config.training_data_dir,
+            columns=[*config.feature_columns, config.target_column],
+        )
+    logger.info(
+        f"Wrote {handle.num_rows} rows of {len(handle.stations)} stations to {handle.path}"
+    )
+    cache.put(key, handle.model_dump(), time.perf_counter() - start)
+    _prune(config, handle)
+    cache.log_summary()
+    return handle
+
+
+def _prune(config: TrainingPipelineConfig, handle: TrainingDataHandle) -> None:
+    removed = prune_training_data(
+        config.training_data_dir, config.training_data_retention_days, keep=[handle.path]
+    )
+    if removed:
+        logger.info(
+            f"Removed {removed} training data files unused for "
+            f"{config.training_data_retention_days} days"
+        )
+
+
+def generate_mock_data() -> dict[str, pd.DataFrame]:
+    """Generate synthetic training data with a station-specific linear target."""
     logger.info("Mock: Generating synthetic training data...")
     time.sleep(1)  # Simulate some work
 
@@ -45,6 +142,13 @@ def load_training_data(config: TrainingPipelineConfig) -> dict:
     }
 
     df = pd.DataFrame(data)
+
+    # Target: a station-specific linear signal of the features plus noise
+    stations, station_index = np.unique(df["station_id"], return_inverse=True)
+    true_coefficients = np.random.normal(0, 1, (len(stations), 4))
+    features = df[["temperature", "humidity", "pressure", "wind_speed"]].to_numpy()
+    df["target"] = np.einsum(
+        "ij,ij->i", features, true_coefficients[station_index]
+    ) + np.random.normal(0, 1, n_samples)
     logger.info(f"Mock: Generated {len(df)} samples of training data")
-    rv = {"station_mockup": df}
-    return rv
+    return dict(tuple(df.groupby("station_id", sort=True)))
@@ -1,12 +1,79 @@
 import logging
+import shutil
+import sys
 import time
+from typing import Annotated
+import pandas as pd
 from zenml import step
 from zenml.config import DockerSettings
 from config import DataLoadingPipelineConfig
+import utils.sources
+import utils.station_store
+from utils.sources import FileSource, SourceState, discover_sources, fetch_sources
+from utils.station_store import (
+    StoreManifest,
+    append_to_store,
+    normalize_chunk,
+    prune_staging,
+    publish_staged,
+    staging_dir,
+)
+from utils.step_cache import StepCache, code_fingerprint, file_signature, fingerprint
+from utils.startup import step_started
 
 logger = logging.getLogger(__name__)
 
 
+def load_source(
+    source,
+    config: DataLoadingPipelineConfig,
+    version: int,
+    start: pd.Timestamp | None,
+    end: pd.Timestamp | None = None,
+) -> tuple[int, int, pd.Timestamp | None, list[str]]:
+    """Stream the rows of one source in ``(start, end)`` into the station store.
+
+    ``start`` is exclusive (the source's high-water mark), ``end`` exclusive.
+    Peak memory per source is bounded by ``config.chunk_size`` rows, not by the
+    size of the source. Chunks are staged and only published to the store
+    once the whole fetch succeeded, so a source failing partway leaves no
+    rows behind to be appended again by the retry.
+
+    Returns:
+        Rows and chunks appended, newest timestamp seen and dates touched
+    """
+    rows = chunks = 0
+    watermark = None
+    dates = set()
+    staged = staging_dir(config.storage_dir, version, source.source_id)
+    try:
+        for chunk in source.iter_chunks(config.chunk_size, start=start, end=end):
+            chunk = normalize_chunk(chunk, source.source_id)
+            if start is not None:
+                chunk = chunk[chunk["timestamp"] > start]
+            if end is not None:
+                chunk = chunk[chunk["timestamp"] < end]
+            if chunk.empty:
+                continue
+            rows += append_to_store(chunk, staged, version)
+            chunks += 1
+            newest = chunk["timestamp"].max()
+            watermark = newest if watermark is None else max(watermark, newest)
+            dates.update((chunk["timestamp"].min().strftime("%Y-%m-%d"), newest.strftime("%Y-%m-%d")))
+    except BaseException:
+        shutil.rmtree(staged, ignore_errors=True)
+        raise
+    publish_staged(staged, config.storage_dir)
+    return rows, chunks, watermark, sorted(dates)
+
+
+def _utc(value) -> pd.Timestamp | None:
+    if value is None:
+        return None
+    value = pd.Timestamp(value)
+    return value.tz_localize("UTC") if value.tzinfo is None else value.tz_convert("UTC")
+
+
 @step(
     settings={
         "docker": DockerSettings(
@@ -17,27 +84,125 @@ logger = logging.getLogger(__name__)
 )
 def load_data_sources(
     config: DataLoadingPipelineConfig,
-) -> None:
-    """Mock version: Simulate loading data from configured data sources.
+) -> Annotated[int, "store_version"]:
+    """Append new rows of all sources matching the configured pattern to the station store.
+
+    Matching sources are fetched concurrently; sources fetched less than
+    ``cooldown_seconds`` ago are skipped. Each source is only asked for rows
+    after its high-water mark. In backfill mode (``backfill_start`` set) the
+    given time range is re-ingested regardless of cooldowns and high-water marks.
+    With ``config.step_cache``, a source file that has not changed since it
+    was last loaded is not read again.
 
     Args:
         config: Pipeline configuration
+
+    Returns:
+        int: Store version of this load, usable as ``since_version`` downstream
     """
+    step_started("load_data_sources")
     data_source_id = config.data_source_id if config.data_source_id else "*"
-    logger.info(f"Mock: Starting data loading with pattern: {data_source_id}")
-
-    # Simulate loading process
-    logger.info("Mock: Simulating data loading...")
-    time.sleep(2)  # Simulate some work
-
-    # Create mock data files
-    mock_data = {
-        "timestamp": "2024-01-01 00:00:00",
-        "temperature": 20.5,
-        "humidity": 65.0,
-        "pressure": 1013.25,
-        "wind_speed": 5.0,
-    }
-
-    logger.info(f"Mock: Generated sample data: {mock_data}")
-    logger.info("Mock: Data loading completed successfully")
+    logger.info(f"Starting data loading with pattern: {data_source_id}")
+
+    manifest = StoreManifest(config.storage_dir)
+    backfill_start, backfill_end = _utc(config.backfill_start), _utc(config.backfill_end)
+    backfill = backfill_start is not None
+
+    sources = discover_sources(
+        config.source_dir,
+        data_source_id,
+        stub_sources=config.stub_sources,
+        stub_rows=config.stub_rows,
+        stub_latency=config.stub_latency_seconds,
+    )
+    if not sources:
+        logger.warning(f"No sources matching '{data_source_id}' in {config.source_dir}")
+        return manifest.latest_version
+
+    version = manifest.allocate()
+    # Staged chunks of an interrupted run were never published, their
+    # sources' high-water marks did not move. Loads still running keep theirs
+    committed = {v["version"] for v in manifest.versions}
+    pruned = prune_staging(config.storage_dir, committed, version)
+    if pruned:
+        logger.info(f"Deleted staged chunks of interrupted loads {pruned}")
+    state = SourceState(config.state_path)
+    dates: dict[str, list[str]] = {}
+
+    # Files are keyed by their signature; stub sources and backfills always load
+    cache = StepCache(
+        config.cache_dir, "load_data_sources", enabled=config.step_cache and not backfill
+    )
+    code = code_fingerprint(sys.modules[__name__], utils.sources, utils.station_store)
+    settings = config.model_dump(include={"source_dir", "storage_dir"})
+
+    def _committed(payload):
+        # A load whose rows never made it into the manifest does not count
+        return not payload["rows"] or payload.get("version") in committed
+
+    def _fetch(source):
+        if backfill:
+            # The start of a backfill range is inclusive
+            start = backfill_start - pd.Timedelta(microseconds=1)
+            rows, chunks, watermark, dates[source.source_id] = load_source(
+                source, config, version, start, backfill_end
+            )
+            return rows, chunks, watermark
+
+        key = None
+        previous = state.watermark(source.source_id)
+        if cache.enabled and isinstance(source, FileSource):
+            signature = file_signature(source.path, config.cache_checksum)
+            key = fingerprint(code, settings, source.source_id, signature)
+            # Without a high-water mark the source state was reset, so load anyway
+            if previous is not None and cache.get(key, valid=_committed) is not None:
+                dates[source.source_id] = []
+                return 0, 0, None
+        started = time.perf_counter()
+        rows, chunks, watermark, dates[source.source_id] = load_source(
+            source, config, version, previous
+        )
+        if key is not None:
+            cache.put(key, {"rows": rows, "version": version}, time.perf_counter() - started)
+        return rows, chunks, watermark
+
+    results = fetch_sources(
+        sources,
+        _fetch,
+        state,
+        0.0 if backfill else config.cooldown_seconds,
+        workers=config.fetch_workers,
+    )
+    # Every source published or discarded its staged chunks
+    shutil.rmtree(staging_dir(config.storage_dir, version), ignore_errors=True)
+    for result in results:
+        if result.status == "loaded" and not result.rows:
+            logger.info(f"No new rows from source {result.source_id}")
+        elif result.status == "loaded":
+            logger.info(
+                f"Loaded {result.rows} rows in {result.chunks} chunks from source "
+                f"{result.source_id} in {result.seconds:.2f}s (up to {result.watermark})"
+            )
+        else:
+            logger.info(f"Source {result.source_id} {result.status}: {result.detail}")
+
+    cache.log_summary()
+
+    failed = [r.source_id for r in results if r.status == "failed"]
+    if failed and len(failed) == len(results):
+        raise RuntimeError(f"All sources failed to load: {failed}")
+
+    touched = sorted({d for source_dates in dates.values() for d in source_dates})
+    manifest.commit(
+        version,
+        {r.source_id: r.rows for r in results if r.rows},
+        touched[0] if touched else None,
+        touched[-1] if touched else None,
+        backfill=backfill,
+    )
+    # Only once the rows are committed, or readers of this version would never see them
+    state.record(results)
+    logger.info(
+        f"Data loading completed successfully, store version {manifest.latest_version}"
+    )
+    return manifest.latest_version
@@ -1,21 +1,58 @@
 import logging
 import time
 import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator
 import pandas as pd
 import numpy as np
-from datetime import datetime, timedelta
-from evidently.report import Report
-from evidently.metric_preset import DataDriftPreset
-from evidently.metrics import *
+import mlflow
+from datetime import datetime, timedelta, timezone
 from zenml import step
 from zenml.config import DockerSettings
 from config import MonitoringConfig
+from utils.drift import (
+    ColumnHistograms,
+    ReservoirSample,
+    drift_table,
+    station_drift_table,
+    update_by_station,
+)
+from utils.monitoring_store import (
+    PartitionedWriter,
+    apply_retention,
+    compact_partitions,
+    prune_files,
+    record_snapshotted_hours,
+    snapshotted_hours,
+    write_partitioned,
+)
+from utils.sketch_store import (
+    HOUR_FORMAT,
+    HourlySketchStore,
+    merge_sketches,
+    merge_station_sketches,
+    sketch_key,
+)
+from utils.profiles import (
+    PROFILE_ARTIFACT,
+    ReferenceProfile,
+    build_profile,
+    load_profile,
+    load_registered_profile,
+    save_profile,
+)
+from utils.profiling import active_profiler, profile_step
 
 logger = logging.getLogger(__name__)
 
 ENV = os.environ["ENV"]
 STACK = os.environ["STACK"]
 
+# Date-partitioned Parquet table of drift scores, kept in log_dir
+METRICS_TABLE = "drift_metrics"
+
+MONITORED_COLUMNS = ["temperature", "humidity", "pressure", "wind_speed", "precipitation"]
+
 
 def generate_sample_data(n_samples: int = 1000) -> pd.DataFrame:
     """Generate sample weather data with some drift patterns."""
@@ -43,8 +80,8 @@ def generate_current_data(n_samples: int = 1000) -> pd.DataFrame:
     """Generate current weather data with some drift patterns."""
     np.random.seed(43)  # Different seed for current data
 
-    # Generate timestamps (last 7 days)
-    end_date = datetime.now()
+    # Generate timestamps (last 7 days), naive UTC like the hours of the log
+    end_date = datetime.now(timezone.utc).replace(tzinfo=None)
     start_date = end_date - timedelta(days=7)
     dates = pd.date_range(start=start_date, end=end_date, periods=n_samples)
 
@@ -58,11 +95,214 @@ def generate_current_data(n_samples: int = 1000) -> pd.DataFrame:
         "precipitation": np.random.exponential(
             0.8, n_samples
         ),  # Drift: mean=0.8 (+0.3)
+        "station_id": np.random.choice(["station1", "station2", "station3"], n_samples),
     }
 
     return pd.DataFrame(data)
 
 
+class LoggedPredictions:
+    """The date/hour partitioned Parquet log written by the forecasting service.
+
+    Hours are read one at a time; the hour is matched on the partition
+    directories, so only that hour's files are opened.
+    """
+
+    # A closed hour of the log does not change, its sketch is kept
+    keep_sketches = True
+
+    def __init__(self, log_dir: str, batch_size: int = 500_000):
+        import pyarrow as pa
+        import pyarrow.dataset as ds
+
+        partitioning = ds.partitioning(
+            pa.schema([("date", pa.string()), ("hour", pa.string())]), flavor="hive"
+        )
+        self.dataset = ds.dataset(log_dir, format="parquet", partitioning=partitioning)
+        names = self.dataset.schema.names
+        self.columns = [c for c in MONITORED_COLUMNS if c in names]
+        self.has_stations = "station_id" in names
+        self.batch_size = batch_size
+        self.name = os.path.abspath(log_dir)
+
+    def _batches(self, filter) -> Iterator[pd.DataFrame]:
+        columns = ["timestamp", *(["station_id"] if self.has_stations else []), *self.columns]
+        scanner = self.dataset.scanner(columns=columns, filter=filter, batch_size=self.batch_size)
+        for batch in scanner.to_batches():
+            if batch.num_rows:
+                data = batch.to_pandas()
+                # Hours are UTC; sketches work on naive UTC timestamps
+                data["timestamp"] = data["timestamp"].dt.tz_convert(None)
+                yield data
+
+    def iter_hour(self, hour: pd.Timestamp) -> Iterator[pd.DataFrame]:
+        import pyarrow.dataset as ds
+
+        return self._batches(
+            (ds.field("date") == f"{hour:%Y-%m-%d}") & (ds.field("hour") == f"{hour:%H}")
+        )
+
+    def iter_rows(self, since: pd.Timestamp, stations: list[str]) -> Iterator[pd.DataFrame]:
+        """Rows of ``stations`` logged since ``since``."""
+        import pyarrow.dataset as ds
+
+        dates = pd.date_range(since.floor("D"), pd.Timestamp.now(tz="UTC").tz_convert(None))
+        return self._batches(
+            ds.field("date").isin(dates.strftime("%Y-%m-%d").tolist())
+            & (ds.field("timestamp") >= since.tz_localize("UTC").to_pydatetime())
+            & ds.field("station_id").isin(stations)
+        )
+
+
+class FramePredictions:
+    """Current data held in memory, read one hour at a time like the log."""
+
+    # Generated again on every run, so sketches of its hours are not kept
+    keep_sketches = False
+
+    def __init__(self, data: pd.DataFrame, batch_size: int = 500_000):
+        self.data = data
+        self.columns = [c for c in MONITORED_COLUMNS if c in data]
+        self.has_stations = "station_id" in data
+        self.batch_size = batch_size
+        self.name = "generated"
+        self._hours = data["timestamp"].dt.floor("h")
+
+    def _batches(self, mask: pd.Series) -> Iterator[pd.DataFrame]:
+        part = self.data[mask]
+        for start in range(0, len(part), self.batch_size):
+            yield part.iloc[start : start + self.batch_size]
+
+    def iter_hour(self, hour: pd.Timestamp) -> Iterator[pd.DataFrame]:
+        return self._batches(self._hours == hour)
+
+    def iter_rows(self, since: pd.Timestamp, stations: list[str]) -> Iterator[pd.DataFrame]:
+        return self._batches((self.data["timestamp"] >= since) & self.data["station_id"].isin(stations))
+
+
+def open_current_data(config: MonitoringConfig) -> LoggedPredictions | FramePredictions:
+    """Current data: the prediction log if there is one, generated data otherwise."""
+    if config.current_data_dir and os.path.isdir(config.current_data_dir):
+        logged = LoggedPredictions(config.current_data_dir, config.chunk_size)
+        if logged.columns and "timestamp" in logged.dataset.schema.names:
+            logger.info("Reading logged predictions as current data")
+            return logged
+    return FramePredictions(generate_current_data(), config.chunk_size)
+
+
+def load_reference_profile(config: MonitoringConfig) -> ReferenceProfile:
+    """Return the reference profile to compare current data against.
+
+    With ``config.reference_model`` set, this is the profile stored with the
+    model version behind ``config.reference_alias``. Otherwise a profile of the
+    sample reference data is kept in ``reference_data_dir`` and only built
+    when it does not exist yet.
+    """
+    if config.reference_model:
+        from mlflow.tracking import MlflowClient
+
+        try:
+            profile = load_registered_profile(
+                active_profiler().client(MlflowClient(), "mlflow"),
+                config.reference_model,
+                config.reference_alias,
+            )
+        except Exception as e:
+            logger.warning(f"Could not load profile of {config.reference_model}: {e}")
+            profile = None
+        if profile is not None:
+            logger.info(
+                f"Using reference profile of {profile.model_name} "
+                f"version {profile.model_version} ({profile.rows} rows)"
+            )
+            return profile
+        logger.warning(f"No reference profile stored for {config.reference_model}")
+
+    path = os.path.join(config.reference_data_dir, PROFILE_ARTIFACT)
+    profile = load_profile(path)
+    if profile is None or profile.sketch.n_bins != config.histogram_bins:
+        logger.info(f"Building the sample reference profile at {path}")
+        profile = build_profile(
+            generate_sample_data(), MONITORED_COLUMNS, config.histogram_bins
+        )
+        save_profile(profile, path)
+    return profile
+
+
+def load_station_profiles(config: MonitoringConfig, columns: list[str]) -> dict[str, ReferenceProfile]:
+    """Load the reference profiles stored with the champions of all registered models.
+
+    Models are registered under their station id. Profiles are downloaded
+    in parallel and cached by model version under ``config.sketch_dir``;
+    stations without a profile covering ``columns`` are left out.
+    """
+    from mlflow.tracking import MlflowClient
+
+    client = active_profiler().client(MlflowClient(), "mlflow")
+    names, token = [], None
+    while True:
+        page = client.search_registered_models(max_results=1000, page_token=token)
+        names += [model.name for model in page]
+        token = page.token
+        if not token:
+            break
+
+    cache_dir = os.path.join(config.sketch_dir, "profiles")
+
+    def _load(name):
+        try:
+            return name, load_registered_profile(client, name, config.reference_alias, cache_dir)
+        except Exception as e:
+            logger.warning(f"Could not load profile of {name}: {e}")
+            return name, None
+
+    with ThreadPoolExecutor(max_workers=config.profile_workers) as executor:
+        loaded = dict(executor.map(_load, names))
+    profiles = {
+        name: profile
+        for name, profile in loaded.items()
+        if profile is not None and set(columns) <= set(profile.columns)
+    }
+    logger.info(f"Loaded reference profiles of {len(profiles)} of {len(names)} registered models")
+    return profiles
+
+
+def run_evidently_report(
+    reference_data: pd.DataFrame,
+    current_data: pd.DataFrame,
+    columns: list[str],
+    log_dir: str,
+    name: str = "monitoring_report",
+) -> str:
+    """Render the detailed Evidently drift report as HTML and return its path."""
+    # Evidently is slow to import and only needed when a report is rendered
+    from evidently.metric_preset import DataDriftPreset
+    from evidently.metrics import (
+        ColumnDriftMetric,
+        ColumnSummaryMetric,
+        DatasetDriftMetric,
+        DatasetMissingValuesMetric,
+    )
+    from evidently.report import Report
+
+    report = Report(
+        metrics=[
+            DataDriftPreset(),
+            *[ColumnDriftMetric(column_name=c) for c in columns],
+            DatasetDriftMetric(),
+            DatasetMissingValuesMetric(),
+            *[ColumnSummaryMetric(column_name=c) for c in columns],
+        ]
+    )
+    report.run(reference_data=reference_data, current_data=current_data)
+
+    os.makedirs(log_dir, exist_ok=True)
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    report_path = os.path.join(log_dir, f"{name}_{timestamp}.html")
+    report.save_html(report_path)
+    return report_path
+
+
 @step(
     settings={
         "docker": DockerSettings(
@@ -73,59 +313,242 @@ def generate_current_data(n_samples: int = 1000) -> pd.DataFrame:
     },
     experiment_tracker=f"{STACK}_tracker_{ENV}",
 )
+@profile_step
 def generate_evidently_report(
     config: MonitoringConfig,
 ) -> None:
-    """Generate evidently monitoring report from sample data.
+    """Compute drift of the current data against a reference profile over rolling windows.
+
+    The reference is a precomputed profile (see ``load_reference_profile``),
+    the raw reference data is never read. Current data is sketched per hour
+    into histograms over the reference edges, as a whole and per station;
+    sketches of closed hours of the prediction log are kept in
+    ``config.sketch_dir``, so a run only reads the hours it has not sketched
+    yet (normally the newest one) plus the still open hour. Each window in ``config.drift_windows`` is the merge
+    of its hourly sketches, and PSI, KS and Wasserstein per column come from
+    those. All scores are appended to a date-partitioned Parquet table in
+    ``config.log_dir`` and the closed hours read are snapshotted to
+    ``config.snapshot_dir``. The Evidently HTML report is an optional detail
+    view of the hours read in this run, and of the last window for stations
+    that drifted. Old snapshots, scores and reports are cleaned up.
 
     Args:
         config: Monitoring configuration
     """
+    profiler = active_profiler()
     logger.info("Mock: Running the evidently monitoring.")
     time.sleep(1)  # Simulate some work
 
-    # Generate sample data
-    reference_data = generate_sample_data()
-    current_data = generate_current_data()
+    with profiler.phase("reference"):
+        profile = load_reference_profile(config)
+        source = open_current_data(config)
+        columns = [c for c in source.columns if c in profile.columns]
+        reference = profile.sketch.select(columns)
 
-    # Save sample data
-    os.makedirs(config.reference_data_dir, exist_ok=True)
-    reference_data.to_csv(
-        os.path.join(config.reference_data_dir, "reference_data.csv"), index=False
-    )
-    current_data.to_csv(
-        os.path.join(config.reference_data_dir, "current_data.csv"), index=False
+    # Stations are compared against their champion's profile if asked and
+    # available, otherwise against the common reference
+    by_station = config.station_drift and source.has_stations
+    with profiler.phase("station_profiles"):
+        station_profiles = (
+            load_station_profiles(config, columns) if by_station and config.station_profiles else {}
+        )
+    station_references = {s: p.sketch.select(columns) for s, p in station_profiles.items()}
+    store = HourlySketchStore(
+        config.sketch_dir,
+        sketch_key(
+            source.name,
+            [reference, *(station_references[s] for s in sorted(station_references))],
+            by_station,
+        ),
     )
 
-    logger.info("Mock: Generated sample data with drift patterns")
+    def _new_station_sketch(station):
+        return ColumnHistograms.empty(columns, station_references.get(station, reference).edges)
 
-    # Create evidently report
-    report = Report(
-        metrics=[
-            DataDriftPreset(),
-            ColumnDriftMetric(column_name="temperature"),
-            ColumnDriftMetric(column_name="humidity"),
-            ColumnDriftMetric(column_name="pressure"),
-            ColumnDriftMetric(column_name="wind_speed"),
-            ColumnDriftMetric(column_name="precipitation"),
-            DatasetDriftMetric(),
-            DatasetMissingValuesMetric(),
-            ColumnSummaryMetric(column_name="temperature"),
-            ColumnSummaryMetric(column_name="humidity"),
-            ColumnSummaryMetric(column_name="pressure"),
-            ColumnSummaryMetric(column_name="wind_speed"),
-            ColumnSummaryMetric(column_name="precipitation"),
-        ]
+    # Hours of the longest window, newest (still open) hour first
+    now = pd.Timestamp.now(tz="UTC").tz_convert(None)
+    open_hour = now.floor("h")
+    n_hours = max(config.drift_windows.values())
+    hours = [open_hour - pd.Timedelta(hours=k) for k in range(n_hours)]
+    grace = pd.Timedelta(minutes=config.sketch_grace_minutes)
+
+    # Closed hours read in this run are snapshotted as date-partitioned
+    # Parquet; the open hour is snapshotted by the run that sees it closed.
+    # Snapshotted hours are tracked apart from the sketches, which are made
+    # again for every new reference
+    snapshots = PartitionedWriter(config.snapshot_dir) if config.snapshot_dir else None
+    snapshotted = snapshotted_hours(config.snapshot_dir) if snapshots is not None else set()
+    new_snapshots = set()
+
+    # One pass over every hour without a stored sketch: hourly sketches,
+    # snapshot and the rows kept for the Evidently detail report
+    sketches = {}
+    sample = ReservoirSample(config.evidently_sample_rows, seed=0)
+    kept = []
+    read_hours = read_batches = 0
+    with profiler.phase("sketch"):
+        try:
+            for hour in hours:
+                closed = hour + pd.Timedelta(hours=1) + grace <= now
+                keep = closed and source.keep_sketches
+                stored = store.load(hour) if keep else None
+                if stored is None:
+                    label = f"{hour:{HOUR_FORMAT}}"
+                    snapshot = closed and snapshots is not None and label not in snapshotted
+                    sketch, stations = ColumnHistograms.empty(columns, reference.edges), {}
+                    for batch in source.iter_hour(hour):
+                        X = batch[columns].to_numpy(dtype=np.float64)
+                        sketch.update(X)
+                        if by_station:
+                            update_by_station(stations, batch["station_id"].to_numpy(), X, _new_station_sketch)
+                        if snapshot:
+                            snapshots.write(batch)
+                        read_batches += 1
+                        if config.evidently_mode == "sampled":
+                            sample.update(batch)
+                        elif config.evidently_mode == "full":
+                            kept.append(batch)
+                    if snapshot:
+                        new_snapshots.add(label)
+                    if keep:
+                        store.save(hour, sketch, stations)
+                    stored = sketch, stations
+                    read_hours += 1
+                sketches[hour] = stored
+        finally:
+            if snapshots is not None:
+                snapshots.close()
+                if new_snapshots:
+                    record_snapshotted_hours(
+                        config.snapshot_dir, snapshotted | new_snapshots, f"{hours[-1]:{HOUR_FORMAT}}"
+                    )
+    pruned = store.prune(before=hours[-1])
+    logger.info(
+        f"Read {read_hours} of {n_hours} hours, {n_hours - read_hours} from stored "
+        f"sketches; pruned {pruned} expired hourly sketches"
     )
 
-    # Run the report
-    report.run(reference_data=reference_data, current_data=current_data)
+    # Drift per window from the merged hourly sketches, overall and per station
+    metrics = {}
+    tables = []
+    drifted_stations = set()
+    with profiler.phase("drift"):
+        for window, window_hours in config.drift_windows.items():
+            window_sketches = [sketches[hour] for hour in hours[:window_hours]]
+            current = merge_sketches([sketch for sketch, _ in window_sketches])
+            rows = int(current.total.max(initial=0))
+            if not rows:
+                logger.info(f"[{window}] No current data in this window")
+                continue
+            table = drift_table(reference, current, config.drift_method, config.drift_threshold)
+            drifted_share = float(table["drifted"].mean()) if len(table) else 0.0
+            for row in table.itertuples():
+                logger.info(
+                    f"[{window}] {row.column}: psi={row.psi:.4f} ks={row.ks:.4f} "
+                    f"wasserstein={row.wasserstein:.4f} drifted={row.drifted}"
+                )
+            logger.info(
+                f"[{window}] Dataset drift: {drifted_share:.0%} of columns drifted "
+                f"({config.drift_method} >= {config.drift_threshold}), {rows} current rows"
+            )
+            metrics.update(
+                {
+                    f"{window}_{row.column}_{metric}": float(getattr(row, metric))
+                    for row in table.itertuples()
+                    for metric in ("psi", "ks", "wasserstein")
+                }
+            )
+            metrics[f"{window}_drifted_share"] = drifted_share
+            metrics[f"{window}_dataset_drift"] = float(drifted_share >= config.drift_share)
+            table.insert(0, "window", window)
+            table.insert(1, "station_id", None)
+            tables.append(table)
 
-    # Save the report
-    os.makedirs(config.log_dir, exist_ok=True)
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    report_path = os.path.join(config.log_dir, f"monitoring_report_{timestamp}.html")
-    report.save_html(report_path)
+            if by_station:
+                current_stations = merge_station_sketches([stations for _, stations in window_sketches])
+                references = {s: station_references.get(s, reference) for s in current_stations}
+                station_table = station_drift_table(
+                    references, current_stations, config.drift_method, config.drift_threshold
+                )
+                shares = station_table.groupby("station_id")["drifted"].mean()
+                drifted = sorted(shares.index[shares >= config.drift_share])
+                logger.info(
+                    f"[{window}] {len(drifted)} of {len(shares)} stations drifted"
+                    + (f": {', '.join(drifted)}" if drifted else "")
+                )
+                metrics[f"{window}_stations_drifted"] = float(len(drifted))
+                station_table.insert(0, "window", window)
+                tables.append(station_table)
+                drifted_stations.update(drifted)
+    if metrics and mlflow.active_run() is not None:
+        profiler.counted(mlflow.log_metrics, "mlflow.log_metrics")(metrics)
+
+    # Drift scores of this run, overall (no station_id) and per station, are
+    # appended to the date-partitioned metrics table next to the reports
+    metrics_dir = os.path.join(config.log_dir, METRICS_TABLE)
+    with profiler.phase("write_scores"):
+        if tables:
+            frame = pd.concat(tables, ignore_index=True)
+            frame.insert(0, "run_at", now)
+            # Overall rows have no station; an all-null column would be
+            # written as Arrow null and not read together with station rows
+            frame["station_id"] = frame["station_id"].astype("string")
+            write_partitioned(frame, metrics_dir, "run_at", prefix="run")
+            logger.info(f"Appended {len(frame)} drift scores to {metrics_dir}")
+
+    # Detailed Evidently report against the profile's reference sample, on a
+    # uniform sample of the rows read in this run unless all rows are asked for
+    with profiler.phase("reports"):
+        if config.evidently_mode != "off" and read_batches:
+            if config.evidently_mode == "sampled":
+                current_detail = sample.frame
+            else:
+                current_detail = pd.concat(kept, ignore_index=True)
+            report_path = run_evidently_report(
+                profile.sample[columns], current_detail[columns], columns, config.log_dir
+            )
+            logger.info(f"Mock: Generated evidently report at {report_path}")
+
+        # Station reports only for the stations that drifted, on their rows of
+        # the longest window, read again with a station filter
+        if config.evidently_mode != "off" and drifted_stations:
+            size = config.evidently_sample_rows if config.evidently_mode == "sampled" else None
+            station_rows = {s: ReservoirSample(size, seed=0) if size else [] for s in drifted_stations}
+            for batch in source.iter_rows(hours[-1], sorted(drifted_stations)):
+                for station, part in batch.groupby("station_id", sort=False):
+                    if size:
+                        station_rows[station].update(part)
+                    else:
+                        station_rows[station].append(part)
+            for station in sorted(drifted_stations):
+                rows = station_rows[station]
+                current_detail = rows.frame if size else pd.concat(rows, ignore_index=True)
+                reference_sample = station_profiles.get(station, profile).sample
+                start = time.perf_counter()
+                report_path = run_evidently_report(
+                    reference_sample[columns],
+                    current_detail[columns],
+                    columns,
+                    config.log_dir,
+                    name=f"monitoring_report_{station}",
+                )
+                profiler.station("report", station, time.perf_counter() - start)
+                logger.info(f"Generated evidently report for station {station} at {report_path}")
 
-    logger.info(f"Mock: Generated evidently report at {report_path}")
+    # Retention: expired days are dropped, closed days compacted to one file
+    with profiler.phase("retention"):
+        for root, keep_days in (
+            (config.snapshot_dir, config.snapshot_retention_days),
+            (metrics_dir, config.metrics_retention_days),
+        ):
+            if root:
+                expired = apply_retention(root, keep_days)
+                compacted = compact_partitions(root)
+                if expired or compacted:
+                    logger.info(
+                        f"{root}: dropped {len(expired)} expired days, compacted {len(compacted)}"
+                    )
+        removed = prune_files(config.log_dir, ".html", config.report_retention_days)
+        if removed:
+            logger.info(f"Removed {removed} HTML reports older than {config.report_retention_days} days")
     logger.info("Mock: Monitoring report generation completed")
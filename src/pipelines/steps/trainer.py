@@ -1,19 +1,36 @@
+import hashlib
+import json
 import logging
+import sys
+import tempfile
 import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from typing import Annotated, Tuple
 import numpy as np
 import mlflow
 import os
 from zenml import step
 from zenml.config import DockerSettings
 from config import TrainingPipelineConfig
+import utils.linear
+from utils.linear import MockModel, fit_stations, group_by_station
+from utils.station_artifacts import StationFrames, StationModels
+from utils.training_store import TrainingDataHandle, column_matrix, open_training_data
+from utils.profiling import active_profiler, profile_step
+from utils.step_cache import StepCache, array_digest, code_fingerprint, fingerprint, timed_call
+from materializers import StationFramesMaterializer, StationModelsMaterializer
 import pandas as pd
 import mlflow.pyfunc
+from mlflow.entities import Metric, Param, RunTag
+from mlflow.models import Model
+from mlflow.tracking import MlflowClient
+from mlflow.tracking.context.registry import resolve_tags
+from mlflow.utils.mlflow_tags import MLFLOW_PARENT_RUN_ID
 
 logger = logging.getLogger(__name__)
 
 class MockPyFuncWrapper(mlflow.pyfunc.PythonModel):
     def load_context(self, context):
-        import json
         with open(context.artifacts["weights_path"], "r") as f:
             weights = json.load(f)
         self.coefficients = np.array(weights["coefficients"])
@@ -21,23 +38,151 @@ class MockPyFuncWrapper(mlflow.pyfunc.PythonModel):
 
     def predict(self, context, model_input):
         return np.dot(model_input, self.coefficients) + self.bias
-    
-class MockModel:
-    """A simple mock model that returns random predictions."""
-
-    def __init__(self, station_id: str, model_params: dict):
-        self.station_id = station_id
-        self.model_params = model_params
-        self.coefficients = np.random.rand(4)  # Random coefficients for features
-
-    def predict(self, X: np.ndarray) -> np.ndarray:
-        """Generate mock predictions."""
-        return np.dot(X, self.coefficients) + np.random.normal(0, 1, len(X))
 
 
 ENV = os.environ["ENV"]
 STACK = os.environ["STACK"]
 
+# Requirements of MockPyFuncWrapper, the same for every station. Without them
+# save_model infers them in a subprocess for every station's model
+MODEL_REQUIREMENTS = [
+    *mlflow.pyfunc.get_default_pip_requirements(),
+    f"numpy=={np.__version__}",
+]
+
+
+def station_seed(seed: int, station: str) -> int:
+    """Derive a stable per-station seed, independent of training order."""
+    digest = hashlib.sha256(f"{seed}:{station}".encode()).digest()
+    return int.from_bytes(digest[:8], "little")
+
+
+def train_station(
+    station: str,
+    X: np.ndarray,
+    y: np.ndarray,
+    coefficients: np.ndarray,
+    bias: float,
+    seed: int,
+    parent_run_id: str,
+    experiment_id: str,
+    tracking_uri: str,
+) -> Tuple[MockModel, str]:
+    """Evaluate and log the model of one station in a run nested under the parent.
+
+    The weights come from the batched fit over all stations. Runs in a pool
+    worker, so the MLflow parent run and tracking URI are passed explicitly
+    instead of relying on the worker's active run.
+
+    Every tracking-server round trip counts here, so the run is driven through
+    ``MlflowClient``: params, metrics and tags go out in one ``log_batch`` and
+    the model directory, with the weights inside it, in one ``log_artifacts``.
+
+    Returns the model and the id of its run.
+    """
+    # Tracking calls are counted when the step is profiled and this runs in a thread
+    client = active_profiler().client(MlflowClient(tracking_uri), "mlflow")
+    rng = np.random.default_rng(station_seed(seed, station))
+    logger.info(f"Mock: Logging model for station {station} fitted on {len(X)} rows")
+
+    # Generate random model parameters
+    model_params = {
+        "learning_rate": rng.uniform(0.001, 0.01),
+        "batch_size": int(rng.choice([32, 64, 128])),
+        "hidden_size": int(rng.choice([64, 128, 256])),
+        "dropout": rng.uniform(0.1, 0.5),
+        "optimizer": str(rng.choice(["adam", "sgd", "rmsprop"])),
+    }
+
+    # Create the model from the batched fit
+    model = MockModel(station, model_params, coefficients, bias)
+
+    # Training metrics and random validation metrics
+    residuals = y - model.predict(X)
+    metrics = {
+        "train_loss": float(np.mean(residuals**2)),
+        "val_loss": rng.uniform(0.15, 0.6),
+        "train_mae": float(np.mean(np.abs(residuals))),
+        "val_mae": rng.uniform(0.6, 2.5),
+        "train_r2": float(1 - np.sum(residuals**2) / np.sum((y - y.mean()) ** 2)),
+        "val_r2": rng.uniform(0.65, 0.9),
+    }
+    tags = {
+        "model_type": "linear",
+        "data_source": "synthetic",
+        "environment": "mock",
+    }
+
+    # Start MLflow run for this station
+    run = client.create_run(
+        experiment_id,
+        run_name=f"{station}",
+        tags=resolve_tags({MLFLOW_PARENT_RUN_ID: parent_run_id}),
+    )
+    run_id = run.info.run_id
+    status = "FAILED"
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            # Save model weights as JSON, they are shipped inside the model
+            weights_path = os.path.join(tmp, "model_weights.json")
+            with open(weights_path, "w") as f:
+                json.dump(
+                    {"coefficients": model.coefficients.tolist(), "bias": float(model.bias)},
+                    f,
+                )
+
+            # Save the model so it can be loaded with mlflow.pyfunc.load_model.
+            # It is uploaded with log_artifacts, registering it from
+            # runs:/<run_id>/model only needs the MLmodel file in the run
+            model_dir = os.path.join(tmp, "model")
+            mlflow.pyfunc.save_model(
+                model_dir,
+                python_model=MockPyFuncWrapper(),
+                artifacts={"weights_path": weights_path},
+                mlflow_model=Model(artifact_path="model", run_id=run_id),
+                pip_requirements=MODEL_REQUIREMENTS,
+            )
+
+            # Params, metrics and tags in one call
+            timestamp = int(time.time() * 1000)
+            client.log_batch(
+                run_id,
+                metrics=[Metric(k, float(v), timestamp, 0) for k, v in metrics.items()],
+                params=[
+                    Param(k, str(v))
+                    for k, v in {"station_id": station, **model_params}.items()
+                ],
+                tags=[RunTag(k, v) for k, v in tags.items()],
+            )
+            client.log_artifacts(run_id, model_dir, "model")
+        status = "FINISHED"
+    finally:
+        client.set_terminated(run_id, status)
+    logger.info(f"Mock: Logged experiment for station {station}")
+    return model, run_id
+
+
+def registered_run_ids(client: MlflowClient, run_ids: set[str], batch_size: int = 100) -> set[str]:
+    """Return the runs among ``run_ids`` that a model version was registered from.
+
+    One ``run_id IN (...)`` search per ``batch_size`` runs, instead of one
+    registry round trip per run.
+    """
+    run_ids = sorted(run_ids)
+    registered = set()
+    for i in range(0, len(run_ids), batch_size):
+        quoted = ", ".join(f"'{run_id}'" for run_id in run_ids[i : i + batch_size])
+        page_token = None
+        while True:
+            page = client.search_model_versions(
+                f"run_id IN ({quoted})", max_results=1000, page_token=page_token
+            )
+            registered.update(version.run_id for version in page)
+            page_token = page.token
+            if not page_token:
+                break
+    return registered
+
 
 @step(
     settings={
@@ -48,90 +193,174 @@ STACK = os.environ["STACK"]
         ),
     },
     experiment_tracker=f"{STACK}_tracker_{ENV}",
+    output_materializers={
+        "trained_models": StationModelsMaterializer,
+        "holdout_data": StationFramesMaterializer,
+    },
 )
+@profile_step
 def train_models(
-    training_data: dict[str, pd.DataFrame],
+    training_data: TrainingDataHandle,
     config: TrainingPipelineConfig,
-) -> dict:
+) -> Tuple[
+    Annotated[StationModels, "trained_models"],
+    Annotated[StationFrames, "holdout_data"],
+]:
     """Mock version: Train simple models for each station and log to MLflow.
 
+    All station models are fitted in one batched least-squares pass. Their
+    evaluation and MLflow logging run concurrently on a pool of ``config.training_workers``
+    threads or processes. A station that fails is logged and left out of the
+    result instead of failing the others.
+
+    With ``config.step_cache``, a station whose rows, training config and
+    training code are unchanged since its last model was registered is
+    skipped and left out of the result, so it is not registered again. A
+    station trained before but never registered, e.g. because the
+    validation step failed, is trained again.
+
     Args:
-        training_data: Training data (not used in mock)
+        training_data: Handle of the training data, read memory-mapped
         config: Pipeline configuration
 
     Returns:
-        dict: Dictionary of trained models by station
+        StationModels: Trained models by station
+        StationFrames: Held-out rows per station, for champion/challenger evaluation
     """
+    profiler = active_profiler()
     logger.info("Mock: Starting model training...")
-    time.sleep(2)  # Simulate training time
 
-    # Create mock models for each station
-    stations = ["station1", "station2", "station3"]
-    models = {}
+    # Read only the feature and target columns from the memory-mapped file
+    with profiler.phase("read"):
+        table = open_training_data(
+            training_data, columns=[*config.feature_columns, config.target_column]
+        )
+        X_all = column_matrix(table, config.feature_columns)
+        y_all = column_matrix(table, [config.target_column])[:, 0]
+        station_ids = training_data.station_ids()
+        del table
+    # The file is sorted by station, so every station is one contiguous slice
+    offsets = np.concatenate([[0], np.cumsum(training_data.counts)])
+    station_slices = {
+        station: slice(offsets[i], offsets[i + 1])
+        for i, station in enumerate(training_data.stations)
+    }
 
-    for station in stations:
-        logger.info(f"Mock: Training model for station {station}")
+    # Stations whose rows, settings and training code are unchanged are not retrained
+    cache = StepCache(config.cache_dir, "train_models", enabled=config.step_cache)
+    cache_keys = {}
+    cached = []
+    with profiler.phase("cache_lookup"):
+        if cache.enabled:
+            code = code_fingerprint(sys.modules[__name__], utils.linear)
+            settings = config.model_dump(
+                include={"seed", "holdout_fraction", "feature_columns", "target_column"}
+            )
+            cache_keys = {
+                station: fingerprint(code, settings, station, array_digest(X_all[rows], y_all[rows]))
+                for station, rows in station_slices.items()
+            }
+            registry = profiler.client(MlflowClient(), "mlflow")
 
-        # Generate random model parameters
-        model_params = {
-            "learning_rate": np.random.uniform(0.001, 0.01),
-            "batch_size": np.random.choice([32, 64, 128]),
-            "hidden_size": np.random.choice([64, 128, 256]),
-            "dropout": np.random.uniform(0.1, 0.5),
-            "optimizer": np.random.choice(["adam", "sgd", "rmsprop"]),
-        }
+            def _registered(payloads):
+                # All cached runs are checked against the registry at once
+                run_ids = {s: p["run_id"] for s, p in payloads.items() if p.get("run_id")}
+                registered = registered_run_ids(registry, set(run_ids.values()))
+                return {s for s, run_id in run_ids.items() if run_id in registered}
 
-        # Start MLflow run for this station
-        with mlflow.start_run(run_name=f"{station}", nested=True):
-            # Log parameters
-            mlflow.log_params({"station_id": station, **model_params})
-
-            # Generate and log random metrics
-            metrics = {
-                "train_loss": np.random.uniform(0.1, 0.5),
-                "val_loss": np.random.uniform(0.15, 0.6),
-                "train_mae": np.random.uniform(0.5, 2.0),
-                "val_mae": np.random.uniform(0.6, 2.5),
-                "train_r2": np.random.uniform(0.7, 0.95),
-                "val_r2": np.random.uniform(0.65, 0.9),
-            }
-            mlflow.log_metrics(metrics)
+            cached = list(cache.get_many(cache_keys, valid=_registered))
+    if cached:
+        logger.info(f"Mock: {len(cached)} stations unchanged since they were trained, skipped")
+    if len(cached) < len(station_slices):
+        time.sleep(2)  # Simulate training time
 
-            # Log some artifacts (mock model weights)
-            weights = {
-                "coefficients": np.random.rand(4).tolist(),
-                "bias": np.random.randn(),
-            }
-            mlflow.log_dict(weights, "model_weights.json")
-
-            # Log tags
-            mlflow.set_tags(
-                {
-                    "model_type": "mock_transformer",
-                    "data_source": "synthetic",
-                    "environment": "mock",
-                }
-            )
+    # Hold out a random share of every station's rows for evaluation, drawn
+    # per station so it does not depend on the other stations' rows
+    is_holdout = np.zeros(len(X_all), dtype=bool)
+    for station, rows in station_slices.items():
+        rng = np.random.default_rng(station_seed(config.seed, f"holdout:{station}"))
+        is_holdout[rows] = rng.random(rows.stop - rows.start) < config.holdout_fraction
+    is_trained = np.ones(len(X_all), dtype=bool)
+    for station in cached:
+        is_trained[station_slices[station]] = False
+    holdout_rows = is_holdout & is_trained
+    holdout = pd.DataFrame(X_all[holdout_rows], columns=config.feature_columns)
+    holdout[config.target_column] = y_all[holdout_rows]
+    holdout["station_id"] = np.asarray(station_ids[holdout_rows])
+    train_rows = ~is_holdout & is_trained
+    X, y, station_ids = X_all[train_rows], y_all[train_rows], station_ids[train_rows]
+    del X_all, y_all
+    if not len(X):
+        cache.log_summary()
+        return StationModels(), StationFrames({})
 
-            # Create and store the model
-            model = MockModel(station, model_params)
-            models[station] = model
+    # Fit every station's linear model in one vectorized pass
+    with profiler.phase("fit"):
+        fit = fit_stations(X, y, station_ids)
+    logger.info(f"Mock: Fitted {len(fit.stations)} station models in one pass")
+    # Rows are sorted by station, so every station is one contiguous slice
+    groups = group_by_station(station_ids)
+    bounds = np.concatenate([[0], np.cumsum(groups.counts)])
+    station_rows = {
+        station: slice(bounds[i], bounds[i + 1]) for i, station in enumerate(groups.stations)
+    }
+    station_fits = {
+        station: (fit.coefficients[i], float(fit.bias[i]))
+        for i, station in enumerate(fit.stations)
+    }
 
-            # Save model weights as JSON
-            weights = {
-                "coefficients": model.coefficients.tolist(),
-                "bias": np.random.randn(),
-            }
-            weights_path = "model_weights.json"
-            mlflow.log_dict(weights, weights_path)
+    parent_run = mlflow.active_run()
+    run_args = {
+        "seed": config.seed,
+        "parent_run_id": parent_run.info.run_id,
+        "experiment_id": parent_run.info.experiment_id,
+        "tracking_uri": mlflow.get_tracking_uri(),
+    }
 
-            # Log the model so it can be loaded with mlflow.pyfunc.load_model
-            mlflow.pyfunc.log_model(
-                artifact_path="model",
-                python_model=MockPyFuncWrapper(),
-                # artifacts={"weights_path": weights_path},
-            )
-        logger.info(f"Mock: Logged experiment for station {station}")
+    executor_cls = (
+        ProcessPoolExecutor if config.training_executor == "process" else ThreadPoolExecutor
+    )
+    models = {}
+    failed = []
+    with profiler.phase("train_and_log"), executor_cls(
+        max_workers=max(1, config.training_workers)
+    ) as executor:
+        futures = {
+            executor.submit(
+                timed_call,
+                train_station,
+                station,
+                X[rows],
+                y[rows],
+                *station_fits[station],
+                **run_args,
+            ): station
+            for station, rows in station_rows.items()
+        }
+        for future in as_completed(futures):
+            station = futures[future]
+            try:
+                (models[station], run_id), seconds = future.result()
+                profiler.station("train_and_log", station, seconds)
+                if station in cache_keys:
+                    # Counts as trained once a model version of this run is registered
+                    cache.put(cache_keys[station], {"run_id": run_id}, seconds)
+            except Exception as e:
+                logger.error(f"Mock: Training failed for station {station}: {e}")
+                failed.append(station)
 
+    if not models:
+        raise RuntimeError(f"Training failed for all stations: {failed}")
+    if failed:
+        logger.warning(f"Mock: Skipped {len(failed)} failed stations: {sorted(failed)}")
+
+    holdout_data = StationFrames(
+        {
+            station: frame
+            for station, frame in holdout.groupby("station_id", sort=True)
+            if station in models
+        }
+    )
+    cache.log_summary()
     logger.info("Mock: Model training and MLflow logging completed")
-    return models
+    return StationModels(sorted(models.items())), holdout_data
@@ -2,63 +2,254 @@ import logging
 import time
 import numpy as np
 import mlflow
+import mlflow.pyfunc
 import os
+from concurrent.futures import ThreadPoolExecutor
 from zenml import step
 from zenml.config import DockerSettings
 from config import TrainingPipelineConfig
+from mlflow.exceptions import MlflowException, RestException
 from mlflow.tracking import MlflowClient
-import random
+from requests.exceptions import ConnectionError as RequestsConnectionError, Timeout
+from utils.profiles import build_profile, log_profile
+from utils.station_artifacts import StationFrames, StationModels
+from utils.training_store import TrainingDataHandle, column_matrix, open_training_data
+from utils.evaluation import (
+    EvaluationModelCache,
+    Holdout,
+    PromotionPolicy,
+    predict_stations,
+    regression_metrics,
+)
+from utils.profiling import active_profiler, profile_step
 
 logger = logging.getLogger(__name__)
 
 ENV = os.environ["ENV"]
 STACK = os.environ["STACK"]
 
+# Failures to reach the tracking server that may go away by retrying
+CONNECTION_ERRORS = (ConnectionError, TimeoutError, RequestsConnectionError, Timeout)
+# Registry answers that say "try again later", from the server or a proxy in front of it
+TRANSIENT_ERROR_CODES = {
+    "TEMPORARILY_UNAVAILABLE",
+    "REQUEST_LIMIT_EXCEEDED",
+    "RESOURCE_EXHAUSTED",
+    "DEADLINE_EXCEEDED",
+}
+
+
+def is_transient(error: Exception) -> bool:
+    """Connection failures, rate limits and 5xx responses of the registry are transient.
+
+    A plain ``MlflowException`` defaults to ``INTERNAL_ERROR`` (HTTP 500)
+    for client-side failures as well, e.g. a bad model URI or a failed local
+    save, so ``INTERNAL_ERROR`` only counts when the server sent it.
+    """
+    if isinstance(error, MlflowException):
+        if error.error_code in TRANSIENT_ERROR_CODES:
+            return True
+        return isinstance(error, RestException) and error.get_http_status_code() >= 500
+    return isinstance(error, CONNECTION_ERRORS)
+
+
+def with_retry(fn, *args, retries: int = 3, backoff: float = 0.5, **kwargs):
+    """Call ``fn`` and retry transient failures with exponential backoff.
+
+    Only use it for calls that are safe to repeat; a call that failed may
+    still have taken effect on the server.
+    """
+    for attempt in range(retries + 1):
+        try:
+            return fn(*args, **kwargs)
+        except Exception as e:
+            if not is_transient(e) or attempt == retries:
+                raise
+            error = e
+        delay = backoff * 2**attempt
+        logger.warning(f"{fn.__name__} failed ({error}), retrying in {delay:.1f}s")
+        time.sleep(delay)
+
+
+def get_child_runs_by_name(client: MlflowClient, parent_run_id: str) -> dict:
+    """Resolve all child runs of the parent in one paged search, keyed by run name."""
+    parent = client.get_run(parent_run_id)
+    runs = {}
+    page_token = None
+    while True:
+        page = client.search_runs(
+            [parent.info.experiment_id],
+            f"tags.mlflow.parentRunId = '{parent_run_id}'",
+            max_results=1000,
+            order_by=["attributes.start_time ASC"],
+            page_token=page_token,
+        )
+        # Later runs with the same name win, as with a per-station search
+        runs.update({run.info.run_name: run for run in page})
+        page_token = page.token
+        if not page_token:
+            return runs
+
+
+def run_per_station(fn, items: dict, workers: int, name: str | None = None) -> dict:
+    """Run ``fn(station, item)`` concurrently. Failed stations are logged and dropped.
 
-def get_run_by_name(parent_run_id: str, station_id: str):
-    """Helper to retrieve child run matching station ID."""
-    client = MlflowClient()
-    run = client.get_run(parent_run_id)
-    child_runs = client.search_runs(
-        [run.info.experiment_id],
-        f"tags.mlflow.parentRunId = '{parent_run_id}' and tags.mlflow.runName = '{station_id}'",
+    With a ``name``, every station's call is timed as a sub-timing of that
+    name when the step is profiled.
+    """
+    profiler = active_profiler()
+
+    def _call(station, item):
+        start = time.perf_counter()
+        try:
+            return fn(station, item)
+        finally:
+            if name:
+                profiler.station(name, station, time.perf_counter() - start)
+
+    results = {}
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        futures = {
+            station: executor.submit(_call, station, item) for station, item in items.items()
+        }
+        for station, future in futures.items():
+            try:
+                results[station] = future.result()
+            except Exception as e:
+                logger.error(f"Failed for station {station}: {str(e)}")
+    return results
+
+
+def find_registered_version(client: MlflowClient, name: str, run_id: str):
+    """Return the model version registered from ``run_id`` under ``name``, or None."""
+    versions = client.search_model_versions(f"name = '{name}' and run_id = '{run_id}'")
+    return max(versions, key=lambda v: int(v.version)) if versions else None
+
+
+def register_challenger(client: MlflowClient, station_id: str, run, **retry) -> str:
+    """Register the station's run and point the challenger alias at it.
+
+    Registering is not idempotent: an attempt that failed, e.g. on a
+    timeout, may still have created the version. A retry first looks for a
+    version of the run and only registers if there is none.
+    """
+    model_name = station_id
+    run_id = run.info.run_id
+    register = active_profiler().counted(mlflow.register_model, "mlflow.register_model")
+    attempts = 0
+
+    def register_model():
+        nonlocal attempts
+        attempts += 1
+        if attempts > 1:
+            existing = find_registered_version(client, model_name, run_id)
+            if existing is not None:
+                return existing
+        return register(model_uri=f"runs:/{run_id}/model", name=model_name)
+
+    registered_model = with_retry(register_model, **retry)
+    version = str(registered_model.version)
+    with_retry(
+        client.set_registered_model_alias,
+        model_name,
+        version=version,
+        alias="challenger",
+        **retry,
     )
-    return child_runs[0] if child_runs else None
+    logger.info(f"Registered model {model_name} version {version}")
+    return version
 
 
-def is_challenger_better(client: MlflowClient, station_id: str, parent_run_id: str):
-    """Implement custom method to evaluate champion vs. challenger."""
-    challenger_info = client.get_model_version_by_alias(station_id, "challenger")
+def get_champion(
+    client: MlflowClient, station_id: str, models: EvaluationModelCache, **retry
+):
+    """Return ``(version, model)`` of the current champion, or None if there is none.
+
+    A champion that exists but cannot be loaded raises: the challenger
+    cannot be compared with it, so the station is not promoted.
+    """
+    try:
+        champion_info = with_retry(
+            client.get_model_version_by_alias, station_id, "champion", **retry
+        )
+    except MlflowException as e:
+        if e.error_code not in ("RESOURCE_DOES_NOT_EXIST", "INVALID_PARAMETER_VALUE"):
+            raise
+        logger.info(f"No champion found for {station_id}.")
+        return None
     try:
-        champion_info = client.get_model_version_by_alias(station_id, "champion")
-    except:
-        logging.info("No champion found, promoting challenger.")
-        return True
+        return champion_info.version, models.get(station_id, champion_info.version)
+    except Exception as e:
+        raise RuntimeError(
+            f"Could not load champion version {champion_info.version}, "
+            f"not promoting the challenger: {e}"
+        ) from e
 
-    # logic for comparsion
-    return random.choice([True, False])
+
+def is_challenger_better(
+    policy: PromotionPolicy,
+    station_id: str,
+    challenger_metrics: dict[str, float],
+    champion_metrics: dict[str, float] | None,
+) -> bool:
+    """Compare champion and challenger on the station's holdout metrics."""
+    better, reason = policy.decide(challenger_metrics, champion_metrics)
+    logger.info(f"{station_id}: {reason}")
+    return better
 
 
 def promote_challenger_to_champion(
-    client: MlflowClient, station_id: str, parent_run_id: str
+    client: MlflowClient, station_id: str, challenger_version: str, **retry
 ) -> None:
-    challenger_run = get_run_by_name(parent_run_id, station_id)
-    if not challenger_run:
-        logger.warning(
-            f"No challenger run found for station {station_id}. Cannot promote."
-        )
-        return
-
-    registered_models = client.search_model_versions(f"name='{station_id}'")
-
-    logger.info(f"Promoting the last version of the model to champion.")
-    client.set_registered_model_alias(
+    logger.info(f"Promoting version {challenger_version} of {station_id} to champion.")
+    with_retry(
+        client.set_registered_model_alias,
         name=station_id,
-        version=str(len(registered_models)),
+        version=challenger_version,
         alias="champion",
+        **retry,
     )
 
 
+def store_reference_profiles(
+    client: MlflowClient,
+    training_data: TrainingDataHandle,
+    promoted: dict[str, tuple[str, str]],
+    config: TrainingPipelineConfig,
+    **retry,
+) -> None:
+    """Profile the training data of newly promoted models and store it with them.
+
+    Only the promoted stations' feature columns are read from the
+    memory-mapped training data. ``promoted`` maps station to (version, run id).
+    """
+    stations = [s for s in training_data.stations if s in promoted]
+    if not stations:
+        return
+    table = open_training_data(training_data, config.feature_columns, stations)
+    X = column_matrix(table, config.feature_columns)
+    counts = dict(zip(training_data.stations, training_data.counts))
+    offset = 0
+    for station in stations:
+        count = counts[station]
+        version, run_id = promoted[station]
+        profile = build_profile(
+            X[offset : offset + count],
+            config.feature_columns,
+            model_name=station,
+            model_version=str(version),
+        )
+        offset += count
+        try:
+            with_retry(log_profile, client, station, version, run_id, profile, **retry)
+        except Exception as e:
+            logger.error(f"Failed to store reference profile for {station}: {e}")
+
+
+def load_registered_model(name: str, version: str):
+    return mlflow.pyfunc.load_model(f"models:/{name}/{version}")
+
+
 @step(
     settings={
         "docker": DockerSettings(
@@ -69,48 +260,121 @@ def promote_challenger_to_champion(
     },
     experiment_tracker=f"{STACK}_tracker_{ENV}",
 )
+@profile_step
 def validate_and_deploy_models(
-    trained_models: dict, config: TrainingPipelineConfig
+    trained_models: StationModels,
+    holdout_data: StationFrames,
+    training_data: TrainingDataHandle,
+    config: TrainingPipelineConfig,
 ) -> None:
-    """Register trained models and promote challengers to champions if available."""
+    """Register trained models and promote challengers to champions if better.
+
+    The station runs are resolved with one search over the parent run's
+    children. Registration, champion lookup and alias updates run
+    concurrently on ``config.registry_workers`` threads, retrying transient
+    registry errors. Champion and challenger of every station are scored on
+    the stacked holdout set in one batched pass. Every newly promoted model
+    gets a reference profile of its training data for drift monitoring.
+    """
+    profiler = active_profiler()
     logger.info("Starting model registration and promotion...")
 
-    client = MlflowClient()
+    client = profiler.client(MlflowClient(), "mlflow")
     parent_run_id = mlflow.active_run().info.run_id
+    workers = config.registry_workers
+    retry = {
+        "retries": config.registry_retries,
+        "backoff": config.registry_retry_backoff,
+    }
+    models = EvaluationModelCache(
+        profiler.counted(load_registered_model, "mlflow.load_model")
+    )
+    policy = PromotionPolicy(
+        metric=config.promotion_metric,
+        min_improvement=config.promotion_min_improvement,
+        thresholds=config.promotion_thresholds,
+    )
 
-    for station_id, _ in trained_models.items():
-        try:
-            model_name = station_id
-
-            filter_string = (
-                f"tags.mlflow.parentRunId = '{parent_run_id}' and "
-                f"attribute.run_name = '{station_id}'"
-            )
+    # Register all challengers
+    with profiler.phase("find_runs"):
+        child_runs = get_child_runs_by_name(client, parent_run_id)
+    for station_id in trained_models:
+        if station_id not in child_runs:
+            logger.error(f"Failed for station {station_id}: no training run found")
+    with profiler.phase("register"):
+        challengers = run_per_station(
+            lambda station_id, run: register_challenger(client, station_id, run, **retry),
+            {s: child_runs[s] for s in trained_models if s in child_runs},
+            workers,
+            name="register",
+        )
+    for station_id, version in challengers.items():
+        models.put(station_id, version, trained_models[station_id])
 
-            # Register model
-            run_ids = mlflow.search_runs(filter_string=filter_string, output_format="list")
-            run_id = run_ids[0].info.run_id
+    # Look up and load the current champions
+    with profiler.phase("load_champions"):
+        champions = run_per_station(
+            lambda station_id, _: get_champion(client, station_id, models, **retry),
+            challengers,
+            workers,
+            name="load_champion",
+        )
 
-            model_uri = f"runs:/{run_id}/model"
-            registered_model = mlflow.register_model(
-                model_uri=model_uri, name=model_name
-            )
-            latest_versions = client.get_latest_versions(model_name)
-            latest_version = max(latest_versions, key=lambda v: int(v.version))
-            client.set_registered_model_alias(
-                model_name, version=str(latest_version.version), alias="challenger"
-            )
-            logger.info(
-                f"Registered model {model_name} version {registered_model.version}"
+    # Score champion and challenger of every station in one pass
+    evaluated = [s for s in challengers if s in champions and s in holdout_data]
+    decisions = {}
+    if evaluated:
+        with profiler.phase("evaluate"):
+            holdout = Holdout.from_frames(
+                {s: holdout_data[s] for s in evaluated},
+                config.feature_columns,
+                config.target_column,
             )
+            candidates = {
+                s: [
+                    champions[s][1] if champions[s] else None,
+                    models.get(s, challengers[s]),
+                ]
+                for s in evaluated
+            }
+            metrics = regression_metrics(holdout, predict_stations(holdout, candidates))
+            for station_id in evaluated:
+                i = holdout.station_index(station_id)
+                champion_metrics = {k: float(v[i, 0]) for k, v in metrics.items()}
+                challenger_metrics = {k: float(v[i, 1]) for k, v in metrics.items()}
+                decisions[station_id] = is_challenger_better(
+                    policy,
+                    station_id,
+                    challenger_metrics,
+                    champion_metrics if champions[station_id] else None,
+                )
+    for station_id in challengers:
+        if station_id in champions and station_id not in holdout_data:
+            # Without holdout rows only a first model is promoted
+            decisions[station_id] = champions[station_id] is None
+            logger.warning(f"No holdout rows for {station_id}, cannot compare models.")
 
-            if is_challenger_better(client, station_id, parent_run_id):
-                promote_challenger_to_champion(client, station_id, parent_run_id)
+    # Profile the reference data of the winners before their alias moves
+    with profiler.phase("store_profiles"):
+        store_reference_profiles(
+            client,
+            training_data,
+            {
+                s: (challengers[s], child_runs[s].info.run_id)
+                for s in challengers
+                if decisions.get(s)
+            },
+            config,
+            **retry,
+        )
 
-            client.delete_registered_model_alias(model_name, "challenger")
+    # Promote winners and clear the challenger aliases
+    def finalize(station_id, version):
+        if decisions.get(station_id):
+            promote_challenger_to_champion(client, station_id, version, **retry)
+        with_retry(client.delete_registered_model_alias, station_id, "challenger", **retry)
 
-        except Exception as e:
-            logger.error(f"Failed for station {station_id}: {str(e)}")
-            continue
+    with profiler.phase("finalize"):
+        run_per_station(finalize, challengers, workers, name="finalize")
 
     logger.info("Model registration and promotion completed.")
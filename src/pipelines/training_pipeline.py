@@ -31,14 +31,18 @@ def training_pipeline(config: TrainingPipelineConfig) -> None:
         config: Pipeline configuration
 
     """
-    # Load training data
-    training_data = load_training_data(config)
+    # Load training data. The step needs no experiment tracker, except to log
+    # the metrics of its profile
+    load = load_training_data
+    if config.profiling:
+        load = load_training_data.with_options(experiment_tracker=f"{STACK}_tracker_{ENV}")
+    training_data = load(config)
 
-    # Train models
-    trained_models = train_models(training_data, config)
+    # Train models, keeping a holdout per station
+    trained_models, holdout_data = train_models(training_data, config)
 
     # Validate and deploy models
-    validate_and_deploy_models(trained_models, config)
+    validate_and_deploy_models(trained_models, holdout_data, training_data, config)
 
 
 def run(config: dict, env: str):
@@ -66,6 +70,7 @@ def run(config: dict, env: str):
         data_range_end=data_range_end,
         **training_config,
         **data_config,
+        **config.get("profiling", {}),
     )
 
     # Run the pipeline
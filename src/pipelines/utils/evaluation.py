@@ -0,0 +1,194 @@
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Callable
+
+import numpy as np
+import pandas as pd
+
+from utils.linear import StationGroups, group_by_station, segment_sum
+
+# Direction of every supported metric
+HIGHER_IS_BETTER = {"mae": False, "rmse": False, "r2": True}
+# Metrics that are undefined (NaN), not bad, on some holdout sets: R^2 of a
+# station whose holdout target is constant, e.g. a single held-out row
+MAY_BE_UNDEFINED = {"r2"}
+
+
+@dataclass
+class Holdout:
+    """Holdout rows of all stations, stacked once into one matrix."""
+
+    groups: StationGroups
+    X: np.ndarray  # [n_rows, n_features]
+    y: np.ndarray  # [n_rows]
+
+    @classmethod
+    def from_frames(
+        cls,
+        frames: dict[str, pd.DataFrame],
+        feature_columns: list[str],
+        target_column: str,
+    ) -> "Holdout":
+        data = pd.concat(frames.values(), ignore_index=True)
+        return cls(
+            group_by_station(data["station_id"]),
+            data[feature_columns].to_numpy(dtype=np.float64),
+            data[target_column].to_numpy(dtype=np.float64),
+        )
+
+    def station_index(self, station: str) -> int:
+        return int(np.searchsorted(self.groups.stations, station))
+
+
+def linear_weights(model: Any) -> tuple[np.ndarray, float] | None:
+    """Return ``(coefficients, bias)`` of a linear station model, if it is one.
+
+    Works for in-memory station models and for pyfunc-loaded models that wrap
+    a Python model exposing ``coefficients`` and ``bias``.
+    """
+    candidates = [model]
+    unwrap = getattr(model, "unwrap_python_model", None)
+    if unwrap is not None:
+        try:
+            candidates.append(unwrap())
+        except Exception:
+            pass
+    for candidate in candidates:
+        coefficients = getattr(candidate, "coefficients", None)
+        bias = getattr(candidate, "bias", None)
+        if coefficients is not None and bias is not None:
+            return np.asarray(coefficients, dtype=np.float64), float(bias)
+    return None
+
+
+def predict_stations(holdout: Holdout, models: dict[str, list[Any]]) -> np.ndarray:
+    """Score every station's holdout rows with each of its candidate models.
+
+    ``models[station]`` holds one model (or None) per slot, for example
+    ``[champion, challenger]``. Linear models of all stations and slots are
+    scored together with one einsum over the stacked holdout; other models
+    fall back to one ``predict`` call per station and slot.
+
+    Returns:
+        np.ndarray: ``[n_rows, n_slots]`` predictions, NaN where a slot is empty
+    """
+    n_stations = len(holdout.groups.stations)
+    n_slots = max((len(m) for m in models.values()), default=0)
+    n_features = holdout.X.shape[1]
+
+    weights = np.zeros((n_stations, n_slots, n_features))
+    bias = np.zeros((n_stations, n_slots))
+    missing = np.ones((n_stations, n_slots), dtype=bool)
+    fallback = []
+    for station, slots in models.items():
+        s = holdout.station_index(station)
+        for m, model in enumerate(slots):
+            if model is None:
+                continue
+            linear = linear_weights(model)
+            if linear is None:
+                fallback.append((s, m, model))
+            else:
+                weights[s, m], bias[s, m] = linear
+                missing[s, m] = False
+
+    codes = holdout.groups.codes
+    preds = np.einsum("nf,nmf->nm", holdout.X, weights[codes]) + bias[codes]
+    preds[missing[codes]] = np.nan
+    for s, m, model in fallback:
+        rows = codes == s
+        preds[rows, m] = np.asarray(model.predict(holdout.X[rows]), dtype=np.float64).ravel()
+    return preds
+
+
+def regression_metrics(holdout: Holdout, preds: np.ndarray) -> dict[str, np.ndarray]:
+    """MAE, RMSE and R^2 of ``[n_rows, n_slots]`` predictions, per station and slot.
+
+    R^2 is NaN for a station whose holdout target has no variance.
+    """
+    groups = holdout.groups
+    counts = groups.counts[:, None].astype(np.float64)
+    errors = preds - holdout.y[:, None]
+
+    y_mean = segment_sum(holdout.y, groups) / groups.counts
+    ss_tot = segment_sum((holdout.y - y_mean[groups.codes]) ** 2, groups)
+    ss_res = segment_sum(errors**2, groups)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return {
+            "mae": segment_sum(np.abs(errors), groups) / counts,
+            "rmse": np.sqrt(ss_res / counts),
+            "r2": np.where(ss_tot[:, None] > 0, 1.0 - ss_res / ss_tot[:, None], np.nan),
+        }
+
+
+@dataclass
+class PromotionPolicy:
+    """Decide whether a challenger replaces the champion.
+
+    The challenger must meet every absolute threshold (upper bounds for MAE
+    and RMSE, a lower bound for R^2) and, if there is a champion, improve
+    ``metric`` by at least ``min_improvement`` (relative).
+
+    A threshold on a metric that could not be computed on the holdout set
+    (see ``MAY_BE_UNDEFINED``) is skipped, as long as the challenger's RMSE
+    shows that its predictions are valid.
+    """
+
+    metric: str = "rmse"
+    min_improvement: float = 0.0
+    thresholds: dict[str, float] = field(default_factory=dict)
+
+    def decide(
+        self, challenger: dict[str, float], champion: dict[str, float] | None
+    ) -> tuple[bool, str]:
+        skipped = []
+        for name, threshold in self.thresholds.items():
+            value = challenger[name]
+            undefined = np.isnan(value) and name in MAY_BE_UNDEFINED
+            if undefined and np.isfinite(challenger.get("rmse", np.nan)):
+                skipped.append(name)
+                continue
+            failed = value < threshold if HIGHER_IS_BETTER[name] else value > threshold
+            if not np.isfinite(value) or failed:
+                return False, f"challenger {name}={value:.4f} misses threshold {threshold}"
+        note = ""
+        if skipped:
+            note = f" ({', '.join(skipped)} not computable on the holdout, threshold skipped)"
+
+        if champion is None:
+            return True, f"no champion to compare against{note}"
+        new, old = challenger[self.metric], champion[self.metric]
+        if not np.isfinite(old):
+            return True, f"champion {self.metric}={old:.4f} cannot be compared against{note}"
+        if HIGHER_IS_BETTER[self.metric]:
+            better = new >= old + abs(old) * self.min_improvement
+        else:
+            better = new <= old - abs(old) * self.min_improvement
+        verdict = "beats" if better else "does not beat"
+        return better, f"challenger {self.metric}={new:.4f} {verdict} champion {old:.4f}{note}"
+
+
+class EvaluationModelCache:
+    """Models loaded for evaluation, keyed by (model name, version).
+
+    Shared by evaluation and promotion within a step so that a version is
+    loaded from the registry at most once.
+    """
+
+    def __init__(self, load_fn: Callable[[str, str], Any]):
+        self._load_fn = load_fn
+        self._models: dict[tuple[str, str], Any] = {}
+        self._lock = threading.Lock()
+
+    def put(self, name: str, version: str, model: Any) -> None:
+        with self._lock:
+            self._models[(name, str(version))] = model
+
+    def get(self, name: str, version: str) -> Any:
+        key = (name, str(version))
+        with self._lock:
+            if key in self._models:
+                return self._models[key]
+        model = self._load_fn(name, str(version))
+        self.put(name, version, model)
+        return model
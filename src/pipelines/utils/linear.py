@@ -0,0 +1,113 @@
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+
+@dataclass
+class StationGroups:
+    """Rows of a long frame grouped by station."""
+
+    stations: np.ndarray  # [n_stations] sorted station ids
+    codes: np.ndarray  # [n_rows] index into ``stations`` for every row
+    counts: np.ndarray  # [n_stations] rows per station
+
+
+@dataclass
+class StationCoefficients:
+    stations: np.ndarray  # [n_stations]
+    coefficients: np.ndarray  # [n_stations, n_features]
+    bias: np.ndarray  # [n_stations]
+    n_samples: np.ndarray  # [n_stations]
+
+    def predict(self, X: np.ndarray, station_index: np.ndarray) -> np.ndarray:
+        """Score rows ``X`` with the model of ``stations[station_index]`` per row."""
+        return np.einsum("ij,ij->i", X, self.coefficients[station_index]) + self.bias[station_index]
+
+
+def group_by_station(station_ids) -> StationGroups:
+    """Map every row to its station with one hash pass, no sort of the rows."""
+    codes, stations = pd.factorize(station_ids, sort=True)
+    counts = np.bincount(codes, minlength=len(stations))
+    return StationGroups(np.asarray(stations), codes, counts)
+
+
+def segment_sum(values: np.ndarray, groups: StationGroups) -> np.ndarray:
+    """Sum rows per station, ``[n_rows, ...]`` -> ``[n_stations, ...]``."""
+    n = len(groups.stations)
+    if values.ndim == 1:
+        return np.bincount(groups.codes, weights=values, minlength=n)
+    return np.column_stack(
+        [np.bincount(groups.codes, weights=values[:, i], minlength=n) for i in range(values.shape[1])]
+    )
+
+
+def fit_stations(
+    X: np.ndarray,
+    y: np.ndarray,
+    station_ids,
+    ridge: float = 1e-10,
+) -> StationCoefficients:
+    """Fit ``y ~ X @ w + b`` by least squares for every station at once.
+
+    Rows are mapped to stations once and centered per station. The
+    per-station normal equations are accumulated with grouped sums over all
+    rows, and all of them are solved in one batched ``np.linalg.solve``.
+    ``ridge`` (relative to each station's feature scale) keeps stations with
+    too few rows or constant features solvable.
+
+    Args:
+        X: Features, ``[n_rows, n_features]``
+        y: Targets, ``[n_rows]``
+        station_ids: Station of every row, array or Series ``[n_rows]``
+        ridge: Relative L2 regularization added to the normal equations
+
+    Returns:
+        StationCoefficients: Per-station weights in sorted station order
+    """
+    X = np.asarray(X, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    groups = group_by_station(station_ids)
+    n_features = X.shape[1]
+    counts = groups.counts.astype(np.float64)
+
+    # Centering per station removes the intercept from the solve and keeps
+    # features like pressure (~1013) from dominating the conditioning
+    x_mean = segment_sum(X, groups) / counts[:, None]
+    y_mean = segment_sum(y, groups) / counts
+    Xc = X - x_mean[groups.codes]
+    yc = y - y_mean[groups.codes]
+
+    # Normal equations, one feature pair at a time to keep temporaries at n_rows
+    xtx = np.empty((len(groups.stations), n_features, n_features))
+    for i in range(n_features):
+        for j in range(i, n_features):
+            xtx[:, i, j] = xtx[:, j, i] = segment_sum(Xc[:, i] * Xc[:, j], groups)
+    xty = segment_sum(Xc * yc[:, None], groups)
+
+    scale = np.trace(xtx, axis1=1, axis2=2) / n_features
+    xtx += (ridge * np.maximum(scale, 1.0))[:, None, None] * np.eye(n_features)
+    coefficients = np.linalg.solve(xtx, xty[..., None])[..., 0]
+    bias = y_mean - np.einsum("ij,ij->i", x_mean, coefficients)
+
+    return StationCoefficients(groups.stations, coefficients, bias, groups.counts)
+
+
+class MockModel:
+    """A linear station model fitted by the batched station fitter."""
+
+    def __init__(
+        self,
+        station_id: str,
+        model_params: dict,
+        coefficients: np.ndarray,
+        bias: float,
+    ):
+        self.station_id = station_id
+        self.model_params = model_params
+        self.coefficients = coefficients
+        self.bias = bias
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        """Predict the target for feature rows ``X``."""
+        return np.dot(X, self.coefficients) + self.bias
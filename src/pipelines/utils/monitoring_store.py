@@ -0,0 +1,200 @@
+import json
+import os
+import shutil
+import time
+import uuid
+from datetime import datetime, timedelta
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+DATE_FORMAT = "%Y-%m-%d"
+# Monitoring tables are partitioned by a string date=YYYY-MM-DD directory
+PARTITIONING = ds.partitioning(pa.schema([("date", pa.string())]), flavor="hive")
+# Hours already snapshotted into a table; "_" keeps it out of dataset reads
+SNAPSHOT_HOURS_FILE = "_snapshot_hours.json"
+
+
+def write_partitioned(frame: pd.DataFrame, root: str, time_column: str, prefix: str = "part") -> int:
+    """Append ``frame`` as one zstd Parquet file per date of ``time_column``.
+
+    Returns the number of files written.
+    """
+    if frame.empty:
+        return 0
+    dates = frame[time_column].dt.strftime(DATE_FORMAT)
+    for date, part in frame.groupby(dates, sort=False):
+        directory = os.path.join(root, f"date={date}")
+        os.makedirs(directory, exist_ok=True)
+        part.to_parquet(
+            os.path.join(directory, f"{prefix}-{uuid.uuid4().hex}.parquet"),
+            index=False,
+            compression="zstd",
+        )
+    return dates.nunique()
+
+
+class PartitionedWriter:
+    """Stream frames into one Parquet file per date for the lifetime of the writer.
+
+    Use as a context manager; files are only complete after ``close``.
+    """
+
+    def __init__(self, root: str, time_column: str = "timestamp"):
+        self.root = root
+        self.time_column = time_column
+        self.rows = 0
+        self._name = f"part-{uuid.uuid4().hex}.parquet"
+        self._writers: dict[str, pq.ParquetWriter] = {}
+
+    def write(self, frame: pd.DataFrame) -> None:
+        dates = frame[self.time_column].dt.strftime(DATE_FORMAT)
+        for date, part in frame.groupby(dates, sort=False):
+            table = pa.Table.from_pandas(part, preserve_index=False)
+            writer = self._writers.get(date)
+            if writer is None:
+                directory = os.path.join(self.root, f"date={date}")
+                os.makedirs(directory, exist_ok=True)
+                writer = self._writers[date] = pq.ParquetWriter(
+                    os.path.join(directory, self._name), table.schema, compression="zstd"
+                )
+            writer.write_table(table.cast(writer.schema))
+            self.rows += len(part)
+
+    def close(self) -> None:
+        for writer in self._writers.values():
+            writer.close()
+        self._writers.clear()
+
+    def __enter__(self) -> "PartitionedWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def snapshotted_hours(root: str) -> set[str]:
+    """Hours (``YYYY-MM-DDTHH``) whose rows are already in the snapshot table at ``root``."""
+    path = os.path.join(root, SNAPSHOT_HOURS_FILE)
+    if not os.path.exists(path):
+        return set()
+    with open(path) as f:
+        return set(json.load(f))
+
+
+def record_snapshotted_hours(root: str, hours: set[str], keep_from: str) -> None:
+    """Remember ``hours`` as snapshotted, forgetting hours before ``keep_from``.
+
+    Call once the snapshot files of those hours are closed.
+    """
+    os.makedirs(root, exist_ok=True)
+    path = os.path.join(root, SNAPSHOT_HOURS_FILE)
+    with open(f"{path}.tmp", "w") as f:
+        json.dump(sorted(hour for hour in hours if hour >= keep_from), f)
+    os.replace(f"{path}.tmp", path)
+
+
+def read_partitioned(
+    root: str,
+    columns: list[str] | None = None,
+    since: datetime | None = None,
+    until: datetime | None = None,
+    time_column: str = "timestamp",
+    filter: ds.Expression | None = None,
+) -> pd.DataFrame:
+    """Read rows of a date-partitioned monitoring table in ``[since, until)``.
+
+    Bounds are naive UTC. Date directories outside the range are skipped;
+    the time bounds, any extra ``filter`` and the column selection are
+    pushed down to the files.
+    """
+    if not os.path.isdir(root):
+        return pd.DataFrame(columns=columns)
+    dataset = ds.dataset(root, format="parquet", partitioning=PARTITIONING)
+    time_type = dataset.schema.field(time_column).type if time_column in dataset.schema.names else None
+
+    def _bound(value):
+        value = pd.Timestamp(value)
+        if getattr(time_type, "tz", None):
+            value = value.tz_localize("UTC")
+        return value.to_pydatetime()
+
+    conditions = [] if filter is None else [filter]
+    if since is not None:
+        conditions.append(ds.field("date") >= f"{since:{DATE_FORMAT}}")
+        if time_type is not None:
+            conditions.append(ds.field(time_column) >= _bound(since))
+    if until is not None:
+        conditions.append(ds.field("date") <= f"{until:{DATE_FORMAT}}")
+        if time_type is not None:
+            conditions.append(ds.field(time_column) < _bound(until))
+    expression = None
+    for condition in conditions:
+        expression = condition if expression is None else expression & condition
+    return dataset.to_table(columns=columns, filter=expression).to_pandas()
+
+
+def partition_dates(root: str) -> list[str]:
+    if not os.path.isdir(root):
+        return []
+    return sorted(
+        name[len("date="):]
+        for name in os.listdir(root)
+        if name.startswith("date=") and os.path.isdir(os.path.join(root, name))
+    )
+
+
+def _utc_today() -> datetime:
+    return pd.Timestamp.now(tz="UTC").tz_convert(None).to_pydatetime()
+
+
+def apply_retention(root: str, keep_days: int, today: datetime | None = None) -> list[str]:
+    """Delete date partitions older than ``keep_days``; returns the deleted dates."""
+    cutoff = f"{(today or _utc_today()) - timedelta(days=keep_days):{DATE_FORMAT}}"
+    deleted = [date for date in partition_dates(root) if date < cutoff]
+    for date in deleted:
+        shutil.rmtree(os.path.join(root, f"date={date}"))
+    return deleted
+
+
+def compact_partitions(root: str, today: datetime | None = None) -> list[str]:
+    """Rewrite every closed date partition with several files as a single file.
+
+    Today's partition is still written to and left alone. The compacted file
+    is in place before the parts are deleted, so an interrupted compaction
+    leaves duplicate rows rather than losing any. Returns the compacted dates.
+    """
+    today = f"{today or _utc_today():{DATE_FORMAT}}"
+    compacted = []
+    for date in partition_dates(root):
+        directory = os.path.join(root, f"date={date}")
+        parts = sorted(f for f in os.listdir(directory) if f.endswith(".parquet"))
+        if date >= today or len(parts) < 2:
+            continue
+        table = pa.concat_tables(
+            [pq.read_table(os.path.join(directory, f)) for f in parts], promote_options="default"
+        )
+        # Files starting with "_" are not picked up by dataset reads
+        tmp_path = os.path.join(directory, "_compacted.tmp")
+        pq.write_table(table, tmp_path, compression="zstd")
+        os.replace(tmp_path, os.path.join(directory, f"compacted-{uuid.uuid4().hex}.parquet"))
+        for f in parts:
+            os.remove(os.path.join(directory, f))
+        compacted.append(date)
+    return compacted
+
+
+def prune_files(directory: str, suffix: str, keep_days: int) -> int:
+    """Delete files ending in ``suffix`` not modified in ``keep_days``; returns how many."""
+    if not os.path.isdir(directory):
+        return 0
+    cutoff = time.time() - keep_days * 86400
+    deleted = 0
+    for name in os.listdir(directory):
+        path = os.path.join(directory, name)
+        if name.endswith(suffix) and os.path.isfile(path) and os.path.getmtime(path) < cutoff:
+            os.remove(path)
+            deleted += 1
+    return deleted
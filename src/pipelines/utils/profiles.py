@@ -0,0 +1,121 @@
+import json
+import os
+import time
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+from utils.drift import DEFAULT_BINS, ColumnHistograms
+
+PROFILE_ARTIFACT = "reference_profile.json"
+# Model version tag pointing to the profile artifact in the version's run
+PROFILE_TAG = "reference_profile"
+
+
+@dataclass
+class ReferenceProfile:
+    """Compact summary of a model's reference data for drift detection.
+
+    Holds, per column, the reference-quantile bin edges (a quantile sketch),
+    bin counts, moments and missing counts, plus a small uniform row sample
+    for the optional Evidently detail report. Monitoring compares current
+    data against it without touching the raw reference data.
+    """
+
+    sketch: ColumnHistograms
+    sample: pd.DataFrame
+    model_name: str | None = None
+    model_version: str | None = None
+    created_at: float = field(default_factory=time.time)
+
+    @property
+    def columns(self) -> list[str]:
+        return self.sketch.columns
+
+    @property
+    def rows(self) -> int:
+        return int(self.sketch.total.max(initial=0))
+
+    def to_dict(self) -> dict:
+        return {
+            "model_name": self.model_name,
+            "model_version": self.model_version,
+            "created_at": self.created_at,
+            "sketch": self.sketch.to_dict(),
+            "sample": self.sample.to_dict(orient="list"),
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "ReferenceProfile":
+        return cls(
+            sketch=ColumnHistograms.from_dict(data["sketch"]),
+            sample=pd.DataFrame(data["sample"]),
+            model_name=data.get("model_name"),
+            model_version=data.get("model_version"),
+            created_at=data.get("created_at", 0.0),
+        )
+
+
+def build_profile(
+    data: pd.DataFrame | np.ndarray,
+    columns: list[str],
+    n_bins: int = DEFAULT_BINS,
+    sample_rows: int = 5_000,
+    seed: int = 0,
+    **metadata,
+) -> ReferenceProfile:
+    """Profile reference rows; ``data`` is a frame or a ``[n_rows, n_columns]`` matrix."""
+    X = data[columns].to_numpy(dtype=np.float64) if isinstance(data, pd.DataFrame) else data
+    rng = np.random.default_rng(seed)
+    rows = rng.choice(len(X), size=min(sample_rows, len(X)), replace=False)
+    return ReferenceProfile(
+        sketch=ColumnHistograms.from_reference(columns, X, n_bins),
+        sample=pd.DataFrame(X[np.sort(rows)], columns=columns),
+        **metadata,
+    )
+
+
+def save_profile(profile: ReferenceProfile, path: str) -> None:
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(profile.to_dict(), f)
+    os.replace(tmp_path, path)
+
+
+def load_profile(path: str) -> ReferenceProfile | None:
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return ReferenceProfile.from_dict(json.load(f))
+
+
+def log_profile(client, name: str, version: str, run_id: str, profile: ReferenceProfile) -> None:
+    """Store a profile in the run of a registered model version and tag the version."""
+    client.log_dict(run_id, profile.to_dict(), PROFILE_ARTIFACT)
+    client.set_model_version_tag(name, version, PROFILE_TAG, PROFILE_ARTIFACT)
+
+
+def load_registered_profile(
+    client, name: str, alias: str = "champion", cache_dir: str | None = None
+) -> ReferenceProfile | None:
+    """Load the profile stored with the model version behind ``alias``, if it has one.
+
+    With ``cache_dir``, a downloaded profile is kept there per name and
+    version, and only the alias is resolved on later calls.
+    """
+    import tempfile
+
+    version = client.get_model_version_by_alias(name, alias)
+    artifact = version.tags.get(PROFILE_TAG)
+    if not artifact:
+        return None
+    cached = os.path.join(cache_dir, f"{name}-v{version.version}.json") if cache_dir else None
+    if cached and os.path.exists(cached):
+        return load_profile(cached)
+    with tempfile.TemporaryDirectory() as tmp:
+        profile = load_profile(client.download_artifacts(version.run_id, artifact, tmp))
+    if cached and profile is not None:
+        save_profile(profile, cached)
+    return profile
@@ -0,0 +1,347 @@
+import cProfile
+import functools
+import inspect
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+
+from utils.startup import step_started
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def current_rss() -> int | None:
+    """Resident set size of this process in bytes, where /proc provides it."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def max_rss() -> int:
+    """Peak resident set size of this process since it started, in bytes."""
+    if resource is None:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def children_cpu_seconds() -> float:
+    """CPU time of terminated child processes, e.g. a shut down process pool."""
+    if resource is None:
+        return 0.0
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+def _fold(frame, thread_name: str) -> str:
+    """One stack as a line of the folded format of flamegraph.pl, root first."""
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    names.append(thread_name)
+    return ";".join(reversed(names))
+
+
+class _Sampler(threading.Thread):
+    """Background thread that tracks the peak RSS and optionally samples all stacks."""
+
+    def __init__(self, interval: float, sample_stacks: bool):
+        super().__init__(name="step-profiler", daemon=True)
+        self.interval = interval
+        self.stacks = Counter() if sample_stacks else None
+        self.peak_rss = current_rss() or 0
+        self._done = threading.Event()
+
+    def run(self) -> None:
+        own = threading.get_ident()
+        while not self._done.wait(self.interval):
+            rss = current_rss()
+            if rss is not None and rss > self.peak_rss:
+                self.peak_rss = rss
+            if self.stacks is None:
+                continue
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident != own:
+                    self.stacks[_fold(frame, names.get(ident, str(ident)))] += 1
+
+    def stop(self) -> None:
+        self._done.set()
+        self.join()
+
+
+class _CountedClient:
+    """Proxy that counts and times every method call of a client."""
+
+    def __init__(self, client, prefix: str, profiler: "StepProfiler"):
+        self._client = client
+        self._prefix = prefix
+        self._profiler = profiler
+
+    def __getattr__(self, name):
+        attribute = getattr(self._client, name)
+        if not callable(attribute):
+            return attribute
+        return self._profiler.counted(attribute, f"{self._prefix}.{name}")
+
+
+class StepProfiler:
+    """Resource usage and timeline of one step run.
+
+    Records wall and CPU time, the peak RSS of the process, named phases,
+    per-station sub-timings and the count and time of external calls. On
+    exit, totals are logged as ``profile.<step>.*`` metrics to the active
+    MLflow run, if any, and the full timeline is written as JSON to
+    ``output_dir``. Its ``traceEvents`` open in Perfetto or chrome://tracing.
+
+    ``mode`` additionally profiles the step: "sample" writes the stacks of
+    all threads, sampled every ``sample_interval`` seconds, in the folded
+    format of flamegraph.pl and speedscope; "cprofile" writes cProfile stats
+    of the step's own thread (snakeviz, flameprof). Calls and RSS of process
+    pool workers are not seen, their CPU time is reported once the pool is
+    shut down.
+    """
+
+    def __init__(
+        self,
+        step: str,
+        output_dir: str,
+        mode: str | None = None,
+        sample_interval: float = 0.01,
+    ):
+        self.step = step
+        self.output_dir = output_dir
+        self.mode = mode
+        self.sample_interval = sample_interval
+        self.phases: dict[str, float] = defaultdict(float)
+        self.stations: dict[str, dict[str, float]] = defaultdict(dict)
+        self.calls: dict[str, list] = defaultdict(lambda: [0, 0.0])
+        self.events: list[dict] = []
+        self.summary: dict = {}
+        self._lock = threading.Lock()
+
+    def _offset(self, start: float) -> float:
+        """Microseconds from the start of the step, the time unit of trace events."""
+        return round((start - self._start) * 1e6, 1)
+
+    def _event(self, name: str, category: str, start: float, seconds: float, **args) -> None:
+        self.events.append(
+            {
+                "name": name,
+                "cat": category,
+                "ph": "X",
+                "ts": self._offset(start),
+                "dur": round(seconds * 1e6, 1),
+                "pid": os.getpid(),
+                "tid": threading.get_ident(),
+                "args": args,
+            }
+        )
+
+    @contextmanager
+    def phase(self, name: str):
+        """Time a named section of the step, e.g. reading, fitting or registering."""
+        start, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            cpu_seconds = time.process_time() - cpu
+            with self._lock:
+                self.phases[name] += seconds
+                self._event(name, "phase", start, seconds, cpu_seconds=round(cpu_seconds, 6))
+
+    def station(self, phase: str, station: str, seconds: float) -> None:
+        """Record the time one station took in ``phase``, measured by the caller."""
+        with self._lock:
+            self.stations[phase][station] = self.stations[phase].get(station, 0.0) + seconds
+            self._event(f"{phase}:{station}", "station", time.perf_counter() - seconds, seconds)
+
+    def counted(self, fn, name: str | None = None):
+        """Wrap ``fn`` so that every call is counted and timed as an external call."""
+        name = name or getattr(fn, "__name__", repr(fn))
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                seconds = time.perf_counter() - start
+                with self._lock:
+                    call = self.calls[name]
+                    call[0] += 1
+                    call[1] += seconds
+
+        return wrapper
+
+    def client(self, client, prefix: str):
+        """Return ``client`` with every method call counted as ``<prefix>.<method>``."""
+        return _CountedClient(client, prefix, self)
+
+    def __enter__(self) -> "StepProfiler":
+        self.started_at = datetime.now().astimezone()
+        self._children_cpu = children_cpu_seconds()
+        self._sampler = _Sampler(
+            self.sample_interval if self.mode == "sample" else 0.1, self.mode == "sample"
+        )
+        self._sampler.start()
+        self._cprofile = cProfile.Profile() if self.mode == "cprofile" else None
+        self._start, self._cpu = time.perf_counter(), time.process_time()
+        if self._cprofile is not None:
+            self._cprofile.enable()
+        return self
+
+    def __exit__(self, exc_type, *exc) -> None:
+        if self._cprofile is not None:
+            self._cprofile.disable()
+        wall = time.perf_counter() - self._start
+        cpu = time.process_time() - self._cpu
+        self._sampler.stop()
+        self.summary = {
+            "wall_seconds": wall,
+            "cpu_seconds": cpu,
+            "children_cpu_seconds": children_cpu_seconds() - self._children_cpu,
+            "peak_rss_mb": max(self._sampler.peak_rss, current_rss() or 0) / 2**20,
+            "process_peak_rss_mb": max_rss() / 2**20,
+        }
+        self._event(self.step, "step", self._start, wall, failed=exc_type is not None)
+        try:
+            self._write()
+            self._log_metrics()
+        except Exception as e:
+            # Instrumentation must not fail the step it measures
+            logger.warning(f"Could not record the profile of {self.step}: {e}")
+        logger.info(
+            f"Profile of {self.step}: {wall:.2f}s wall, {cpu:.2f}s CPU, "
+            f"peak RSS {self.summary['peak_rss_mb']:.0f} MB, "
+            f"{sum(count for count, _ in self.calls.values())} external calls"
+        )
+
+    def timeline(self) -> dict:
+        return {
+            "step": self.step,
+            "started_at": self.started_at.isoformat(),
+            "summary": self.summary,
+            "phases": dict(self.phases),
+            "stations": {phase: dict(times) for phase, times in self.stations.items()},
+            "calls": {
+                name: {"count": count, "seconds": seconds}
+                for name, (count, seconds) in sorted(self.calls.items())
+            },
+            "traceEvents": sorted(self.events, key=lambda event: event["ts"]),
+        }
+
+    def _write(self) -> None:
+        os.makedirs(self.output_dir, exist_ok=True)
+        base = os.path.join(self.output_dir, f"{self.step}_{self.started_at:%Y%m%d_%H%M%S}")
+        with open(f"{base}.json.tmp", "w") as f:
+            json.dump(self.timeline(), f, indent=1)
+        os.replace(f"{base}.json.tmp", f"{base}.json")
+        self.paths = [f"{base}.json"]
+        if self._cprofile is not None:
+            self._cprofile.dump_stats(f"{base}.prof")
+            self.paths.append(f"{base}.prof")
+        elif self._sampler.stacks:
+            with open(f"{base}.folded", "w") as f:
+                f.writelines(f"{stack} {count}\n" for stack, count in self._sampler.stacks.items())
+            self.paths.append(f"{base}.folded")
+        logger.info(f"Wrote the profile of {self.step} to {', '.join(self.paths)}")
+
+    def metrics(self) -> dict[str, float]:
+        prefix = f"profile.{self.step}"
+        metrics = {f"{prefix}.{name}": float(value) for name, value in self.summary.items()}
+        for name, seconds in self.phases.items():
+            metrics[f"{prefix}.phase.{name}_seconds"] = seconds
+        # Per-station times are summarised, the timeline has every station
+        for phase, times in self.stations.items():
+            values = sorted(times.values())
+            metrics[f"{prefix}.stations.{phase}.count"] = float(len(values))
+            metrics[f"{prefix}.stations.{phase}.mean_seconds"] = sum(values) / len(values)
+            metrics[f"{prefix}.stations.{phase}.max_seconds"] = values[-1]
+        for name, (count, seconds) in self.calls.items():
+            metrics[f"{prefix}.calls.{name}.count"] = float(count)
+            metrics[f"{prefix}.calls.{name}.seconds"] = seconds
+        return metrics
+
+    def _log_metrics(self) -> None:
+        # A step without a tracked run does not import MLflow just for this
+        mlflow = sys.modules.get("mlflow")
+        if mlflow is None or mlflow.active_run() is None:
+            logger.info(f"No MLflow run for {self.step}, its profile is only written to {self.output_dir}")
+            return
+        mlflow.log_metrics(self.metrics())
+        for path in self.paths:
+            mlflow.log_artifact(path, "profiles")
+
+
+class _NullProfiler:
+    """Stand-in while no step is profiled; every hook is a no-op."""
+
+    def phase(self, name: str):
+        return nullcontext()
+
+    def station(self, phase: str, station: str, seconds: float) -> None:
+        pass
+
+    def counted(self, fn, name: str | None = None):
+        return fn
+
+    def client(self, client, prefix: str):
+        return client
+
+
+_NULL = _NullProfiler()
+# Steps of a pipeline run one at a time in a process, and their pool threads
+# must see the profiler too, so the active one is a plain module global
+_active: StepProfiler | None = None
+
+
+def active_profiler() -> StepProfiler | _NullProfiler:
+    """The profiler of the running step, or a no-op one if it is not profiled."""
+    return _active or _NULL
+
+
+def profile_step(fn):
+    """Profile a step whose ``config`` argument opts in with ``config.profiling``.
+
+    Goes below ``@step``. The step reports its start for
+    ``run.py --profile-startup`` either way; with ``config.profile_step``
+    naming it, it is also profiled in ``config.profile_mode``.
+    """
+    signature = inspect.signature(fn)
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        global _active
+        step_started(fn.__name__)
+        config = signature.bind(*args, **kwargs).arguments["config"]
+        if not config.profiling:
+            return fn(*args, **kwargs)
+        mode = config.profile_mode if config.profile_step == fn.__name__ else None
+        _active = StepProfiler(fn.__name__, config.profile_dir, mode)
+        try:
+            with _active:
+                return fn(*args, **kwargs)
+        finally:
+            _active = None
+
+    return wrapper
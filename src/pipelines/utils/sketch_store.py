@@ -0,0 +1,112 @@
+import hashlib
+import json
+import os
+from datetime import datetime
+from functools import reduce
+
+import numpy as np
+import pandas as pd
+
+from utils.drift import ColumnHistograms
+
+HOUR_FORMAT = "%Y-%m-%dT%H"
+# Bumped when the layout of an hour's file changes; 2 added station sketches
+SKETCH_FORMAT = 2
+
+
+def sketch_key(source: str, references: list[ColumnHistograms], by_station: bool = False) -> str:
+    """Identify the current data source and the columns and bin edges of its sketches.
+
+    Sketches only merge over the same edges, so a new reference profile
+    starts a new set of hourly sketches. Hours sketched without station
+    sketches, or in an older file format, are not reused either.
+    """
+    digest = hashlib.sha1(
+        json.dumps([SKETCH_FORMAT, source, by_station, *(r.columns for r in references)]).encode()
+    )
+    for reference in references:
+        digest.update(np.ascontiguousarray(reference.edges).tobytes())
+    return digest.hexdigest()[:16]
+
+
+class HourlySketchStore:
+    """Histogram sketches of current data, one JSON file per closed hour.
+
+    An hour holds the sketch of all rows and one sketch per station. Files
+    live in ``<root>/<key>/`` where ``key`` identifies the reference edges.
+    A stored hour is final; windows are the merge of their hours.
+    """
+
+    def __init__(self, root: str, key: str):
+        self.directory = os.path.join(root, key)
+
+    def path(self, hour: pd.Timestamp) -> str:
+        return os.path.join(self.directory, f"hour={hour:{HOUR_FORMAT}}.json")
+
+    def load(
+        self, hour: pd.Timestamp
+    ) -> tuple[ColumnHistograms, dict[str, ColumnHistograms]] | None:
+        """Return the hour's sketch and station sketches, or None if it has none yet.
+
+        A file of an older format counts as missing, so the hour is sketched again.
+        """
+        path = self.path(hour)
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            data = json.load(f)
+        if data.get("format") != SKETCH_FORMAT:
+            return None
+        stations = {
+            station: ColumnHistograms.from_dict(sketch)
+            for station, sketch in data["stations"].items()
+        }
+        return ColumnHistograms.from_dict(data["sketch"]), stations
+
+    def save(
+        self,
+        hour: pd.Timestamp,
+        sketch: ColumnHistograms,
+        stations: dict[str, ColumnHistograms],
+    ) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.path(hour)
+        data = {
+            "format": SKETCH_FORMAT,
+            "sketch": sketch.to_dict(),
+            "stations": {station: s.to_dict() for station, s in stations.items()},
+        }
+        with open(f"{path}.tmp", "w") as f:
+            json.dump(data, f)
+        os.replace(f"{path}.tmp", path)
+
+    def hours(self) -> list[pd.Timestamp]:
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(
+            pd.Timestamp(datetime.strptime(name[len("hour="):-len(".json")], HOUR_FORMAT))
+            for name in os.listdir(self.directory)
+            if name.startswith("hour=") and name.endswith(".json")
+        )
+
+    def prune(self, before: pd.Timestamp) -> int:
+        """Delete sketches of hours before ``before``. Returns how many were deleted."""
+        old = [hour for hour in self.hours() if hour < before]
+        for hour in old:
+            os.remove(self.path(hour))
+        return len(old)
+
+
+def merge_sketches(sketches: list[ColumnHistograms]) -> ColumnHistograms:
+    return reduce(lambda a, b: a.merge(b), sketches)
+
+
+def merge_station_sketches(
+    hours: list[dict[str, ColumnHistograms]],
+) -> dict[str, ColumnHistograms]:
+    """Merge per-station sketches of several hours; a station may miss from some."""
+    merged: dict[str, ColumnHistograms] = {}
+    for stations in hours:
+        for station, sketch in stations.items():
+            merged[station] = merged[station].merge(sketch) if station in merged else sketch
+    return merged
@@ -0,0 +1,218 @@
+import fnmatch
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Iterator
+
+import numpy as np
+import pandas as pd
+
+from utils.station_store import SOURCE_EXTENSIONS, iter_source_chunks
+
+logger = logging.getLogger(__name__)
+
+
+class FileSource:
+    """A CSV or Parquet file in the source directory.
+
+    Files cannot be queried by time, so the whole file is read and rows
+    outside the requested window are dropped by the loader.
+    """
+
+    def __init__(self, source_id: str, path: str):
+        self.source_id = source_id
+        self.path = path
+
+    def iter_chunks(
+        self,
+        chunk_size: int,
+        start: pd.Timestamp | None = None,
+        end: pd.Timestamp | None = None,
+    ) -> Iterator[pd.DataFrame]:
+        return iter_source_chunks(self.path, chunk_size)
+
+
+class StubSource:
+    """Local stand-in for a remote source that answers after ``latency`` seconds.
+
+    Serves the last ``rows`` hours of measurements for a single station named
+    after the source, restricted to ``[start, end)`` like a remote API would,
+    sleeping ``latency`` seconds before every chunk.
+    """
+
+    def __init__(self, source_id: str, rows: int = 1000, latency: float = 0.5, seed: int = 0):
+        self.source_id = source_id
+        self.rows = rows
+        self.latency = latency
+        self.seed = seed
+
+    def iter_chunks(
+        self,
+        chunk_size: int,
+        start: pd.Timestamp | None = None,
+        end: pd.Timestamp | None = None,
+    ) -> Iterator[pd.DataFrame]:
+        rng = np.random.default_rng(self.seed)
+        now = pd.Timestamp.now(tz="UTC").floor("h")
+        timestamps = pd.date_range(now - pd.Timedelta(hours=self.rows - 1), now, freq="h")
+        if start is not None:
+            timestamps = timestamps[timestamps >= start]
+        if end is not None:
+            timestamps = timestamps[timestamps < end]
+        for offset in range(0, len(timestamps), chunk_size):
+            time.sleep(self.latency)
+            n = min(chunk_size, len(timestamps) - offset)
+            yield pd.DataFrame(
+                {
+                    "timestamp": timestamps[offset : offset + n],
+                    "temperature": rng.normal(20, 5, n),
+                    "humidity": rng.normal(65, 10, n),
+                    "pressure": rng.normal(1013, 5, n),
+                    "wind_speed": rng.normal(5, 2, n),
+                }
+            )
+
+
+def discover_sources(
+    source_dir: str,
+    pattern: str,
+    stub_sources: list[str] | None = None,
+    stub_rows: int = 1000,
+    stub_latency: float = 0.5,
+) -> dict:
+    """Expand ``pattern`` to the file and stub sources it matches, keyed by id."""
+    sources = {}
+    if os.path.isdir(source_dir):
+        for name in sorted(os.listdir(source_dir)):
+            source_id, extension = os.path.splitext(name)
+            if extension in SOURCE_EXTENSIONS and fnmatch.fnmatch(source_id, pattern):
+                sources[source_id] = FileSource(source_id, os.path.join(source_dir, name))
+    for i, source_id in enumerate(stub_sources or []):
+        if fnmatch.fnmatch(source_id, pattern):
+            sources[source_id] = StubSource(source_id, stub_rows, stub_latency, seed=i)
+    return sources
+
+
+class SourceState:
+    """Last successful fetch time and high-water mark per source, in a JSON file.
+
+    The high-water mark is the newest timestamp ingested from a source; the
+    next run only asks the source for rows after it. Updates are written to a
+    temporary file and renamed into place, so a crash never leaves a
+    half-written state file behind.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._sources: dict[str, dict] = {}
+        if os.path.exists(path):
+            try:
+                with open(path) as f:
+                    self._sources = {
+                        # Older state files only held the last fetch time
+                        k: v if isinstance(v, dict) else {"last_fetch": float(v)}
+                        for k, v in json.load(f).items()
+                    }
+            except (OSError, ValueError) as e:
+                logger.warning(f"Ignoring unreadable source state {path}: {e}")
+
+    def remaining(self, source_id: str, cooldown_seconds: float, now: float | None = None) -> float:
+        """Seconds until ``source_id`` may be fetched again, 0 if it may be fetched now."""
+        last = self._sources.get(source_id, {}).get("last_fetch")
+        if last is None:
+            return 0.0
+        now = time.time() if now is None else now
+        return max(0.0, last + cooldown_seconds - now)
+
+    def watermark(self, source_id: str) -> pd.Timestamp | None:
+        value = self._sources.get(source_id, {}).get("watermark")
+        return pd.Timestamp(value) if value else None
+
+    def record(self, results: list["FetchResult"]) -> None:
+        """Store the successful fetches among ``results``. High-water marks never move backwards."""
+        with self._lock:
+            for result in results:
+                if result.status != "loaded":
+                    continue
+                entry = self._sources.setdefault(result.source_id, {})
+                entry["last_fetch"] = result.fetched_at
+                previous = self.watermark(result.source_id)
+                if result.watermark is not None and (previous is None or result.watermark > previous):
+                    entry["watermark"] = result.watermark.isoformat()
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(self._sources, f, indent=2, sort_keys=True)
+            os.replace(tmp_path, self.path)
+
+
+@dataclass
+class FetchResult:
+    source_id: str
+    status: str  # "loaded", "skipped" or "failed"
+    rows: int = 0
+    chunks: int = 0
+    seconds: float = 0.0
+    watermark: pd.Timestamp | None = None
+    fetched_at: float | None = None
+    detail: str = ""
+
+
+def fetch_sources(
+    sources: dict,
+    fetch_fn: Callable[[object], tuple[int, int, pd.Timestamp | None]],
+    state: SourceState,
+    cooldown_seconds: float,
+    workers: int = 4,
+) -> list[FetchResult]:
+    """Fetch all sources outside their cooldown window on a bounded thread pool.
+
+    ``fetch_fn(source)`` loads one source and returns ``(rows, chunks,
+    watermark)``. ``state`` is only read here: the caller passes the results
+    to :meth:`SourceState.record` once the loaded rows are committed, so a
+    crash in between leaves the high-water marks where they were and the
+    rows are fetched again. Failed sources are retried on the next run.
+    Results are returned in ``sources`` order.
+    """
+    now = time.time()
+    results: dict[str, FetchResult] = {}
+    due = {}
+    for source_id, source in sources.items():
+        remaining = state.remaining(source_id, cooldown_seconds, now)
+        if remaining > 0:
+            results[source_id] = FetchResult(
+                source_id, "skipped", detail=f"cooling down for {remaining:.0f}s"
+            )
+        else:
+            due[source_id] = source
+
+    def _fetch(source) -> FetchResult:
+        started_at = time.time()
+        start = time.perf_counter()
+        rows, chunks, watermark = fetch_fn(source)
+        return FetchResult(
+            source.source_id,
+            "loaded",
+            rows,
+            chunks,
+            time.perf_counter() - start,
+            watermark,
+            fetched_at=started_at,
+        )
+
+    if due:
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+            futures = {source_id: executor.submit(_fetch, s) for source_id, s in due.items()}
+            for source_id, future in futures.items():
+                try:
+                    results[source_id] = future.result()
+                except Exception as e:
+                    logger.error(f"Failed to fetch source {source_id}: {str(e)}")
+                    results[source_id] = FetchResult(source_id, "failed", detail=str(e))
+    return [results[source_id] for source_id in sources]
@@ -0,0 +1,23 @@
+import os
+import sys
+import time
+
+# Set by ``run.py --profile-startup`` to the launch time of the profiled run
+LAUNCH_TIME_ENV = "PIPELINE_LAUNCH_TIME"
+FIRST_STEP_MARKER = "[startup] first step"
+
+_reported = False
+
+
+def step_started(name: str) -> None:
+    """Report the wall time from launch to the first step of a profiled run.
+
+    A no-op unless the run was started with ``run.py --profile-startup``;
+    only the first step of the process reports.
+    """
+    global _reported
+    launched = os.environ.get(LAUNCH_TIME_ENV)
+    if launched is None or _reported:
+        return
+    _reported = True
+    print(f"{FIRST_STEP_MARKER} {name} {time.time() - float(launched):.3f}", file=sys.stderr, flush=True)
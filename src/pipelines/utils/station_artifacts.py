@@ -0,0 +1,73 @@
+from collections.abc import Mapping
+from typing import Callable, Iterable
+
+import numpy as np
+import pandas as pd
+
+from utils.linear import MockModel
+
+
+class StationFrames(Mapping):
+    """Per-station DataFrames whose frames may be loaded on first access.
+
+    Built either from frames in memory or from station ids and a
+    ``load_fn(station)``; a lazily loaded frame is read once and kept.
+    """
+
+    def __init__(
+        self,
+        frames: dict[str, pd.DataFrame] | None = None,
+        stations: Iterable[str] | None = None,
+        load_fn: Callable[[str], pd.DataFrame] | None = None,
+    ):
+        self._frames = dict(frames or {})
+        # Ordered like a list, with constant-time membership
+        self._stations = dict.fromkeys(self._frames if stations is None else stations)
+        self._load_fn = load_fn
+
+    def __getitem__(self, station: str) -> pd.DataFrame:
+        frame = self._frames.get(station)
+        if frame is None:
+            if self._load_fn is None or station not in self._stations:
+                raise KeyError(station)
+            frame = self._frames[station] = self._load_fn(station)
+        return frame
+
+    def __iter__(self):
+        return iter(self._stations)
+
+    def __len__(self) -> int:
+        return len(self._stations)
+
+    def __contains__(self, station) -> bool:
+        return station in self._stations
+
+
+class StationModels(dict):
+    """Linear station models keyed by station id, packable into one array."""
+
+    def pack(self) -> tuple[np.ndarray, list[dict]]:
+        """Return ``[n_stations, n_features + 1]`` weights (bias last) and per-model info."""
+        stations = list(self)
+        if not stations:
+            return np.empty((0, 0)), []
+        weights = np.empty((len(stations), len(self[stations[0]].coefficients) + 1))
+        info = []
+        for i, station in enumerate(stations):
+            model = self[station]
+            if not isinstance(model, MockModel):
+                raise TypeError(f"Model of station {station} is not a linear station model")
+            weights[i, :-1] = model.coefficients
+            weights[i, -1] = model.bias
+            info.append({"station": station, "model_params": model.model_params})
+        return weights, info
+
+    @classmethod
+    def unpack(cls, weights: np.ndarray, info: list[dict]) -> "StationModels":
+        return cls(
+            (
+                entry["station"],
+                MockModel(entry["station"], entry["model_params"], row[:-1], float(row[-1])),
+            )
+            for row, entry in zip(weights, info)
+        )
@@ -0,0 +1,309 @@
+import json
+import os
+import re
+import shutil
+import threading
+import time
+import uuid
+from typing import Iterator
+
+import numpy as np
+import pandas as pd
+
+# Columns every normalized chunk carries, in this order
+STORE_COLUMNS = [
+    "timestamp",
+    "station_id",
+    "temperature",
+    "humidity",
+    "pressure",
+    "wind_speed",
+]
+SOURCE_EXTENSIONS = (".csv", ".parquet")
+# Every row carries the store version of the load that appended it
+VERSION_COLUMN = "ingest_version"
+MANIFEST_FILE = "_manifest.json"
+# Chunks of a source are staged here, per load version, until its fetch has
+# succeeded; dataset reads skip paths starting with "_"
+STAGING_DIR = "_staging"
+# Staged chunks of an uncommitted version untouched for this long belong to
+# a load that died, not to one still running
+STALE_STAGING_SECONDS = 24 * 3600
+
+
+def iter_source_chunks(path: str, chunk_size: int) -> Iterator[pd.DataFrame]:
+    """Yield a CSV or Parquet source as frames of at most ``chunk_size`` rows.
+
+    CSV files are read with pandas' chunked reader and Parquet files batch by
+    batch across row groups, so only one chunk is in memory at a time.
+    """
+    if path.endswith(".csv"):
+        with pd.read_csv(path, chunksize=chunk_size) as reader:
+            yield from reader
+    elif path.endswith(".parquet"):
+        import pyarrow.parquet as pq
+
+        parquet_file = pq.ParquetFile(path)
+        for batch in parquet_file.iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+    else:
+        raise ValueError(f"Unsupported source format: {path}")
+
+
+def normalize_chunk(chunk: pd.DataFrame, source_id: str) -> pd.DataFrame:
+    """Bring a raw source chunk to the store schema.
+
+    Column names are lower-cased, timestamps parsed to UTC, measurements cast
+    to float64 and rows without a timestamp dropped. Sources without a
+    ``station_id`` column are treated as a single station named after the source.
+    """
+    chunk = chunk.rename(columns=str.lower)
+    if "station_id" not in chunk:
+        chunk["station_id"] = source_id
+    chunk["timestamp"] = pd.to_datetime(chunk["timestamp"], utc=True, errors="coerce")
+    chunk = chunk.dropna(subset=["timestamp", "station_id"])
+    for column in STORE_COLUMNS[2:]:
+        if column in chunk:
+            chunk[column] = pd.to_numeric(chunk[column], errors="coerce").astype(np.float64)
+        else:
+            chunk[column] = np.nan
+    chunk["station_id"] = chunk["station_id"].astype(str)
+    return chunk[STORE_COLUMNS]
+
+
+def append_to_store(chunk: pd.DataFrame, storage_dir: str, version: int = 0) -> int:
+    """Append a normalized chunk to the store partitioned by station and date.
+
+    Every call writes new files (``station_id=<id>/date=<YYYY-MM-DD>/``), so
+    appends never rewrite existing data. Rows are stamped with ``version``.
+    Returns the number of rows written.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    if chunk.empty:
+        return 0
+    chunk = chunk.assign(
+        **{
+            VERSION_COLUMN: np.int64(version),
+            "date": chunk["timestamp"].dt.strftime("%Y-%m-%d"),
+        }
+    )
+    pq.write_to_dataset(
+        pa.Table.from_pandas(chunk, preserve_index=False),
+        storage_dir,
+        partition_cols=["station_id", "date"],
+        basename_template=f"part-{uuid.uuid4().hex}-{{i}}.parquet",
+        existing_data_behavior="overwrite_or_ignore",
+        compression="zstd",
+    )
+    return len(chunk)
+
+
+def staging_dir(storage_dir: str, version: int, source_id: str | None = None) -> str:
+    """Staging directory of a load version, or of one of its sources."""
+    directory = os.path.join(storage_dir, STAGING_DIR, f"v{version}")
+    return os.path.join(directory, source_id) if source_id is not None else directory
+
+
+def prune_staging(
+    storage_dir: str,
+    committed: set[int],
+    before_version: int,
+    stale_seconds: float = STALE_STAGING_SECONDS,
+) -> list[int]:
+    """Delete staged chunks of loads that died before committing; returns their versions.
+
+    Only versions below ``before_version`` that are not in ``committed`` and
+    whose staged files were not written to in ``stale_seconds`` are deleted,
+    so concurrent loads keep theirs.
+    """
+    root = os.path.join(storage_dir, STAGING_DIR)
+    cutoff = time.time() - stale_seconds
+    pruned = []
+    for name in _listdir(root):
+        # Also matches the older v<version>-<source> layout
+        match = re.match(r"v(\d+)(?:-|$)", name)
+        if match is None:
+            continue
+        version = int(match.group(1))
+        path = os.path.join(root, name)
+        if version >= before_version or version in committed or _last_modified(path) > cutoff:
+            continue
+        shutil.rmtree(path, ignore_errors=True)
+        pruned.append(version)
+    return sorted(pruned)
+
+
+def _last_modified(path: str) -> float:
+    """Newest modification time of ``path`` and everything below it."""
+    newest = os.path.getmtime(path)
+    for directory, _, files in os.walk(path):
+        for name in [".", *files]:
+            try:
+                newest = max(newest, os.path.getmtime(os.path.join(directory, name)))
+            except FileNotFoundError:
+                pass
+    return newest
+
+
+def publish_staged(staged: str, storage_dir: str) -> int:
+    """Move the files of a staged load into the store; returns how many were moved.
+
+    Files keep their ``station_id=/date=`` partition path. Each move is a
+    rename within the store, so readers see a file either whole or not at all.
+    """
+    moved = 0
+    for directory, _, files in os.walk(staged):
+        target = os.path.join(storage_dir, os.path.relpath(directory, staged))
+        for name in files:
+            os.makedirs(target, exist_ok=True)
+            os.replace(os.path.join(directory, name), os.path.join(target, name))
+            moved += 1
+    shutil.rmtree(staged, ignore_errors=True)
+    return moved
+
+
+class StoreManifest:
+    """Versions of the station store, kept in ``_manifest.json`` next to the data.
+
+    Every load run appends under a new version. The manifest records, per
+    version, the rows loaded per source and the span of dates they cover, so
+    readers asking for rows since a version only open the date partitions
+    that version range touched. Versions are allocated before a load starts
+    and never handed out twice, also when the load writes no rows or fails.
+    Rows written before the store had a manifest count as version 0.
+    """
+
+    def __init__(self, storage_dir: str):
+        self.path = os.path.join(storage_dir, MANIFEST_FILE)
+        self._lock = threading.Lock()
+        self.versions: list[dict] = []
+        self.next_version: int | None = None
+        if os.path.exists(self.path):
+            with open(self.path) as f:
+                data = json.load(f)
+            self.versions = data["versions"]
+            self.next_version = data.get("next_version")
+
+    @property
+    def latest_version(self) -> int:
+        return self.versions[-1]["version"] if self.versions else 0
+
+    def _save(self) -> None:
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"versions": self.versions, "next_version": self.next_version}, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def allocate(self) -> int:
+        """Reserve the version of a new load."""
+        with self._lock:
+            version = max(self.next_version or 0, self.latest_version + 1)
+            self.next_version = version + 1
+            self._save()
+        return version
+
+    def commit(
+        self,
+        version: int,
+        rows: dict[str, int],
+        min_date: str | None,
+        max_date: str | None,
+        backfill: bool = False,
+    ) -> None:
+        """Record a finished load. Versions without rows are not recorded."""
+        if not sum(rows.values()):
+            return
+        with self._lock:
+            self.versions.append(
+                {
+                    "version": version,
+                    "created_at": time.time(),
+                    "rows": rows,
+                    "min_date": min_date,
+                    "max_date": max_date,
+                    "backfill": backfill,
+                }
+            )
+            self._save()
+
+    def resolve(self, since_version: int | None) -> int:
+        """Turn a negative ``since_version`` into one relative to the latest version."""
+        if since_version is None:
+            return 0
+        if since_version < 0:
+            return max(0, self.latest_version + since_version)
+        return since_version
+
+    def date_span(self, since_version: int) -> tuple[str, str] | None:
+        """First and last date touched by versions after ``since_version``."""
+        newer = [v for v in self.versions if v["version"] > since_version and v["min_date"]]
+        if not newer:
+            return None
+        return min(v["min_date"] for v in newer), max(v["max_date"] for v in newer)
+
+
+def read_store(
+    storage_dir: str,
+    columns: list[str] | None = None,
+    since_version: int | None = None,
+    stations: list[str] | None = None,
+) -> pd.DataFrame:
+    """Read rows appended after ``since_version`` (all rows if None).
+
+    A negative ``since_version`` counts back from the latest version, so -1
+    returns only the rows of the most recent load. Station and date
+    partitions outside the request are pruned before any file is opened.
+    A row stored more than once, re-ingested by a backfill or appended again
+    by a load that was interrupted after publishing, is returned once, in
+    its latest version.
+    """
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+
+    manifest = StoreManifest(storage_dir)
+    since = manifest.resolve(since_version)
+    columns = list(columns or STORE_COLUMNS)
+    partitioning = ds.partitioning(
+        pa.schema([("station_id", pa.string()), ("date", pa.string())]), flavor="hive"
+    )
+    if since:
+        span = manifest.date_span(since)
+        if span is None:
+            return pd.DataFrame(columns=columns)
+        condition = (ds.field("date") >= span[0]) & (ds.field("date") <= span[1])
+        condition &= ds.field(VERSION_COLUMN) > since
+    elif any(name.startswith("station_id=") for name in _listdir(storage_dir)):
+        # The full history includes rows from before the manifest existed
+        condition = None
+    else:
+        return pd.DataFrame(columns=columns)
+
+    dataset = ds.dataset(storage_dir, format="parquet", partitioning=partitioning)
+    if VERSION_COLUMN not in dataset.schema.names:
+        # Files written before versioning have no version column, read it as null
+        dataset = ds.dataset(
+            storage_dir,
+            format="parquet",
+            partitioning=partitioning,
+            schema=dataset.schema.append(pa.field(VERSION_COLUMN, pa.int64())),
+        )
+    if stations is not None:
+        station_condition = ds.field("station_id").isin(list(stations))
+        condition = station_condition if condition is None else condition & station_condition
+
+    read_columns = list(dict.fromkeys(columns + ["station_id", "timestamp", VERSION_COLUMN]))
+    frame = dataset.to_table(columns=read_columns, filter=condition).to_pandas()
+    frame[VERSION_COLUMN] = frame[VERSION_COLUMN].fillna(0)
+    frame = (
+        frame.sort_values(VERSION_COLUMN, kind="stable")
+        .drop_duplicates(["station_id", "timestamp"], keep="last")
+        .sort_index()
+    )
+    return frame[columns].reset_index(drop=True)
+
+
+def _listdir(directory: str) -> list[str]:
+    return os.listdir(directory) if os.path.isdir(directory) else []
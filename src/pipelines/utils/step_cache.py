@@ -0,0 +1,130 @@
+import hashlib
+import inspect
+import json
+import logging
+import os
+import time
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def fingerprint(*parts) -> str:
+    """Hash JSON-compatible ``parts`` (config dumps, digests, ids) into a cache key."""
+    payload = json.dumps(parts, sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def code_fingerprint(*modules) -> str:
+    """Hash the source of ``modules``, so that a code change invalidates cached outputs."""
+    digest = hashlib.sha256()
+    for module in modules:
+        digest.update(inspect.getsource(module).encode())
+    return digest.hexdigest()
+
+
+def array_digest(*arrays: np.ndarray) -> str:
+    """Hash the contents of NumPy arrays."""
+    digest = hashlib.sha256()
+    for array in arrays:
+        array = np.ascontiguousarray(array)
+        digest.update(f"{array.dtype}{array.shape}".encode())
+        digest.update(array.data)
+    return digest.hexdigest()
+
+
+def file_signature(path: str, checksum: str = "stat") -> str:
+    """Identify a file's contents by size and modification time, or by a sha256 of them."""
+    if checksum == "sha256":
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+        return digest.hexdigest()
+    stat = os.stat(path)
+    return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+
+def timed_call(fn, *args, **kwargs):
+    """Return ``fn(*args, **kwargs)`` and its wall time; picklable for process pools."""
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+class StepCache:
+    """Opt-in cache of step outputs keyed by content fingerprints.
+
+    An entry is a small JSON payload (a handle, a version, model weights) in
+    ``<root>/<step>/<key>.json`` together with the seconds it took to compute,
+    which is what a hit is reported to save. A disabled cache misses always
+    and stores nothing.
+    """
+
+    def __init__(self, root: str, step: str, enabled: bool = True):
+        self.directory = os.path.join(root, step)
+        self.step = step
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self.saved_seconds = 0.0
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def _read(self, key: str) -> dict | None:
+        try:
+            with open(self._path(key)) as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def _hit(self, entry: dict) -> dict:
+        self.hits += 1
+        self.saved_seconds += entry["seconds"]
+        return entry["payload"]
+
+    def get(self, key: str, valid=None) -> dict | None:
+        """Return the payload stored under ``key``, or None on a miss.
+
+        ``valid(payload)`` can reject an entry whose output no longer exists.
+        """
+        if not self.enabled:
+            return None
+        entry = self._read(key)
+        if entry is None or (valid is not None and not valid(entry["payload"])):
+            self.misses += 1
+            return None
+        return self._hit(entry)
+
+    def get_many(self, keys: dict, valid=None) -> dict:
+        """Return the stored payloads of ``keys`` (name -> key) by name, leaving out misses.
+
+        ``valid(payloads)`` checks all found payloads at once, e.g. in one
+        registry query, and returns the names whose output still exists.
+        """
+        if not self.enabled:
+            return {}
+        entries = {name: entry for name, key in keys.items() if (entry := self._read(key)) is not None}
+        if valid is not None and entries:
+            kept = valid({name: entry["payload"] for name, entry in entries.items()})
+            entries = {name: entry for name, entry in entries.items() if name in kept}
+        self.misses += len(keys) - len(entries)
+        return {name: self._hit(entry) for name, entry in entries.items()}
+
+    def put(self, key: str, payload: dict, seconds: float) -> None:
+        if not self.enabled:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(key)
+        with open(f"{path}.tmp", "w") as f:
+            json.dump({"created_at": time.time(), "seconds": seconds, "payload": payload}, f)
+        os.replace(f"{path}.tmp", path)
+
+    def log_summary(self) -> None:
+        if self.enabled:
+            logger.info(
+                f"Step cache of {self.step}: {self.hits} hits, {self.misses} misses, "
+                f"saved ~{self.saved_seconds:.1f}s"
+            )
@@ -0,0 +1,168 @@
+import os
+import socket
+import time
+import uuid
+from typing import Iterable
+
+import numpy as np
+import pandas as pd
+from pydantic import BaseModel
+
+
+class TrainingDataHandle(BaseModel):
+    """Reference to training data written as an Arrow IPC file, passed between steps.
+
+    Rows are sorted by station and every record batch holds rows of a single
+    station, so a station's rows are one contiguous slice of the file. Only
+    this handle goes through the artifact store; consumers memory-map the
+    file and read the columns and stations they need.
+
+    ``path`` is a local path, so producer and consumers must share a
+    filesystem: true for the ``local`` stack, not for ``local_docker``, whose
+    steps run in separate containers unless ``training_data_dir`` is a
+    mounted volume.
+    """
+
+    path: str
+    # Host the file was written on, to explain a missing file
+    host: str = ""
+    columns: list[str]
+    stations: list[str]
+    # Row count and record batch indices of every station, in ``stations`` order
+    counts: list[int]
+    batches: list[list[int]]
+
+    @property
+    def num_rows(self) -> int:
+        return sum(self.counts)
+
+    def station_ids(self, stations: list[str] | None = None) -> pd.Categorical:
+        """Station id of every row read for ``stations``, without reading the column."""
+        index = self._station_index(stations)
+        codes = np.repeat(np.arange(len(index)), [self.counts[i] for i in index])
+        return pd.Categorical.from_codes(codes, categories=[self.stations[i] for i in index])
+
+    def _station_index(self, stations: list[str] | None) -> list[int]:
+        if stations is None:
+            return list(range(len(self.stations)))
+        wanted = set(stations)
+        return [i for i, station in enumerate(self.stations) if station in wanted]
+
+
+def write_training_data(
+    frames: Iterable[tuple[str, pd.DataFrame]],
+    directory: str,
+    columns: list[str],
+    max_batch_rows: int = 1_000_000,
+) -> TrainingDataHandle:
+    """Write per-station frames, in station order, to a new Arrow IPC file.
+
+    Args:
+        frames: ``(station, frame)`` pairs, sorted by station
+        directory: Directory the file is created in
+        columns: Columns to keep, ``station_id`` is implied by the batch layout
+        max_batch_rows: Stations with more rows are split across batches
+
+    Returns:
+        TrainingDataHandle: Handle of the written file
+    """
+    import pyarrow as pa
+
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(os.path.abspath(directory), f"training-{uuid.uuid4().hex}.arrow")
+    stations, counts, batches = [], [], []
+    schema = None
+    writer = None
+    n_batches = 0
+    try:
+        for station, frame in frames:
+            table = pa.Table.from_pandas(frame[columns], preserve_index=False)
+            if writer is None:
+                schema = table.schema
+                writer = pa.ipc.new_file(path, schema)
+            station_batches = []
+            for batch in table.cast(schema).to_batches(max_chunksize=max_batch_rows):
+                writer.write_batch(batch)
+                station_batches.append(n_batches)
+                n_batches += 1
+            stations.append(str(station))
+            counts.append(len(frame))
+            batches.append(station_batches)
+        if writer is None:
+            writer = pa.ipc.new_file(
+                path, pa.schema([(c, pa.float64()) for c in columns])
+            )
+    finally:
+        if writer is not None:
+            writer.close()
+    return TrainingDataHandle(
+        path=path,
+        host=socket.gethostname(),
+        columns=columns,
+        stations=stations,
+        counts=counts,
+        batches=batches,
+    )
+
+
+def prune_training_data(directory: str, keep_days: float, keep: Iterable[str] = ()) -> int:
+    """Delete training data files not used in ``keep_days``; returns how many.
+
+    Files in ``keep`` are never deleted. Reusing a file should touch it, so
+    that its age counts from its last use.
+    """
+    if not os.path.isdir(directory):
+        return 0
+    keep = {os.path.abspath(path) for path in keep}
+    cutoff = time.time() - keep_days * 86400
+    deleted = 0
+    for name in os.listdir(directory):
+        path = os.path.join(os.path.abspath(directory), name)
+        if not (name.startswith("training-") and name.endswith(".arrow")) or path in keep:
+            continue
+        try:
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+                deleted += 1
+        except FileNotFoundError:
+            # Removed by a concurrent run
+            pass
+    return deleted
+
+
+def open_training_data(
+    handle: TrainingDataHandle,
+    columns: list[str] | None = None,
+    stations: list[str] | None = None,
+):
+    """Memory-map the handle's file and return the requested columns and stations.
+
+    The returned ``pyarrow.Table`` references the mapped file, nothing is
+    copied until its columns are converted.
+    """
+    import pyarrow as pa
+
+    if not os.path.exists(handle.path):
+        raise FileNotFoundError(
+            f"Training data {handle.path} written on {handle.host or 'an unknown host'} "
+            f"is not on this host ({socket.gethostname()}). training_data_dir must be "
+            f"shared by the pipeline's steps, or it was pruned after "
+            f"training_data_retention_days"
+        )
+    reader = pa.ipc.open_file(pa.memory_map(handle.path, "r"))
+    indices = [b for i in handle._station_index(stations) for b in handle.batches[i]]
+    batches = [reader.get_batch(b) for b in indices]
+    table = pa.Table.from_batches(batches, schema=reader.schema)
+    return table.select(columns) if columns is not None else table
+
+
+def column_matrix(table, columns: list[str]) -> np.ndarray:
+    """Stack numeric table columns into one ``[n_rows, n_columns]`` float64 matrix."""
+    out = np.empty((table.num_rows, len(columns)), dtype=np.float64)
+    for j, column in enumerate(columns):
+        offset = 0
+        for chunk in table.column(column).chunks:
+            values = chunk.to_numpy(zero_copy_only=False)
+            out[offset : offset + len(values), j] = values
+            offset += len(values)
+    return out
@@ -0,0 +1,18 @@
+from .batching import MicroBatcher
+from .metrics import MetricsRegistry
+from .model_cache import ModelCache, estimate_nbytes, parse_alias_uri
+from .prediction_log import ParquetLogWriter, PredictionLog, SQLiteLogWriter
+from .scoring import PoolSaturated, ScoringPool
+
+__all__ = [
+    "MetricsRegistry",
+    "MicroBatcher",
+    "ModelCache",
+    "ParquetLogWriter",
+    "PoolSaturated",
+    "PredictionLog",
+    "SQLiteLogWriter",
+    "ScoringPool",
+    "estimate_nbytes",
+    "parse_alias_uri",
+]
@@ -0,0 +1,177 @@
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Any, Callable, Hashable
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _Pending:
+    model: Any
+    deadline: float
+    rows: int = 0
+    inputs: list[np.ndarray] = field(default_factory=list)
+    futures: list[Future] = field(default_factory=list)
+
+
+class MicroBatcher:
+    """Collect concurrent predict calls per model and score them in one call.
+
+    Requests for the same key are held for at most ``max_wait_ms`` or until
+    ``max_rows`` rows are pending, stacked into one matrix, scored with a
+    single ``model.predict`` and split back per request. A single dispatcher
+    thread serves all keys.
+
+    ``score_fn(key, model, X)`` returns a future of the predictions for a
+    stacked batch; by default batches are scored on the dispatcher thread.
+    """
+
+    def __init__(
+        self,
+        max_wait_ms: float = 2.0,
+        max_rows: int = 1024,
+        score_fn: Callable[[Hashable, Any, np.ndarray], Future] | None = None,
+    ):
+        self.max_wait = max_wait_ms / 1000.0
+        self.max_rows = max_rows
+        self._score_fn = score_fn or _score_inline
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._pending: dict[Hashable, _Pending] = {}
+        self._dispatcher: threading.Thread | None = None
+        self._stopped = False
+        # Orders submits against the stop sentinel, so nothing is queued after it
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.batched_requests = 0
+
+    def submit(self, key: Hashable, model: Any, X: np.ndarray) -> Future:
+        """Queue ``X`` for scoring by ``model`` and return a future of its predictions."""
+        future: Future = Future()
+        with self._lock:
+            if self._stopped:
+                raise RuntimeError("MicroBatcher is stopped")
+            self._queue.put((key, model, X, future))
+        return future
+
+    def predict(self, key: Hashable, model: Any, X: np.ndarray) -> np.ndarray:
+        """Blocking variant of :meth:`submit`."""
+        return self.submit(key, model, X).result()
+
+    def start(self) -> None:
+        if self._dispatcher is not None:
+            return
+        with self._lock:
+            self._stopped = False
+        self._dispatcher = threading.Thread(
+            target=self._run, name="micro-batcher", daemon=True
+        )
+        self._dispatcher.start()
+
+    def stop(self) -> None:
+        """Flush pending batches and stop the dispatcher.
+
+        Requests queued while no dispatcher runs are failed, not left waiting.
+        """
+        with self._lock:
+            self._stopped = True
+            if self._dispatcher is not None:
+                self._queue.put(None)
+        if self._dispatcher is not None:
+            self._dispatcher.join()
+            self._dispatcher = None
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            if item:
+                item[3].set_exception(RuntimeError("MicroBatcher is stopped"))
+
+    def _run(self) -> None:
+        while True:
+            timeout = None
+            if self._pending:
+                now = time.perf_counter()
+                timeout = max(0.0, min(p.deadline for p in self._pending.values()) - now)
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = False
+
+            if item is None:
+                for key in list(self._pending):
+                    self._flush(key)
+                return
+
+            if item:
+                key, model, X, future = item
+                pending = self._pending.get(key)
+                if pending is None:
+                    pending = _Pending(model, time.perf_counter() + self.max_wait)
+                    self._pending[key] = pending
+                pending.inputs.append(X)
+                pending.futures.append(future)
+                pending.rows += len(X)
+                if pending.rows >= self.max_rows:
+                    self._flush(key)
+
+            now = time.perf_counter()
+            for key in [k for k, p in self._pending.items() if p.deadline <= now]:
+                self._flush(key)
+
+    def _flush(self, key: Hashable) -> None:
+        pending = self._pending.pop(key)
+        self.batches += 1
+        self.batched_requests += len(pending.futures)
+        score_batch(self._score_fn, key, pending.model, pending.inputs, pending.futures)
+
+    def describe(self) -> dict:
+        return {
+            "max_wait_ms": self.max_wait * 1000.0,
+            "max_rows": self.max_rows,
+            "batches": self.batches,
+            "batched_requests": self.batched_requests,
+        }
+
+
+def _score_inline(key: Hashable, model: Any, X: np.ndarray) -> Future:
+    future: Future = Future()
+    future.set_result(model.predict(X))
+    return future
+
+
+def score_batch(
+    score_fn: Callable[[Hashable, Any, np.ndarray], Future],
+    key: Hashable,
+    model: Any,
+    inputs: list[np.ndarray],
+    futures: list[Future],
+) -> None:
+    """Score stacked inputs with one vectorized call and resolve each future."""
+
+    def _fail(e: BaseException) -> None:
+        logger.warning(f"Batch of {len(inputs)} requests failed: {e}")
+        for future in futures:
+            if not future.done():
+                future.set_exception(e)
+
+    def _split(batch: Future) -> None:
+        try:
+            preds = np.asarray(batch.result())
+            offsets = np.cumsum([len(X) for X in inputs])[:-1]
+            for future, part in zip(futures, np.split(preds, offsets)):
+                future.set_result(part)
+        except Exception as e:
+            _fail(e)
+
+    try:
+        stacked = inputs[0] if len(inputs) == 1 else np.concatenate(inputs)
+        score_fn(key, model, stacked).add_done_callback(_split)
+    except Exception as e:
+        _fail(e)
@@ -0,0 +1,121 @@
+from typing import Mapping
+
+import numpy as np
+
+JSON = "application/json"
+ARROW_STREAM = "application/vnd.apache.arrow.stream"
+# Raw little-endian matrix, described by the X-Shape ("rows,cols") and X-Dtype headers
+RAW = "application/octet-stream"
+
+RAW_DTYPES = {"float32": np.dtype("<f4"), "float64": np.dtype("<f8")}
+
+
+class UnsupportedFormat(ValueError):
+    """Raised for a content type or payload layout the codecs cannot handle."""
+
+
+class InvalidFeatures(ValueError):
+    """Raised for a decoded payload that is not a non-empty feature matrix."""
+
+
+def media_type(content_type: str | None) -> str:
+    """Strip parameters such as ``; charset=utf-8`` from a content type."""
+    return (content_type or JSON).split(";", 1)[0].strip().lower()
+
+
+def decode_raw(body: bytes, headers: Mapping[str, str]) -> np.ndarray:
+    """View a raw little-endian float body as a matrix without copying."""
+    dtype = RAW_DTYPES.get(headers.get("x-dtype", "float64").lower())
+    if dtype is None:
+        raise UnsupportedFormat(f"X-Dtype must be one of {sorted(RAW_DTYPES)}")
+    try:
+        rows, cols = (int(v) for v in headers["x-shape"].split(","))
+    except (KeyError, ValueError):
+        raise UnsupportedFormat("Raw bodies need an X-Shape header of the form 'rows,cols'")
+    if rows <= 0 or cols <= 0:
+        raise InvalidFeatures(f"X-Shape {rows},{cols} must have at least one row and column")
+    if rows * cols * dtype.itemsize != len(body):
+        raise UnsupportedFormat(
+            f"Body has {len(body)} bytes, X-Shape {rows},{cols} needs "
+            f"{rows * cols * dtype.itemsize}"
+        )
+    return np.frombuffer(body, dtype=dtype).reshape(rows, cols)
+
+
+def check_features(X: np.ndarray) -> np.ndarray:
+    """Return ``X`` if it is a ``[rows, cols]`` matrix with at least one row and column."""
+    if X.ndim != 2 or not X.shape[0] or not X.shape[1]:
+        raise InvalidFeatures(
+            f"Features must be a non-empty rows x columns matrix, got shape {X.shape}"
+        )
+    return X
+
+
+def encode_raw(preds: np.ndarray, dtype: np.dtype) -> tuple[bytes, dict]:
+    preds = np.ascontiguousarray(preds, dtype=dtype)
+    shape = ",".join(str(d) for d in (preds.shape if preds.ndim > 1 else (len(preds), 1)))
+    return preds.tobytes(), {"X-Shape": shape, "X-Dtype": preds.dtype.name}
+
+
+def _check_numeric(what: str, arrow_type) -> None:
+    import pyarrow as pa
+
+    if not (pa.types.is_integer(arrow_type) or pa.types.is_floating(arrow_type)):
+        raise InvalidFeatures(f"Arrow {what} must be integer or float, got {arrow_type}")
+
+
+def decode_arrow(body: bytes) -> np.ndarray:
+    """Decode an Arrow IPC stream into a feature matrix.
+
+    A single ``fixed_size_list<float>`` column is viewed as a matrix without
+    copying. A table with one numeric column per feature is zero-copy per
+    column and stacked once into a row-major matrix.
+    """
+    import pyarrow as pa
+
+    table = pa.ipc.open_stream(pa.py_buffer(body)).read_all()
+    if table.num_columns == 1 and pa.types.is_fixed_size_list(table.schema.types[0]):
+        _check_numeric("feature rows", table.schema.types[0].value_type)
+        column = table.column(0).combine_chunks()
+        if column.null_count:
+            raise UnsupportedFormat("Feature rows must not be null")
+        width = column.type.list_size
+        values = column.flatten().to_numpy(zero_copy_only=False)
+        return values.reshape(-1, width)
+    for field in table.schema:
+        _check_numeric(f"column '{field.name}'", field.type)
+    columns = [table.column(i).to_numpy() for i in range(table.num_columns)]
+    return np.column_stack(columns) if columns else np.empty((0, 0))
+
+
+def encode_arrow(preds: np.ndarray) -> bytes:
+    import pyarrow as pa
+
+    table = pa.table({"predictions": np.asarray(preds)})
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def decode_features(content_type: str, body: bytes, headers: Mapping[str, str]) -> np.ndarray:
+    """Decode a binary predict body; JSON is handled by the request model."""
+    if content_type == ARROW_STREAM:
+        try:
+            return decode_arrow(body)
+        except ImportError:
+            raise UnsupportedFormat("pyarrow is not installed, Arrow bodies are unavailable")
+    if content_type == RAW:
+        return decode_raw(body, headers)
+    raise UnsupportedFormat(f"Unsupported content type '{content_type}'")
+
+
+def encode_predictions(
+    content_type: str, preds: np.ndarray, input_dtype: np.dtype | None = None
+) -> tuple[bytes, dict]:
+    """Encode predictions in the binary request's format. Returns body and headers."""
+    if content_type == ARROW_STREAM:
+        return encode_arrow(preds), {}
+    if content_type == RAW:
+        return encode_raw(preds, input_dtype or RAW_DTYPES["float64"])
+    raise UnsupportedFormat(f"Unsupported content type '{content_type}'")
@@ -0,0 +1,195 @@
+import math
+import threading
+from bisect import bisect_left
+from typing import Callable, Iterable
+
+# Prometheus text exposition format; Starlette appends the utf-8 charset
+CONTENT_TYPE = "text/plain; version=0.0.4"
+
+# Seconds, from a fast cache hit to a cold model load
+LATENCY_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+    0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+ROW_BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 25000, 50000, 100000)
+
+
+class _Shards:
+    """Per-thread arrays of values; a thread only ever writes its own.
+
+    Updates take no lock, a thread's array is registered once on its first
+    update. Readers sum all arrays, so a scrape may see an update in one
+    value and not yet in another, never a lost update.
+    """
+
+    def __init__(self, size: int):
+        self.size = size
+        self._local = threading.local()
+        self._arrays: list[list] = []
+        self._lock = threading.Lock()
+
+    def mine(self) -> list:
+        try:
+            return self._local.values
+        except AttributeError:
+            values = self._local.values = [0] * self.size
+            with self._lock:
+                self._arrays.append(values)
+            return values
+
+    def totals(self) -> list:
+        with self._lock:
+            arrays = list(self._arrays)
+        return [sum(column) for column in zip(*arrays)] if arrays else [0] * self.size
+
+
+class Counter:
+    """Monotonic counter; ``inc`` is lock-free."""
+
+    def __init__(self):
+        self._shards = _Shards(1)
+
+    def inc(self, amount: float = 1) -> None:
+        self._shards.mine()[0] += amount
+
+    @property
+    def value(self) -> float:
+        return self._shards.totals()[0]
+
+    def samples(self, name: str, labels: str) -> Iterable[str]:
+        yield f"{name}{labels} {_format(self.value)}"
+
+
+class Gauge(Counter):
+    """Value that goes up and down, e.g. requests in flight.
+
+    ``inc`` and ``dec`` may happen on different threads, the shards sum up.
+    """
+
+    def dec(self, amount: float = 1) -> None:
+        self._shards.mine()[0] -= amount
+
+
+class Histogram:
+    """Cumulative histogram over fixed upper bounds, with sum and count; ``observe`` is lock-free."""
+
+    def __init__(self, buckets: Iterable[float]):
+        self.bounds = tuple(sorted(buckets))
+        # One count per bound, +Inf, sum and count
+        self._shards = _Shards(len(self.bounds) + 3)
+
+    def observe(self, value: float) -> None:
+        values = self._shards.mine()
+        values[bisect_left(self.bounds, value)] += 1
+        values[-2] += value
+        values[-1] += 1
+
+    def samples(self, name: str, labels: str) -> Iterable[str]:
+        totals = self._shards.totals()
+        cumulative = 0
+        for bound, count in zip((*self.bounds, math.inf), totals):
+            cumulative += count
+            bucket_labels = _join(labels, f'le="{_format(bound)}"')
+            yield f"{name}_bucket{bucket_labels} {cumulative}"
+        yield f"{name}_sum{labels} {_format(totals[-2])}"
+        yield f"{name}_count{labels} {totals[-1]}"
+
+
+class MetricFamily:
+    """A metric with a fixed set of label names and one child per label values.
+
+    Children are created on first use; hot paths should keep the child
+    returned by ``labels`` instead of looking it up on every request.
+    """
+
+    def __init__(self, name: str, help: str, kind: str, factory: Callable, label_names: tuple = ()):
+        self.name = name
+        self.help = help
+        self.kind = kind
+        self.label_names = label_names
+        self._factory = factory
+        self._children: dict[tuple, Counter | Gauge | Histogram] = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values) -> Counter | Gauge | Histogram:
+        values = tuple(str(v) for v in values)
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.label_names):
+                raise ValueError(f"{self.name} takes labels {self.label_names}, got {values}")
+            with self._lock:
+                child = self._children.setdefault(values, self._factory())
+        return child
+
+    def render(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} {self.kind}"
+        for values, child in sorted(self._children.items()):
+            yield from child.samples(self.name, _labels(zip(self.label_names, values)))
+
+
+class MetricsRegistry:
+    """Metrics of the forecasting service, rendered in the Prometheus text format.
+
+    Besides the metrics updated on the request path, ``collector`` registers
+    functions that return ``(name, help, kind, [(labels, value), ...])`` at
+    scrape time, for state that other components already keep (model cache,
+    scoring pool).
+    """
+
+    def __init__(self):
+        self._families: list[MetricFamily] = []
+        self._collectors: list[Callable[[], Iterable[tuple]]] = []
+
+    def _family(self, name: str, help: str, kind: str, factory, label_names) -> MetricFamily:
+        family = MetricFamily(name, help, kind, factory, tuple(label_names))
+        self._families.append(family)
+        return family
+
+    def counter(self, name: str, help: str, label_names: Iterable[str] = ()) -> MetricFamily:
+        return self._family(name, help, "counter", Counter, label_names)
+
+    def gauge(self, name: str, help: str, label_names: Iterable[str] = ()) -> MetricFamily:
+        return self._family(name, help, "gauge", Gauge, label_names)
+
+    def histogram(
+        self, name: str, help: str, buckets: Iterable[float], label_names: Iterable[str] = ()
+    ) -> MetricFamily:
+        buckets = tuple(buckets)
+        return self._family(name, help, "histogram", lambda: Histogram(buckets), label_names)
+
+    def collector(self, fn: Callable[[], Iterable[tuple]]) -> None:
+        self._collectors.append(fn)
+
+    def render(self) -> str:
+        lines = []
+        for family in self._families:
+            lines.extend(family.render())
+        for collect in self._collectors:
+            for name, help, kind, samples in collect():
+                lines.append(f"# HELP {name} {help}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in samples:
+                    lines.append(f"{name}{_labels(labels.items())} {_format(value)}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(pairs) -> str:
+    text = ",".join(f'{name}="{_escape(value)}"' for name, value in pairs)
+    return f"{{{text}}}" if text else ""
+
+
+def _join(labels: str, label: str) -> str:
+    return f"{{{labels[1:-1]},{label}}}" if labels else f"{{{label}}}"
+
+
+def _format(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if isinstance(value, int) or float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
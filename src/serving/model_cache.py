@@ -0,0 +1,261 @@
+import logging
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from dataclasses import asdict, dataclass
+from typing import Any, Callable
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def parse_alias_uri(model_uri: str) -> tuple[str, str]:
+    """Split a ``models:/<name>@<alias>`` URI into model name and alias."""
+    prefix = "models:/"
+    if not model_uri.startswith(prefix) or "@" not in model_uri:
+        raise ValueError(f"Expected 'models:/<name>@<alias>', got '{model_uri}'")
+    name, alias = model_uri[len(prefix):].split("@", 1)
+    return name, alias
+
+
+def estimate_nbytes(obj: Any, max_depth: int = 4) -> int:
+    """Estimate the in-memory size of a model from the arrays it holds."""
+    seen = set()
+
+    def _size(o, depth):
+        if id(o) in seen:
+            return 0
+        seen.add(id(o))
+        if isinstance(o, np.ndarray):
+            return o.nbytes
+        if isinstance(o, (bytes, bytearray, str, int, float)):
+            return sys.getsizeof(o)
+        if depth >= max_depth:
+            return sys.getsizeof(o)
+        if isinstance(o, dict):
+            return sum(_size(v, depth + 1) for v in o.values())
+        if isinstance(o, (list, tuple, set)):
+            return sum(_size(v, depth + 1) for v in o)
+        if hasattr(o, "__dict__"):
+            return sys.getsizeof(o) + _size(vars(o), depth + 1)
+        return sys.getsizeof(o)
+
+    return _size(obj, 0)
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    coalesced_loads: int = 0
+    evictions: int = 0
+    # First loads of a station, then alias swaps of a cached one
+    loads: int = 0
+    load_failures: int = 0
+    reloads: int = 0
+    reload_failures: int = 0
+    last_reload_seconds: float | None = None
+    max_reload_seconds: float = 0.0
+
+
+@dataclass(frozen=True)
+class _Entry:
+    """A model and its version, replaced together as one object, never updated in place."""
+
+    model: Any
+    version: str
+    nbytes: int
+
+
+class ModelCache:
+    """Process-wide LRU cache of per-station models behind a registry alias.
+
+    Models are loaded lazily on first request and kept until the cache exceeds
+    ``max_models`` or ``max_bytes``, at which point the least recently used
+    station is evicted. Concurrent misses for the same station share a single
+    load. A background watcher polls the alias of every cached station and,
+    when it points to a new version, loads that version next to the current
+    one and swaps the reference. Requests that already hold the old model
+    finish on it, so neither a reload nor an eviction drops in-flight work.
+    """
+
+    def __init__(
+        self,
+        alias: str,
+        load_fn: Callable[[str, str], Any],
+        resolve_version_fn: Callable[[str, str], str],
+        size_fn: Callable[[Any], int] = estimate_nbytes,
+        max_models: int = 64,
+        max_bytes: int | None = None,
+        poll_interval: float = 30.0,
+    ):
+        self.alias = alias
+        self.max_models = max_models
+        self.max_bytes = max_bytes
+        self._load_fn = load_fn
+        self._resolve_version_fn = resolve_version_fn
+        self._size_fn = size_fn
+        self._poll_interval = poll_interval
+
+        self._entries: OrderedDict[str, _Entry] = OrderedDict()
+        self._inflight: dict[str, Future] = {}
+        self._nbytes = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._watcher: threading.Thread | None = None
+        self.stats = CacheStats()
+
+    def lookup(self, model_name: str) -> tuple[Any, str] | None:
+        """Return the cached model and version without loading, or None."""
+        with self._lock:
+            entry = self._entries.get(model_name)
+            if entry is None:
+                return None
+            self._entries.move_to_end(model_name)
+            self.stats.hits += 1
+            return entry.model, entry.version
+
+    def get(self, model_name: str) -> tuple[Any, str]:
+        """Return the cached model and version for a station, loading on miss."""
+        with self._lock:
+            entry = self._entries.get(model_name)
+            if entry is not None:
+                self._entries.move_to_end(model_name)
+                self.stats.hits += 1
+                return entry.model, entry.version
+
+            future = self._inflight.get(model_name)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._inflight[model_name] = future
+                self.stats.misses += 1
+            else:
+                self.stats.coalesced_loads += 1
+
+        if not owner:
+            entry = future.result()
+            return entry.model, entry.version
+
+        try:
+            version = self._resolve_version_fn(model_name, self.alias)
+            entry = self._load(model_name, version)
+            future.set_result(entry)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(model_name, None)
+        return entry.model, entry.version
+
+    def refresh(self, model_name: str) -> bool:
+        """Reload a cached station if its alias moved. Returns True when swapped.
+
+        A station evicted while its new version loads stays evicted.
+        """
+        with self._lock:
+            entry = self._entries.get(model_name)
+        if entry is None:
+            return False
+        version = self._resolve_version_fn(model_name, self.alias)
+        if version == entry.version:
+            return False
+        return self._load(model_name, version, replace_only=True) is not None
+
+    def _load(self, model_name: str, version: str, replace_only: bool = False) -> _Entry | None:
+        """Load a version and cache it; with ``replace_only``, only if the station is still cached."""
+        start = time.perf_counter()
+        try:
+            model = self._load_fn(model_name, version)
+        except Exception:
+            with self._lock:
+                if replace_only:
+                    self.stats.reload_failures += 1
+                else:
+                    self.stats.load_failures += 1
+            raise
+        entry = _Entry(model=model, version=version, nbytes=self._size_fn(model))
+        elapsed = time.perf_counter() - start
+
+        with self._lock:
+            previous = self._entries.get(model_name)
+            if previous is None and replace_only:
+                logger.info(f"Dropped version {version} of {model_name}, evicted while loading")
+                return None
+            if previous is not None:
+                self._nbytes -= previous.nbytes
+            self._entries[model_name] = entry
+            self._entries.move_to_end(model_name)
+            self._nbytes += entry.nbytes
+            self._evict()
+            if previous is None:
+                self.stats.loads += 1
+            else:
+                self.stats.reloads += 1
+                self.stats.last_reload_seconds = elapsed
+                self.stats.max_reload_seconds = max(self.stats.max_reload_seconds, elapsed)
+
+        logger.info(
+            f"Loaded {model_name}@{self.alias} version {version} "
+            f"({entry.nbytes} bytes) in {elapsed:.3f}s"
+        )
+        return entry
+
+    def _evict(self) -> None:
+        # Always keep the most recently used entry, even if it alone is too big.
+        while len(self._entries) > 1 and (
+            len(self._entries) > self.max_models
+            or (self.max_bytes is not None and self._nbytes > self.max_bytes)
+        ):
+            name, evicted = self._entries.popitem(last=False)
+            self._nbytes -= evicted.nbytes
+            self.stats.evictions += 1
+            logger.info(f"Evicted {name} version {evicted.version} from model cache")
+
+    def _watch(self) -> None:
+        while not self._stop.wait(self._poll_interval):
+            with self._lock:
+                model_names = list(self._entries)
+            for model_name in model_names:
+                try:
+                    self.refresh(model_name)
+                except Exception as e:
+                    logger.warning(f"Alias refresh for {model_name} failed: {e}")
+
+    def start(self) -> None:
+        """Start the background alias watcher."""
+        if self._watcher is not None or self._poll_interval <= 0:
+            return
+        self._stop.clear()
+        self._watcher = threading.Thread(
+            target=self._watch, name="model-cache-watcher", daemon=True
+        )
+        self._watcher.start()
+
+    def stop(self) -> None:
+        """Stop the background alias watcher."""
+        self._stop.set()
+        if self._watcher is not None:
+            self._watcher.join()
+            self._watcher = None
+
+    def describe(self) -> dict:
+        """Return cache state and hit/miss/load/reload counters."""
+        with self._lock:
+            models = {
+                name: {"version": e.version, "nbytes": e.nbytes}
+                for name, e in self._entries.items()
+            }
+            nbytes = self._nbytes
+        return {
+            "alias": self.alias,
+            "max_models": self.max_models,
+            "max_bytes": self.max_bytes,
+            "nbytes": nbytes,
+            "models": models,
+            **asdict(self.stats),
+        }
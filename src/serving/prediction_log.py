@@ -0,0 +1,201 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import deque
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class PredictionRecord:
+    timestamp: float
+    station_id: str
+    model_version: str
+    latency_ms: float
+    features: np.ndarray
+    predictions: np.ndarray
+
+
+class ParquetLogWriter:
+    """Append prediction batches as Parquet files partitioned by date and hour."""
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def write(self, frame: pd.DataFrame) -> None:
+        hours = frame["timestamp"].dt.floor("h")
+        for hour, part in frame.groupby(hours, sort=False):
+            directory = os.path.join(
+                self.root, f"date={hour:%Y-%m-%d}", f"hour={hour:%H}"
+            )
+            os.makedirs(directory, exist_ok=True)
+            part.to_parquet(
+                os.path.join(directory, f"part-{uuid.uuid4().hex}.parquet"),
+                index=False,
+                compression="zstd",
+            )
+
+
+class SQLiteLogWriter:
+    """Append prediction batches to a local SQLite table."""
+
+    def __init__(self, path: str, table: str = "predictions"):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.table = table
+
+    def write(self, frame: pd.DataFrame) -> None:
+        with sqlite3.connect(self.path) as conn:
+            frame.to_sql(self.table, conn, if_exists="append", index=False)
+
+
+class PredictionLog:
+    """Buffered, background log of served predictions.
+
+    ``append`` only puts a record on an in-memory ring buffer and never blocks
+    on I/O. A flusher thread writes the buffer in batches once ``flush_rows``
+    rows are pending or ``flush_seconds`` have passed. When the buffer holds
+    ``capacity`` rows, new records are dropped and counted.
+    """
+
+    def __init__(
+        self,
+        writer,
+        feature_names: list[str],
+        capacity: int = 100_000,
+        flush_rows: int = 10_000,
+        flush_seconds: float = 10.0,
+    ):
+        self.writer = writer
+        self.feature_names = feature_names
+        self.capacity = capacity
+        self.flush_rows = flush_rows
+        self.flush_seconds = flush_seconds
+
+        self._buffer: deque[PredictionRecord] = deque()
+        self._buffered_rows = 0
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._flusher: threading.Thread | None = None
+
+        self.logged_rows = 0
+        self.dropped_records = 0
+        self.dropped_rows = 0
+        self.flushes = 0
+        self.flush_failures = 0
+
+    def append(
+        self,
+        station_id: str,
+        model_version: str,
+        features: np.ndarray,
+        predictions: np.ndarray,
+        latency_ms: float,
+    ) -> bool:
+        """Buffer one request. Returns False if it was dropped."""
+        rows = len(features)
+        with self._lock:
+            if self._buffered_rows + rows > self.capacity:
+                self.dropped_records += 1
+                self.dropped_rows += rows
+                return False
+            self._buffer.append(
+                PredictionRecord(
+                    time.time(), station_id, str(model_version), latency_ms,
+                    features, predictions,
+                )
+            )
+            self._buffered_rows += rows
+            full = self._buffered_rows >= self.flush_rows
+        if full:
+            self._wakeup.set()
+        return True
+
+    def start(self) -> None:
+        if self._flusher is not None:
+            return
+        self._stopped.clear()
+        self._flusher = threading.Thread(
+            target=self._run, name="prediction-log", daemon=True
+        )
+        self._flusher.start()
+
+    def stop(self) -> None:
+        """Flush whatever is buffered and stop the flusher."""
+        self._stopped.set()
+        self._wakeup.set()
+        if self._flusher is not None:
+            self._flusher.join()
+            self._flusher = None
+
+    def _run(self) -> None:
+        while not self._stopped.is_set():
+            self._wakeup.wait(self.flush_seconds)
+            self._wakeup.clear()
+            self.flush()
+        self.flush()
+
+    def flush(self) -> None:
+        with self._lock:
+            if not self._buffer:
+                return
+            records, self._buffer = self._buffer, deque()
+            rows, self._buffered_rows = self._buffered_rows, 0
+
+        try:
+            for frame in self._to_frames(records):
+                self.writer.write(frame)
+            self.logged_rows += rows
+            self.flushes += 1
+        except Exception as e:
+            self.flush_failures += 1
+            self.dropped_rows += rows
+            logger.error(f"Failed to write {rows} logged predictions: {e}")
+
+    def _to_frames(self, records: deque) -> list[pd.DataFrame]:
+        # Requests with different feature widths go to separate frames
+        by_width: dict[int, list[PredictionRecord]] = {}
+        for record in records:
+            width = record.features.shape[1] if record.features.ndim == 2 else 1
+            by_width.setdefault(width, []).append(record)
+
+        frames = []
+        for width, group in by_width.items():
+            counts = [len(r.features) for r in group]
+            features = np.concatenate([r.features.reshape(len(r.features), width) for r in group])
+            names = (
+                self.feature_names
+                if width == len(self.feature_names)
+                else [f"f{i}" for i in range(width)]
+            )
+            frame = pd.DataFrame(features, columns=names)
+            frame.insert(
+                0,
+                "timestamp",
+                pd.to_datetime(np.repeat([r.timestamp for r in group], counts), unit="s", utc=True),
+            )
+            frame.insert(1, "station_id", np.repeat([r.station_id for r in group], counts))
+            frame.insert(2, "model_version", np.repeat([r.model_version for r in group], counts))
+            frame.insert(3, "latency_ms", np.repeat([r.latency_ms for r in group], counts))
+            frame["prediction"] = np.concatenate([np.ravel(r.predictions) for r in group])
+            frames.append(frame)
+        return frames
+
+    def describe(self) -> dict:
+        return {
+            "buffered_rows": self._buffered_rows,
+            "capacity": self.capacity,
+            "logged_rows": self.logged_rows,
+            "dropped_records": self.dropped_records,
+            "dropped_rows": self.dropped_rows,
+            "flushes": self.flushes,
+            "flush_failures": self.flush_failures,
+        }
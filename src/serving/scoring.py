@@ -0,0 +1,116 @@
+import functools
+import logging
+import threading
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Models loaded inside a process-pool worker, keyed by (model_name, version)
+_worker_load: Callable[[str, str], Any] | None = None
+
+
+def _init_worker(load_fn: Callable[[str, str], Any], max_models: int) -> None:
+    global _worker_load
+    _worker_load = functools.lru_cache(maxsize=max_models)(load_fn)
+
+
+def _score_in_worker(model_name: str, version: str, X: np.ndarray) -> np.ndarray:
+    return np.asarray(_worker_load(model_name, version).predict(X))
+
+
+def _score(model: Any, X: np.ndarray) -> np.ndarray:
+    return np.asarray(model.predict(X))
+
+
+class PoolSaturated(Exception):
+    """Raised when the scoring pool has no free admission slot."""
+
+
+class ScoringPool:
+    """Dedicated executor for model scoring with bounded admission.
+
+    With ``kind="thread"`` the cached model object is scored on a thread pool.
+    With ``kind="process"`` every worker process loads and caches its own copy
+    of the model through ``load_fn``, so only the input matrix and predictions
+    cross the process boundary.
+
+    ``acquire`` admits at most ``max_pending`` requests (queued plus running).
+    Callers that cannot get a slot should fail fast instead of queueing.
+    """
+
+    def __init__(
+        self,
+        kind: str = "thread",
+        workers: int = 4,
+        max_pending: int = 256,
+        load_fn: Callable[[str, str], Any] | None = None,
+        worker_max_models: int = 16,
+    ):
+        if kind not in ("thread", "process"):
+            raise ValueError(f"Unknown scoring executor kind '{kind}'")
+        if kind == "process" and load_fn is None:
+            raise ValueError("A process scoring pool needs a picklable load_fn")
+        self.kind = kind
+        self.workers = workers
+        self.max_pending = max_pending
+        self._load_fn = load_fn
+        self._worker_max_models = worker_max_models
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._executor: Executor | None = None
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.rejected = 0
+
+    def start(self) -> None:
+        if self._executor is not None:
+            return
+        if self.kind == "thread":
+            self._executor = ThreadPoolExecutor(
+                self.workers, thread_name_prefix="scoring"
+            )
+        else:
+            self._executor = ProcessPoolExecutor(
+                self.workers,
+                initializer=_init_worker,
+                initargs=(self._load_fn, self._worker_max_models),
+            )
+
+    def shutdown(self) -> None:
+        """Drain queued and running scoring work, then stop the workers."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def acquire(self) -> None:
+        """Take an admission slot or raise :class:`PoolSaturated`."""
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise PoolSaturated(f"{self.max_pending} scoring requests already pending")
+        with self._lock:
+            self.pending += 1
+
+    def release(self) -> None:
+        with self._lock:
+            self.pending -= 1
+        self._slots.release()
+
+    def submit(self, model_name: str, version: str, model: Any, X: np.ndarray) -> Future:
+        """Schedule ``model.predict(X)`` on the pool."""
+        if self._executor is None:
+            raise RuntimeError("ScoringPool is not started")
+        if self.kind == "thread":
+            return self._executor.submit(_score, model, X)
+        return self._executor.submit(_score_in_worker, model_name, version, X)
+
+    def describe(self) -> dict:
+        return {
+            "kind": self.kind,
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            "pending": self.pending,
+            "rejected": self.rejected,
+        }
@@ -0,0 +1,79 @@
+"""Compare per-request scoring against the micro-batching path.
+
+Runs in-process (no HTTP) with concurrent client threads. ``--call-overhead-us``
+adds a fixed cost to every ``predict`` call to emulate the per-call work of a
+real pyfunc model (schema enforcement, DataFrame conversion).
+
+    PYTHONPATH=. python tests/benchmark_batching.py --threads 32 --call-overhead-us 200
+"""
+import argparse
+import threading
+import time
+
+import numpy as np
+
+from src.serving import MicroBatcher
+
+
+class BenchModel:
+    def __init__(self, call_overhead_us: float):
+        self.coefficients = np.random.rand(4)
+        self.bias = np.random.randn()
+        self.call_overhead = call_overhead_us / 1e6
+
+    def predict(self, model_input):
+        if self.call_overhead:
+            end = time.perf_counter() + self.call_overhead
+            while time.perf_counter() < end:
+                pass
+        return np.dot(model_input, self.coefficients) + self.bias
+
+
+def run(predict, threads: int, requests_per_thread: int, rows: int) -> float:
+    X = np.random.rand(rows, 4)
+
+    def client():
+        for _ in range(requests_per_thread):
+            predict(X)
+
+    workers = [threading.Thread(target=client) for _ in range(threads)]
+    start = time.perf_counter()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    return threads * requests_per_thread / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--rows", type=int, default=2)
+    parser.add_argument("--max-wait-ms", type=float, default=2.0)
+    parser.add_argument("--max-rows", type=int, default=1024)
+    parser.add_argument("--call-overhead-us", type=float, default=0.0)
+    args = parser.parse_args()
+
+    model = BenchModel(args.call_overhead_us)
+    baseline = run(model.predict, args.threads, args.requests, args.rows)
+    print(f"per-request: {baseline:10.0f} req/s")
+
+    batcher = MicroBatcher(args.max_wait_ms, args.max_rows)
+    batcher.start()
+    batched = run(
+        lambda X: batcher.predict("station1", model, X),
+        args.threads,
+        args.requests,
+        args.rows,
+    )
+    batcher.stop()
+    print(
+        f"batched:     {batched:10.0f} req/s "
+        f"({batcher.batched_requests / batcher.batches:.1f} requests/batch, "
+        f"x{batched / baseline:.2f})"
+    )
+
+
+if __name__ == "__main__":
+    main()
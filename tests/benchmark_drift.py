@@ -0,0 +1,104 @@
+"""Compare the NumPy drift engine against the full Evidently report.
+
+The engine sketches the reference once and streams the current data in
+chunks; Evidently gets both frames in full, as the monitoring step used to
+do. Peak RSS is the high-water mark of a fresh process per run.
+
+    PYTHONPATH=src/pipelines python tests/benchmark_drift.py --rows 1000000 10000000
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+COLUMNS = ["temperature", "humidity", "pressure", "wind_speed", "precipitation"]
+
+
+def make_data(n_rows: int, seed: int, shift: float) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame(
+        {
+            "temperature": rng.normal(20 + 2 * shift, 5, n_rows),
+            "humidity": rng.normal(65 + 5 * shift, 10, n_rows),
+            "pressure": rng.normal(1013, 5 + shift, n_rows),
+            "wind_speed": rng.normal(5, 2, n_rows),
+            "precipitation": rng.exponential(0.5 + 0.3 * shift, n_rows),
+        }
+    )
+
+
+def peak_rss_mb() -> float:
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) / 1024
+    return float("nan")
+
+
+def run_engine(reference: pd.DataFrame, current: pd.DataFrame, chunk_size: int) -> dict:
+    from utils.drift import ColumnHistograms, drift_table
+
+    start = time.perf_counter()
+    ref = ColumnHistograms.from_reference(COLUMNS, reference.to_numpy())
+    cur = ColumnHistograms.empty(COLUMNS, ref.edges)
+    for offset in range(0, len(current), chunk_size):
+        cur.update(current.iloc[offset : offset + chunk_size].to_numpy())
+    table = drift_table(ref, cur)
+    return {"seconds": time.perf_counter() - start, "drifted": int(table["drifted"].sum())}
+
+
+def run_evidently(reference: pd.DataFrame, current: pd.DataFrame) -> dict:
+    from evidently.metric_preset import DataDriftPreset
+    from evidently.report import Report
+
+    start = time.perf_counter()
+    report = Report(metrics=[DataDriftPreset()])
+    report.run(reference_data=reference, current_data=current)
+    report.get_html()
+    return {"seconds": time.perf_counter() - start}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000_000])
+    parser.add_argument("--chunk-size", type=int, default=500_000)
+    parser.add_argument("--run", nargs=2, metavar=("MODE", "ROWS"), help=argparse.SUPPRESS)
+    parser.add_argument("--timeout", type=float, default=1800)
+    args = parser.parse_args()
+
+    if args.run:
+        mode, n_rows = args.run[0], int(args.run[1])
+        reference, current = make_data(n_rows, 0, 0.0), make_data(n_rows, 1, 1.0)
+        baseline = peak_rss_mb()
+        if mode == "engine":
+            result = run_engine(reference, current, args.chunk_size)
+        else:
+            result = run_evidently(reference, current)
+        print(json.dumps({**result, "data_rss_mb": baseline, "peak_rss_mb": peak_rss_mb()}))
+        return
+
+    for n_rows in args.rows:
+        for mode in ("engine", "evidently"):
+            command = [sys.executable, __file__, "--run", mode, str(n_rows),
+                       "--chunk-size", str(args.chunk_size)]
+            try:
+                out = subprocess.run(command, check=True, capture_output=True, text=True,
+                                     env=os.environ, timeout=args.timeout)
+            except subprocess.TimeoutExpired:
+                print(f"rows={n_rows:>11,} {mode:>9}: did not finish in {args.timeout:.0f}s")
+                continue
+            result = json.loads(out.stdout.strip().splitlines()[-1])
+            print(
+                f"rows={n_rows:>11,} {mode:>9}: {result['seconds']:8.2f}s  "
+                f"peak RSS {result['peak_rss_mb']:7.0f} MB "
+                f"(input frames {result['data_rss_mb']:.0f} MB)"
+            )
+
+
+if __name__ == "__main__":
+    main()
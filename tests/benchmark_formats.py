@@ -0,0 +1,63 @@
+"""Rows/sec of /predict per request format, end to end through the ASGI app.
+
+    PYTHONPATH=. python tests/benchmark_formats.py --rows 1000 100000
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+import pyarrow as pa
+from fastapi.testclient import TestClient
+
+from src.forecasting import app
+
+
+def arrow_payload(X: np.ndarray) -> bytes:
+    features = pa.FixedSizeListArray.from_arrays(pa.array(X.ravel()), X.shape[1])
+    table = pa.table({"features": features})
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def payloads(X: np.ndarray) -> dict:
+    rows, cols = X.shape
+    return {
+        "json": (json.dumps({"features": X.tolist()}).encode(), {"content-type": "application/json"}),
+        "arrow": (arrow_payload(X), {"content-type": "application/vnd.apache.arrow.stream"}),
+        "raw float32": (
+            X.astype("<f4").tobytes(),
+            {"content-type": "application/octet-stream", "X-Shape": f"{rows},{cols}", "X-Dtype": "float32"},
+        ),
+        "raw float64": (
+            X.astype("<f8").tobytes(),
+            {"content-type": "application/octet-stream", "X-Shape": f"{rows},{cols}", "X-Dtype": "float64"},
+        ),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000, 100_000])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    with TestClient(app) as client:
+        for rows in args.rows:
+            X = np.random.rand(rows, 4)
+            for name, (body, headers) in payloads(X).items():
+                client.post("/predict", content=body, headers=headers).raise_for_status()
+                start = time.perf_counter()
+                for _ in range(args.repeat):
+                    client.post("/predict", content=body, headers=headers)
+                elapsed = (time.perf_counter() - start) / args.repeat
+                print(
+                    f"{rows:>7} rows  {name:<12} {len(body) / 1e6:8.2f} MB "
+                    f"{elapsed * 1e3:9.2f} ms/request {rows / elapsed:14,.0f} rows/s"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""Cost of the /metrics instrumentation: per-update cost and scrape time.
+
+Updates are timed from several threads at once, as on the event loop and
+the scoring and model-loading threads, and the counts are checked to be
+exact.
+
+    PYTHONPATH=. python tests/benchmark_metrics.py --threads 1 4 8
+"""
+import argparse
+import threading
+import time
+
+from src.serving.metrics import LATENCY_BUCKETS, MetricsRegistry
+
+
+def run(threads: int, updates: int) -> None:
+    registry = MetricsRegistry()
+    latency = registry.histogram("latency_seconds", "Latency", LATENCY_BUCKETS, ["phase"])
+    requests = registry.counter("requests_total", "Requests", ["status"])
+    in_flight = registry.gauge("in_flight", "In flight").labels()
+    phases = [latency.labels(phase) for phase in ("parse", "model_lookup", "predict", "serialize")]
+
+    def request_updates():
+        for i in range(updates):
+            in_flight.inc()
+            for phase in phases:
+                phase.observe(i * 1e-6)
+            in_flight.dec()
+            requests.labels(200).inc()
+
+    workers = [threading.Thread(target=request_updates) for _ in range(threads)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    text = registry.render()
+    scrape = time.perf_counter() - start
+    assert f'requests_total{{status="200"}} {threads * updates}' in text
+    assert "in_flight 0" in text
+    print(
+        f"{threads:>3} threads  {elapsed / (threads * updates) * 1e6:6.2f} us per request "
+        f"(7 updates)  scrape {scrape * 1e3:6.2f} ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--updates", type=int, default=200_000)
+    args = parser.parse_args()
+    for threads in args.threads:
+        run(threads, args.updates)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Compare the batched multi-station fitter against a per-station lstsq loop.
+
+    PYTHONPATH=src/pipelines python tests/benchmark_station_fit.py --stations 100 1000 5000
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from utils.linear import fit_stations
+
+
+def make_data(n_stations: int, rows_per_station: int, n_features: int = 4):
+    rng = np.random.default_rng(0)
+    n = n_stations * rows_per_station
+    station_ids = rng.permutation(np.repeat([f"station{i}" for i in range(n_stations)], rows_per_station))
+    X = rng.normal([20, 65, 1013, 5], [5, 10, 5, 2], (n, n_features))
+    weights = rng.normal(0, 1, (n_stations, n_features))
+    index = np.unique(station_ids, return_inverse=True)[1]
+    y = np.einsum("ij,ij->i", X, weights[index]) + rng.normal(0, 0.1, n)
+    return pd.DataFrame(X, columns=[f"f{i}" for i in range(n_features)]).assign(
+        station_id=station_ids, target=y
+    )
+
+
+def fit_loop(df: pd.DataFrame):
+    features = [c for c in df.columns if c.startswith("f")]
+    coefficients = {}
+    for station, frame in df.groupby("station_id"):
+        X = np.column_stack([frame[features].to_numpy(), np.ones(len(frame))])
+        coefficients[station] = np.linalg.lstsq(X, frame["target"].to_numpy(), rcond=None)[0]
+    return coefficients
+
+
+def fit_batched(df: pd.DataFrame):
+    features = [c for c in df.columns if c.startswith("f")]
+    return fit_stations(df[features].to_numpy(), df["target"].to_numpy(), df["station_id"])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--stations", type=int, nargs="+", default=[100, 1000, 5000])
+    parser.add_argument("--rows-per-station", type=int, default=500)
+    args = parser.parse_args()
+
+    for n_stations in args.stations:
+        df = make_data(n_stations, args.rows_per_station)
+
+        start = time.perf_counter()
+        looped = fit_loop(df)
+        loop_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        batched = fit_batched(df)
+        batched_time = time.perf_counter() - start
+
+        expected = np.array([looped[s] for s in batched.stations])
+        actual = np.column_stack([batched.coefficients, batched.bias])
+        max_diff = np.abs(expected - actual).max()
+        print(
+            f"{n_stations:>6} stations x {args.rows_per_station} rows: "
+            f"loop {loop_time:8.3f}s  batched {batched_time:8.3f}s  "
+            f"x{loop_time / batched_time:6.1f}  max |diff| {max_diff:.2e}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""Measure the load_training_data -> train_models transition, before and after the handle.
+
+Before: the per-station frames are materialized into the artifact store
+(pickled, or as Parquet like ZenML's pandas materializer) and read back in
+full by the consumer. After: the frames are written once to an Arrow IPC
+file and only a small handle crosses the step boundary; the consumer
+memory-maps the file and reads the feature and target columns.
+
+Every consumer runs in a fresh process so that its peak RSS is its own.
+
+    PYTHONPATH=src/pipelines python tests/benchmark_training_data.py --rows 1000000 5000000
+"""
+import argparse
+import json
+import os
+import pickle
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+FEATURES = ["temperature", "humidity", "pressure", "wind_speed"]
+TARGET = "target"
+
+
+def make_frames(n_rows: int, n_stations: int = 100) -> dict[str, pd.DataFrame]:
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame(rng.normal(size=(n_rows, len(FEATURES))), columns=FEATURES)
+    df[TARGET] = rng.normal(size=n_rows)
+    df["station_id"] = rng.choice([f"station{i:03d}" for i in range(n_stations)], n_rows)
+    # Unused columns a real source carries along
+    df["timestamp"] = pd.Timestamp("2024-01-01") + pd.to_timedelta(np.arange(n_rows), "s")
+    df["comment"] = "ok"
+    return dict(tuple(df.groupby("station_id", sort=True)))
+
+
+def produce(mode: str, frames: dict, directory: str) -> str:
+    if mode == "pickle":
+        path = os.path.join(directory, "artifact.pkl")
+        with open(path, "wb") as f:
+            pickle.dump(frames, f, protocol=pickle.HIGHEST_PROTOCOL)
+        return path
+    if mode == "parquet":
+        path = os.path.join(directory, "artifact")
+        os.makedirs(path)
+        for station, frame in frames.items():
+            frame.to_parquet(os.path.join(path, f"{station}.parquet"))
+        return path
+    from utils.training_store import write_training_data
+
+    handle = write_training_data(frames.items(), directory, [*FEATURES, TARGET])
+    path = os.path.join(directory, "handle.json")
+    with open(path, "w") as f:
+        f.write(handle.model_dump_json())
+    return path
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss survives fork + exec on Linux, VmHWM is reset with the new address space
+    if os.path.exists("/proc/self/status"):
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def consume(mode: str, path: str) -> None:
+    start = time.perf_counter()
+    if mode in ("pickle", "parquet"):
+        if mode == "pickle":
+            with open(path, "rb") as f:
+                frames = pickle.load(f)
+        else:
+            frames = {
+                name: pd.read_parquet(os.path.join(path, name)) for name in sorted(os.listdir(path))
+            }
+        data = pd.concat(frames.values(), ignore_index=True)
+        X = data[FEATURES].to_numpy()
+        data[TARGET].to_numpy()
+    else:
+        from utils.training_store import TrainingDataHandle, column_matrix, open_training_data
+
+        with open(path) as f:
+            handle = TrainingDataHandle.model_validate_json(f.read())
+        table = open_training_data(handle, columns=[*FEATURES, TARGET])
+        X = column_matrix(table, FEATURES)
+        column_matrix(table, [TARGET])
+    elapsed = time.perf_counter() - start
+    peak = peak_rss_mb()
+    print(json.dumps({"read_s": elapsed, "peak_rss_mb": peak, "rows": len(X)}))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000_000])
+    parser.add_argument("--consume", nargs=2, metavar=("MODE", "PATH"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.consume:
+        consume(*args.consume)
+        return
+
+    for n_rows in args.rows:
+        frames = make_frames(n_rows)
+        for mode in ("pickle", "parquet", "handle"):
+            with tempfile.TemporaryDirectory() as directory:
+                start = time.perf_counter()
+                path = produce(mode, frames, directory)
+                write_s = time.perf_counter() - start
+                out = subprocess.run(
+                    [sys.executable, __file__, "--consume", mode, path],
+                    check=True, capture_output=True, text=True, env=os.environ,
+                )
+                result = json.loads(out.stdout)
+                print(
+                    f"rows={n_rows:>10,} {mode:>8}: write {write_s:6.2f}s  "
+                    f"read {result['read_s']:6.2f}s  "
+                    f"transition {write_s + result['read_s']:6.2f}s  "
+                    f"consumer peak RSS {result['peak_rss_mb']:7.0f} MB"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,10 @@
+import os
+import sys
+
+# Pipeline modules import each other as top-level modules (``from utils.x import``),
+# the serving package is imported as ``src.serving``
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [os.path.join(ROOT, "src", "pipelines"), ROOT]
+
+# A script against a running forecasting service, not a test
+collect_ignore = ["predict_test.py"]
@@ -5,6 +5,7 @@ url = "http://localhost:8000/predict"
 
 # Example feature data (must match expected input shape)
 payload = {
+    "station_id": "station1",
     "features": [
         [0.1, 0.2, 0.3, 0.4],
         [0.5, 0.6, 0.7, 0.8]
@@ -0,0 +1,108 @@
+"""Micro-batching of concurrent predict calls and its shutdown."""
+import threading
+
+import numpy as np
+import pytest
+
+from src.serving import MicroBatcher
+
+
+class Model:
+    def __init__(self):
+        self.calls = []
+
+    def predict(self, X):
+        self.calls.append(len(X))
+        return X.sum(axis=1)
+
+
+def test_requests_for_one_key_are_scored_in_one_call_and_split_back():
+    model = Model()
+    batcher = MicroBatcher(max_wait_ms=50, max_rows=6)
+    inputs = [np.full((n, 2), float(n)) for n in (1, 2, 3)]
+    batcher.start()
+    try:
+        futures = [batcher.submit("s1", model, X) for X in inputs]
+        results = [f.result(timeout=5) for f in futures]
+    finally:
+        batcher.stop()
+
+    assert model.calls == [6]
+    for X, preds in zip(inputs, results):
+        np.testing.assert_array_equal(preds, X.sum(axis=1))
+    assert batcher.describe()["batches"] == 1
+
+
+def test_keys_are_batched_separately():
+    first, second = Model(), Model()
+    batcher = MicroBatcher(max_wait_ms=1000)
+    batcher.start()
+    a = batcher.submit("s1", first, np.ones((2, 2)))
+    b = batcher.submit("s2", second, np.ones((3, 2)))
+    # Stopping flushes both pending batches before the wait runs out
+    batcher.stop()
+
+    assert len(a.result(timeout=5)) == 2 and len(b.result(timeout=5)) == 3
+    assert (first.calls, second.calls) == ([2], [3])
+
+
+def test_a_failed_batch_fails_each_request():
+    class Broken:
+        def predict(self, X):
+            raise ValueError("bad input")
+
+    batcher = MicroBatcher(max_wait_ms=1000)
+    batcher.start()
+    futures = [batcher.submit("s1", Broken(), np.ones((1, 2))) for _ in range(3)]
+    batcher.stop()
+
+    for future in futures:
+        with pytest.raises(ValueError):
+            future.result(timeout=5)
+
+
+def test_submit_after_stop_raises():
+    batcher = MicroBatcher()
+    batcher.start()
+    batcher.stop()
+
+    with pytest.raises(RuntimeError):
+        batcher.submit("s1", Model(), np.ones((1, 2)))
+
+
+def test_no_submit_racing_stop_is_left_waiting():
+    model = Model()
+    for _ in range(20):
+        batcher = MicroBatcher(max_wait_ms=0.1)
+        batcher.start()
+        futures, go = [], threading.Event()
+
+        def _submit():
+            go.wait()
+            for _ in range(50):
+                try:
+                    futures.append(batcher.submit("s1", model, np.ones((1, 2))))
+                except RuntimeError:
+                    return
+
+        threads = [threading.Thread(target=_submit) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        go.set()
+        batcher.stop()
+        for thread in threads:
+            thread.join()
+
+        # Every accepted request is scored or failed, none hangs
+        for future in futures:
+            error = future.exception(timeout=5)
+            assert error is None or isinstance(error, RuntimeError)
+
+
+def test_requests_queued_without_a_dispatcher_are_failed_on_stop():
+    batcher = MicroBatcher()
+    future = batcher.submit("s1", Model(), np.ones((1, 2)))
+    batcher.stop()
+
+    with pytest.raises(RuntimeError):
+        future.result(timeout=5)
@@ -0,0 +1,80 @@
+"""Decoding of binary predict bodies and the errors the service maps to 400 and 415."""
+import numpy as np
+import pyarrow as pa
+import pytest
+
+from src.serving import codecs
+
+
+def _arrow(table):
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def test_raw_round_trip_keeps_the_dtype():
+    X = np.arange(6, dtype="<f4").reshape(3, 2)
+
+    decoded = codecs.decode_features(codecs.RAW, X.tobytes(), {"x-shape": "3,2", "x-dtype": "float32"})
+    body, headers = codecs.encode_predictions(codecs.RAW, decoded.sum(axis=1), decoded.dtype)
+
+    np.testing.assert_array_equal(decoded, X)
+    assert headers == {"X-Shape": "3,1", "X-Dtype": "float32"}
+    np.testing.assert_array_equal(np.frombuffer(body, "<f4"), [1, 5, 9])
+
+
+@pytest.mark.parametrize(
+    "headers, body, error",
+    [
+        ({"x-shape": "2,2", "x-dtype": "int8"}, bytes(4), codecs.UnsupportedFormat),
+        ({"x-dtype": "float64"}, bytes(16), codecs.UnsupportedFormat),
+        ({"x-shape": "2,2"}, bytes(24), codecs.UnsupportedFormat),
+        ({"x-shape": "0,4"}, b"", codecs.InvalidFeatures),
+    ],
+)
+def test_bad_raw_bodies_are_rejected(headers, body, error):
+    with pytest.raises(error):
+        codecs.decode_features(codecs.RAW, body, headers)
+
+
+def test_unknown_content_type_is_unsupported():
+    with pytest.raises(codecs.UnsupportedFormat):
+        codecs.decode_features("text/csv", b"1,2", {})
+
+
+def test_arrow_fixed_size_list_and_column_tables_decode_to_the_same_matrix():
+    X = np.arange(8, dtype=np.float64).reshape(4, 2)
+    rows = pa.FixedSizeListArray.from_arrays(pa.array(X.ravel()), 2)
+
+    from_rows = codecs.decode_features(codecs.ARROW_STREAM, _arrow(pa.table({"x": rows})), {})
+    from_columns = codecs.decode_features(
+        codecs.ARROW_STREAM, _arrow(pa.table({"a": X[:, 0], "b": X[:, 1].astype(np.int32)})), {}
+    )
+
+    np.testing.assert_array_equal(from_rows, X)
+    np.testing.assert_array_equal(from_columns, X)
+
+
+@pytest.mark.parametrize(
+    "table",
+    [
+        pa.table({"a": [1.0, 2.0], "station": ["s1", "s2"]}),
+        pa.table({"a": [True, False]}),
+        pa.table({"x": pa.FixedSizeListArray.from_arrays(pa.array(["a", "b"]), 2)}),
+    ],
+)
+def test_arrow_non_numeric_features_are_invalid(table):
+    with pytest.raises(codecs.InvalidFeatures):
+        codecs.decode_features(codecs.ARROW_STREAM, _arrow(table), {})
+
+
+@pytest.mark.parametrize("X", [np.empty((0, 4)), np.empty((3, 0)), np.ones(4)])
+def test_empty_or_flat_features_are_invalid(X):
+    with pytest.raises(codecs.InvalidFeatures):
+        codecs.check_features(X)
+
+
+def test_media_type_drops_parameters_and_defaults_to_json():
+    assert codecs.media_type("Application/JSON; charset=utf-8") == codecs.JSON
+    assert codecs.media_type(None) == codecs.JSON
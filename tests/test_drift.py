@@ -0,0 +1,96 @@
+"""Merging histogram sketches and the drift scores computed from them."""
+import numpy as np
+import pytest
+
+from utils.drift import ColumnHistograms, drift_table, ks_statistic, psi, wasserstein
+
+COLUMNS = ["temperature", "humidity"]
+
+
+def _data(rng, n, shift=0.0):
+    X = np.column_stack([rng.normal(20 + shift, 5, n), rng.exponential(0.5 + shift / 10, n)])
+    X[rng.random(n) < 0.01, 0] = np.nan
+    return X
+
+
+@pytest.fixture
+def reference():
+    return ColumnHistograms.from_reference(COLUMNS, _data(np.random.default_rng(0), 50_000))
+
+
+def _assert_same(a, b):
+    np.testing.assert_array_equal(a.counts, b.counts)
+    np.testing.assert_array_equal(a.missing, b.missing)
+    np.testing.assert_array_equal(a.total, b.total)
+    np.testing.assert_array_equal(a.min, b.min)
+    np.testing.assert_array_equal(a.max, b.max)
+    for name in ("sum", "sum_sq", "lower_excess", "upper_excess"):
+        np.testing.assert_allclose(getattr(a, name), getattr(b, name), rtol=1e-12)
+
+
+def test_merge_of_parts_equals_sketch_of_whole(reference):
+    X = _data(np.random.default_rng(1), 30_000, shift=1.0)
+    parts = []
+    for chunk in np.array_split(X, [0, 7, 10_000, 10_001]):
+        part = ColumnHistograms.empty(COLUMNS, reference.edges)
+        part.update(chunk)
+        parts.append(part)
+    whole = ColumnHistograms.empty(COLUMNS, reference.edges)
+    whole.update(X)
+
+    merged = parts[0]
+    for part in parts[1:]:
+        merged = merged.merge(part)
+
+    _assert_same(merged, whole)
+    assert merged.counts.sum(axis=1).tolist() == merged.total.tolist()
+    np.testing.assert_allclose(merged.mean, np.nanmean(X, axis=0), rtol=1e-12)
+    np.testing.assert_allclose(merged.std, np.nanstd(X, axis=0), rtol=1e-9)
+
+
+def test_merge_requires_same_edges(reference):
+    other = ColumnHistograms.from_reference(COLUMNS, _data(np.random.default_rng(2), 1000))
+    with pytest.raises(ValueError):
+        reference.merge(other)
+
+
+def test_no_drift_on_the_same_distribution(reference):
+    current = ColumnHistograms.empty(COLUMNS, reference.edges)
+    current.update(_data(np.random.default_rng(5), 50_000))
+
+    table = drift_table(reference, current)
+
+    assert (table["psi"] < 0.01).all()
+    assert (table["ks"] < 0.02).all()
+    assert not table["drifted"].any()
+
+
+def test_shift_is_detected(reference):
+    current = ColumnHistograms.empty(COLUMNS, reference.edges)
+    current.update(_data(np.random.default_rng(6), 50_000, shift=5.0))
+
+    for method in ("psi", "ks", "wasserstein"):
+        table = drift_table(reference, current, method, threshold=0.2)
+        assert table["drifted"].all(), method
+
+
+def test_scores_match_the_raw_data():
+    rng = np.random.default_rng(7)
+    a = rng.normal(0, 1, 100_000)
+    b = rng.normal(0.5, 1.2, 100_000)
+    reference = ColumnHistograms.from_reference(["x"], a[:, None])
+    current = ColumnHistograms.empty(["x"], reference.edges)
+    current.update(b[:, None])
+
+    # KS on the bin edges, from the sorted samples
+    edges = reference.edges[0]
+    cdf_gap = np.searchsorted(np.sort(a), edges) / len(a) - np.searchsorted(np.sort(b), edges) / len(b)
+    assert ks_statistic(reference, current)[0] == pytest.approx(np.abs(cdf_gap).max(), abs=1e-9)
+
+    # Wasserstein-1 of equal-size samples is the mean gap of the sorted values
+    exact = np.mean(np.abs(np.sort(a) - np.sort(b))) / a.std()
+    assert wasserstein(reference, current)[0] == pytest.approx(exact, rel=0.02)
+
+    # Same data, same sketch: no drift at all
+    assert psi(reference, reference)[0] == pytest.approx(0.0, abs=1e-12)
+    assert wasserstein(reference, reference)[0] == pytest.approx(0.0, abs=1e-12)
@@ -0,0 +1,129 @@
+"""Scoring of champion and challenger on the shared holdout and the promotion decision."""
+import numpy as np
+import pandas as pd
+import pytest
+from pydantic import ValidationError
+
+from config import TrainingPipelineConfig
+from utils.evaluation import Holdout, PromotionPolicy, predict_stations, regression_metrics
+from utils.linear import MockModel
+
+FEATURES = ["a", "b"]
+
+
+class Opaque:
+    """A model without linear weights, scored through ``predict``."""
+
+    def __init__(self, offset):
+        self.offset = offset
+
+    def predict(self, X):
+        return X.sum(axis=1) + self.offset
+
+
+def _model(coefficients, bias):
+    return MockModel("s", {}, np.array(coefficients, dtype=float), bias)
+
+
+@pytest.fixture
+def holdout():
+    rng = np.random.default_rng(0)
+    frames = {}
+    for station, n in (("s2", 30), ("s1", 20), ("s3", 5)):
+        X = rng.normal(size=(n, 2))
+        frames[station] = pd.DataFrame(
+            {"a": X[:, 0], "b": X[:, 1], "target": X @ [1.0, -2.0] + 0.5 + rng.normal(0, 0.1, n), "station_id": station}
+        )
+    return Holdout.from_frames(frames, FEATURES, "target")
+
+
+def test_predictions_match_each_model_per_station(holdout):
+    models = {
+        "s1": [_model([1.0, -2.0], 0.5), _model([0.0, 1.0], 0.0)],
+        "s2": [None, Opaque(1.0)],
+        "s3": [Opaque(0.0), _model([2.0, 2.0], -1.0)],
+    }
+
+    preds = predict_stations(holdout, models)
+
+    assert preds.shape == (len(holdout.y), 2)
+    for station, slots in models.items():
+        rows = holdout.groups.codes == holdout.station_index(station)
+        for m, model in enumerate(slots):
+            if model is None:
+                assert np.isnan(preds[rows, m]).all()
+            else:
+                np.testing.assert_allclose(preds[rows, m], model.predict(holdout.X[rows]))
+
+
+def test_regression_metrics_per_station_and_slot(holdout):
+    models = {s: [_model([1.0, -2.0], 0.5), _model([0.5, -1.0], 0.0)] for s in ("s1", "s2", "s3")}
+    preds = predict_stations(holdout, models)
+
+    metrics = regression_metrics(holdout, preds)
+
+    for station in ("s1", "s2", "s3"):
+        i = holdout.station_index(station)
+        rows = holdout.groups.codes == i
+        y = holdout.y[rows]
+        for m in range(2):
+            errors = preds[rows, m] - y
+            assert metrics["mae"][i, m] == pytest.approx(np.abs(errors).mean())
+            assert metrics["rmse"][i, m] == pytest.approx(np.sqrt((errors**2).mean()))
+            assert metrics["r2"][i, m] == pytest.approx(1 - (errors**2).sum() / ((y - y.mean()) ** 2).sum())
+    assert (metrics["rmse"][:, 0] < metrics["rmse"][:, 1]).all()
+
+
+def test_r2_is_undefined_without_target_variance():
+    frames = {
+        "one_row": pd.DataFrame({"a": [1.0], "b": [0.0], "target": [2.0], "station_id": "one_row"}),
+        "constant": pd.DataFrame({"a": [1.0, 2.0], "b": [0.0, 1.0], "target": 3.0, "station_id": "constant"}),
+    }
+    holdout = Holdout.from_frames(frames, FEATURES, "target")
+
+    metrics = regression_metrics(holdout, predict_stations(holdout, {s: [_model([1.0, 1.0], 0.0)] for s in frames}))
+
+    assert np.isnan(metrics["r2"]).all()
+    assert np.isfinite(metrics["rmse"]).all()
+
+
+def test_an_undefined_r2_threshold_is_skipped():
+    policy = PromotionPolicy("rmse", thresholds={"mae": 2.0, "r2": 0.8})
+
+    promoted, reason = policy.decide({"mae": 1.0, "rmse": 1.0, "r2": np.nan}, None)
+
+    assert promoted and "r2 not computable" in reason
+    # Invalid predictions still fail
+    assert not policy.decide({"mae": np.nan, "rmse": np.nan, "r2": np.nan}, None)[0]
+    assert not PromotionPolicy(thresholds={"r2": 0.8}).decide({"rmse": np.inf, "r2": np.nan}, None)[0]
+
+
+def test_challenger_must_meet_every_threshold():
+    policy = PromotionPolicy("rmse", thresholds={"mae": 2.0, "r2": 0.8})
+
+    assert policy.decide({"mae": 1.0, "rmse": 1.0, "r2": 0.9}, None)[0]
+    assert not policy.decide({"mae": 2.5, "rmse": 1.0, "r2": 0.9}, None)[0]
+    assert not policy.decide({"mae": 1.0, "rmse": 1.0, "r2": 0.7}, None)[0]
+    assert not policy.decide({"mae": np.nan, "rmse": 1.0, "r2": 0.9}, None)[0]
+
+
+@pytest.mark.parametrize(
+    "metric, challenger, champion, promoted",
+    [
+        ("rmse", 0.94, 1.0, True),
+        ("rmse", 0.96, 1.0, False),
+        ("r2", 0.85, 0.8, True),
+        ("r2", 0.83, 0.8, False),
+        # A champion that cannot be scored is replaced
+        ("rmse", 2.0, np.nan, True),
+    ],
+)
+def test_challenger_must_improve_on_the_champion(metric, challenger, champion, promoted):
+    policy = PromotionPolicy(metric, min_improvement=0.05)
+
+    assert policy.decide({metric: challenger}, {metric: champion})[0] is promoted
+
+
+def test_unknown_threshold_metric_fails_at_config_load():
+    with pytest.raises(ValidationError):
+        TrainingPipelineConfig(promotion_thresholds={"rmse": 3.0, "mape": 0.1})
@@ -0,0 +1,87 @@
+"""Status codes and body formats of the forecasting service's /predict endpoint."""
+import numpy as np
+import pyarrow as pa
+import pytest
+
+pytest.importorskip("mlflow")
+
+from fastapi.testclient import TestClient
+
+from src import forecasting
+from src.serving import ScoringPool, codecs
+
+
+@pytest.fixture
+def client():
+    with TestClient(forecasting.app) as client:
+        yield client
+
+
+def test_json_predict(client):
+    response = client.post("/predict", json={"features": [[20.0, 65.0, 1013.0, 5.0]] * 3})
+
+    assert response.status_code == 200
+    body = response.json()
+    assert len(body["predictions"]) == 3
+    assert body["station_id"] == forecasting.DEFAULT_STATION
+
+
+def test_saturated_scoring_pool_answers_503(client, monkeypatch):
+    saturated = ScoringPool(max_pending=1)
+    saturated.acquire()
+    monkeypatch.setattr(forecasting, "scoring_pool", saturated)
+
+    response = client.post("/predict", json={"features": [[20.0, 65.0, 1013.0, 5.0]]})
+
+    assert response.status_code == 503
+    assert saturated.describe()["rejected"] == 1
+
+
+def _arrow(table):
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def test_raw_predict_answers_in_the_request_dtype(client):
+    X = np.ones((2, 4), dtype="<f4")
+
+    response = client.post(
+        "/predict?station_id=s7",
+        content=X.tobytes(),
+        headers={"content-type": codecs.RAW, "x-shape": "2,4", "x-dtype": "float32"},
+    )
+
+    assert response.status_code == 200
+    assert response.headers["x-station-id"] == "s7"
+    assert response.headers["x-dtype"] == "float32"
+    assert len(np.frombuffer(response.content, "<f4")) == 2
+
+
+@pytest.mark.parametrize(
+    "content_type, body, headers, status",
+    [
+        (codecs.RAW, bytes(8), {"x-shape": "2,4"}, 415),
+        ("text/csv", b"1,2,3,4", {}, 415),
+        (codecs.RAW, b"", {"x-shape": "0,4"}, 400),
+        (codecs.ARROW_STREAM, b"not arrow", {}, 400),
+        (codecs.JSON, b'{"features": []}', {}, 400),
+        (codecs.JSON, b'{"features": [[1.0, 2.0]]}', {}, 400),
+        (codecs.JSON, b'{"features": [["a"]]}', {}, 422),
+    ],
+)
+def test_bad_bodies_are_client_errors(client, content_type, body, headers, status):
+    response = client.post("/predict", content=body, headers={"content-type": content_type, **headers})
+
+    assert response.status_code == status
+
+
+def test_non_numeric_arrow_columns_are_a_400(client):
+    table = pa.table({"temperature": [20.0], "humidity": [65.0], "pressure": [1013.0], "wind": ["calm"]})
+
+    response = client.post(
+        "/predict", content=_arrow(table), headers={"content-type": codecs.ARROW_STREAM}
+    )
+
+    assert response.status_code == 400
@@ -0,0 +1,92 @@
+"""Prometheus text rendered by the metrics registry and served on /metrics."""
+import threading
+
+import pytest
+
+from src.serving import MetricsRegistry
+
+
+def _samples(text):
+    return dict(line.rsplit(" ", 1) for line in text.splitlines() if not line.startswith("#"))
+
+
+def test_histogram_buckets_are_cumulative():
+    registry = MetricsRegistry()
+    latency = registry.histogram("latency_seconds", "Latency", (0.1, 1.0)).labels()
+    for value in (0.05, 0.1, 0.5, 2.0):
+        latency.observe(value)
+
+    text = registry.render()
+
+    assert "# TYPE latency_seconds histogram" in text
+    assert _samples(text) == {
+        'latency_seconds_bucket{le="0.1"}': "2",
+        'latency_seconds_bucket{le="1"}': "3",
+        'latency_seconds_bucket{le="+Inf"}': "4",
+        "latency_seconds_sum": "2.65",
+        "latency_seconds_count": "4",
+    }
+
+
+def test_updates_from_many_threads_are_summed():
+    registry = MetricsRegistry()
+    requests = registry.counter("requests_total", "Requests", ["status"])
+    in_flight = registry.gauge("in_flight", "In flight").labels()
+    ok = requests.labels(200)
+
+    def _serve():
+        for _ in range(1000):
+            in_flight.inc()
+            ok.inc()
+            in_flight.dec()
+
+    threads = [threading.Thread(target=_serve) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    requests.labels(503).inc()
+
+    samples = _samples(registry.render())
+    assert samples['requests_total{status="200"}'] == "8000"
+    assert samples['requests_total{status="503"}'] == "1"
+    assert samples["in_flight"] == "0"
+
+
+def test_wrong_label_count_is_rejected():
+    with pytest.raises(ValueError):
+        MetricsRegistry().counter("requests_total", "Requests", ["status"]).labels(200, "json")
+
+
+def test_collectors_are_read_at_scrape_time_and_labels_escaped():
+    registry = MetricsRegistry()
+    state = {"version": "1"}
+    registry.collector(
+        lambda: [("model_info", "Served model", "gauge", [({"station_id": 's"1', "version": state["version"]}, 1)])]
+    )
+    state["version"] = "2"
+
+    assert 'model_info{station_id="s\\"1",version="2"} 1' in registry.render().splitlines()
+
+
+def test_metrics_endpoint():
+    pytest.importorskip("mlflow")
+    from fastapi.testclient import TestClient
+
+    from src import forecasting
+
+    with TestClient(forecasting.app) as client:
+        client.post("/predict", json={"features": [[20.0, 65.0, 1013.0, 5.0]] * 2})
+        client.post("/predict", json={"features": []})
+        response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    samples = _samples(response.text)
+    assert int(samples['forecast_requests_total{status="200",format="json"}']) >= 1
+    assert int(samples['forecast_requests_total{status="400",format="json"}']) >= 1
+    assert samples["forecast_requests_in_flight"] == "0"
+    assert f'forecast_model_version_info{{station_id="{forecasting.DEFAULT_STATION}",version="mock"}}' in samples
+    for name in ("forecast_model_cache_loads_total", "forecast_model_cache_reloads_total", "forecast_scoring_rejected_total"):
+        assert name in samples
+    assert any(k.startswith('forecast_request_phase_seconds_bucket{phase="predict"') for k in samples)
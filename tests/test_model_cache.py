@@ -0,0 +1,184 @@
+"""Alias hot reload, LRU eviction and single-flight loading of the cached station models."""
+import dataclasses
+import threading
+import time
+
+import pytest
+
+from src.serving import ModelCache
+from src.serving.model_cache import parse_alias_uri
+
+
+class Registry:
+    """Alias targets and a load counter standing in for the model registry."""
+
+    def __init__(self, **versions):
+        self.versions = dict(versions)
+        self.loads = []
+        self.lock = threading.Lock()
+        self.error = None
+        # Loads of a gated (model_name, version) block until the gate opens
+        self.gates = {}
+        self.blocked = threading.Semaphore(0)
+
+    def resolve(self, model_name, alias):
+        return self.versions[model_name]
+
+    def load(self, model_name, version):
+        if self.error is not None:
+            raise self.error
+        gate = self.gates.get((model_name, version))
+        if gate is not None:
+            self.blocked.release()
+            assert gate.wait(5)
+        with self.lock:
+            self.loads.append((model_name, version))
+        return {"model": model_name, "version": version}
+
+
+def _cache(registry, **kwargs):
+    kwargs.setdefault("poll_interval", 0)
+    return ModelCache("champion", registry.load, registry.resolve, size_fn=lambda m: 1, **kwargs)
+
+
+def test_parse_alias_uri():
+    assert parse_alias_uri("models:/station1@champion") == ("station1", "champion")
+    with pytest.raises(ValueError):
+        parse_alias_uri("models:/station1/3")
+
+
+def test_refresh_swaps_only_when_the_alias_moves():
+    registry = Registry(s1="1")
+    cache = _cache(registry)
+    held, version = cache.get("s1")
+
+    assert cache.refresh("s1") is False
+    registry.versions["s1"] = "2"
+    assert cache.refresh("s1") is True
+
+    assert version == "1" and held == {"model": "s1", "version": "1"}
+    assert cache.get("s1") == ({"model": "s1", "version": "2"}, "2")
+    assert registry.loads == [("s1", "1"), ("s1", "2")]
+    info = cache.describe()
+    assert (info["loads"], info["reloads"]) == (1, 1)
+    assert info["models"] == {"s1": {"version": "2", "nbytes": 1}}
+
+
+def test_failed_reload_keeps_serving_the_current_version():
+    registry = Registry(s1="1")
+    cache = _cache(registry)
+    cache.get("s1")
+    registry.versions["s1"] = "2"
+    registry.error = OSError("artifact store unreachable")
+
+    with pytest.raises(OSError):
+        cache.refresh("s1")
+
+    assert cache.get("s1")[1] == "1"
+    assert (cache.stats.reloads, cache.stats.reload_failures) == (0, 1)
+
+
+def test_cached_entries_are_immutable():
+    cache = _cache(Registry(s1="1"))
+    cache.get("s1")
+
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        cache._entries["s1"].version = "2"
+
+
+def test_watcher_picks_up_a_moved_alias():
+    registry = Registry(s1="1")
+    cache = _cache(registry, poll_interval=0.01)
+    cache.get("s1")
+    cache.start()
+    try:
+        registry.versions["s1"] = "2"
+        deadline = time.monotonic() + 5
+        while cache.lookup("s1")[1] != "2" and time.monotonic() < deadline:
+            time.sleep(0.01)
+    finally:
+        cache.stop()
+
+    assert cache.lookup("s1")[1] == "2"
+    assert cache._watcher is None
+
+
+def test_least_recently_used_station_is_evicted():
+    registry = Registry(s1="1", s2="1", s3="1")
+    cache = _cache(registry, max_models=2)
+    cache.get("s1")
+    cache.get("s2")
+    cache.get("s1")
+    cache.get("s3")
+
+    assert list(cache.describe()["models"]) == ["s1", "s3"]
+    assert cache.lookup("s2") is None
+    assert cache.stats.evictions == 1
+
+
+def test_byte_budget_evicts_but_keeps_the_newest_model():
+    registry = Registry(s1="1", s2="1")
+    cache = ModelCache(
+        "champion", registry.load, registry.resolve, size_fn=lambda m: 10, max_bytes=15, poll_interval=0
+    )
+    cache.get("s1")
+    cache.get("s2")
+
+    info = cache.describe()
+    assert list(info["models"]) == ["s2"]
+    assert info["nbytes"] == 10
+
+
+def test_concurrent_misses_share_one_load():
+    registry = Registry(s1="1")
+    registry.gates[("s1", "1")] = gate = threading.Event()
+    cache = _cache(registry)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get("s1"))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    assert registry.blocked.acquire(timeout=5)
+    deadline = time.monotonic() + 5
+    while cache.stats.coalesced_loads < 7 and time.monotonic() < deadline:
+        time.sleep(0.001)
+    gate.set()
+    for thread in threads:
+        thread.join()
+
+    assert registry.loads == [("s1", "1")]
+    assert len(results) == 8 and all(r[0] is results[0][0] for r in results)
+    assert (cache.stats.misses, cache.stats.coalesced_loads, cache.stats.loads) == (1, 7, 1)
+
+
+def test_failed_load_is_not_cached():
+    registry = Registry(s1="1")
+    registry.error = OSError("registry down")
+    cache = _cache(registry)
+
+    with pytest.raises(OSError):
+        cache.get("s1")
+    registry.error = None
+
+    assert cache.get("s1")[1] == "1"
+    assert (cache.stats.load_failures, cache.stats.loads) == (1, 1)
+
+
+def test_station_evicted_during_refresh_stays_evicted():
+    registry = Registry(s1="1", s2="1")
+    cache = _cache(registry, max_models=1)
+    cache.get("s1")
+    registry.versions["s1"] = "2"
+    registry.gates[("s1", "2")] = gate = threading.Event()
+    swapped = []
+    refresher = threading.Thread(target=lambda: swapped.append(cache.refresh("s1")))
+    refresher.start()
+    assert registry.blocked.acquire(timeout=5)
+
+    # s2 pushes s1 out while its new version is still loading
+    cache.get("s2")
+    gate.set()
+    refresher.join()
+
+    assert swapped == [False]
+    assert list(cache.describe()["models"]) == ["s2"]
+    assert cache.stats.reloads == 0
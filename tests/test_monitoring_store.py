@@ -0,0 +1,110 @@
+"""Date-partitioned monitoring tables: writes, retention, compaction and filtered reads."""
+import os
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pyarrow.dataset as ds
+
+from utils.monitoring_store import (
+    PartitionedWriter,
+    apply_retention,
+    compact_partitions,
+    partition_dates,
+    read_partitioned,
+    record_snapshotted_hours,
+    snapshotted_hours,
+    write_partitioned,
+)
+
+TODAY = datetime(2026, 10, 18, 12)
+
+
+def _hour(start, hours=1, station="s1"):
+    timestamps = pd.date_range(start, periods=hours * 4, freq="15min")
+    return pd.DataFrame(
+        {
+            "timestamp": timestamps,
+            "station_id": station,
+            "temperature": np.arange(len(timestamps), dtype=float),
+        }
+    )
+
+
+def _write_hours(root):
+    """Two hourly files on each of four days, for two stations."""
+    for day in range(15, 19):
+        for hour, station in ((9, "s1"), (10, "s2")):
+            write_partitioned(_hour(f"2026-10-{day} {hour}:00", station=station), root, "timestamp")
+
+
+def _files(root, date):
+    return sorted(f for f in os.listdir(os.path.join(root, f"date={date}")) if f.endswith(".parquet"))
+
+
+def test_rows_are_written_one_file_per_date(tmp_path):
+    root = str(tmp_path)
+
+    # An hour spanning midnight lands in two partitions
+    assert write_partitioned(_hour("2026-10-17 23:30"), root, "timestamp") == 2
+    with PartitionedWriter(root) as writer:
+        writer.write(_hour("2026-10-18 00:00"))
+        writer.write(_hour("2026-10-18 01:00"))
+
+    assert partition_dates(root) == ["2026-10-17", "2026-10-18"]
+    assert len(_files(root, "2026-10-18")) == 2
+    assert writer.rows == 8
+    assert len(read_partitioned(root)) == 12
+
+
+def test_retention_drops_old_days_and_compaction_keeps_every_row(tmp_path):
+    root = str(tmp_path)
+    _write_hours(root)
+    before = read_partitioned(root).sort_values(["timestamp", "station_id"], ignore_index=True)
+
+    assert apply_retention(root, keep_days=2, today=TODAY) == ["2026-10-15"]
+    assert compact_partitions(root, today=TODAY) == ["2026-10-16", "2026-10-17"]
+
+    assert partition_dates(root) == ["2026-10-16", "2026-10-17", "2026-10-18"]
+    assert len(_files(root, "2026-10-16")) == 1 and _files(root, "2026-10-16")[0].startswith("compacted-")
+    # Today is still written to
+    assert len(_files(root, "2026-10-18")) == 2
+    after = read_partitioned(root).sort_values(["timestamp", "station_id"], ignore_index=True)
+    expected = before[before["timestamp"] >= "2026-10-16"].reset_index(drop=True)
+    pd.testing.assert_frame_equal(after[expected.columns], expected, check_dtype=False)
+    # A second pass has nothing left to do
+    assert compact_partitions(root, today=TODAY) == []
+
+
+def test_reads_push_down_time_bounds_columns_and_filters(tmp_path):
+    root = str(tmp_path)
+    _write_hours(root)
+    compact_partitions(root, today=TODAY)
+
+    window = read_partitioned(
+        root,
+        columns=["timestamp", "temperature"],
+        since=datetime(2026, 10, 16, 9, 30),
+        until=datetime(2026, 10, 17, 10),
+    )
+    station = read_partitioned(root, since=datetime(2026, 10, 17), filter=ds.field("station_id") == "s2")
+
+    assert window.columns.tolist() == ["timestamp", "temperature"]
+    assert window["timestamp"].min() == pd.Timestamp("2026-10-16 09:30")
+    assert window["timestamp"].max() == pd.Timestamp("2026-10-17 09:45")
+    # 09:30 and 09:45 of s1, 10:00-10:45 of s2 on the 16th, 09:00-09:45 of s1 on the 17th
+    assert len(window) == 2 + 4 + 4
+    assert set(station["station_id"]) == {"s2"} and len(station) == 8
+    assert read_partitioned(str(tmp_path / "missing"), columns=["timestamp"]).empty
+
+
+def test_snapshotted_hours_forget_hours_before_the_window(tmp_path):
+    root = str(tmp_path)
+    assert snapshotted_hours(root) == set()
+
+    record_snapshotted_hours(root, {"2026-10-16T09", "2026-10-17T09", "2026-10-18T09"}, keep_from="2026-10-17T00")
+
+    assert snapshotted_hours(root) == {"2026-10-17T09", "2026-10-18T09"}
+    # The hours file is not read as part of the table
+    write_partitioned(_hour("2026-10-18 09:00"), root, "timestamp")
+    assert len(read_partitioned(root)) == 4
@@ -0,0 +1,111 @@
+"""Buffering, drop counting and the writers of the prediction log."""
+import sqlite3
+import time
+
+import numpy as np
+import pandas as pd
+
+from src.serving import ParquetLogWriter, PredictionLog, SQLiteLogWriter
+
+FEATURES = ["temperature", "humidity"]
+
+
+class Frames:
+    """A writer keeping the frames it is given."""
+
+    def __init__(self):
+        self.frames = []
+
+    def write(self, frame):
+        self.frames.append(frame)
+
+
+def _append(log, rows, width=2, station="s1"):
+    X = np.arange(rows * width, dtype=float).reshape(rows, width)
+    return log.append(station, "3", X, X.sum(axis=1), 1.5)
+
+
+def test_records_beyond_capacity_are_dropped_and_counted():
+    log = PredictionLog(Frames(), FEATURES, capacity=5, flush_rows=100)
+
+    assert _append(log, 3)
+    assert not _append(log, 3)
+    assert _append(log, 2)
+    assert not _append(log, 1)
+
+    info = log.describe()
+    assert info["buffered_rows"] == 5
+    assert (info["dropped_records"], info["dropped_rows"]) == (2, 4)
+
+
+def test_flush_writes_one_frame_per_feature_width():
+    writer = Frames()
+    log = PredictionLog(writer, FEATURES, flush_rows=100)
+    _append(log, 2)
+    _append(log, 1, station="s2")
+    _append(log, 2, width=3)
+
+    log.flush()
+
+    named, unnamed = writer.frames
+    assert named.columns.tolist() == ["timestamp", "station_id", "model_version", "latency_ms", *FEATURES, "prediction"]
+    assert named["station_id"].tolist() == ["s1", "s1", "s2"]
+    np.testing.assert_array_equal(named["prediction"], named[FEATURES].sum(axis=1))
+    assert unnamed.columns[4:7].tolist() == ["f0", "f1", "f2"]
+    assert log.describe()["logged_rows"] == 5 and log.describe()["buffered_rows"] == 0
+
+
+def test_failed_flush_counts_the_rows_as_dropped():
+    class Broken:
+        def write(self, frame):
+            raise OSError("disk full")
+
+    log = PredictionLog(Broken(), FEATURES)
+    _append(log, 4)
+
+    log.flush()
+
+    info = log.describe()
+    assert (info["flush_failures"], info["dropped_rows"], info["logged_rows"]) == (1, 4, 0)
+
+
+def test_flusher_writes_once_flush_rows_are_buffered_and_on_stop():
+    writer = Frames()
+    log = PredictionLog(writer, FEATURES, flush_rows=3, flush_seconds=60)
+    log.start()
+    _append(log, 3)
+    deadline = time.monotonic() + 5
+    while not writer.frames and time.monotonic() < deadline:
+        time.sleep(0.01)
+    _append(log, 1)
+    log.stop()
+
+    assert [len(f) for f in writer.frames] == [3, 1]
+
+
+def test_parquet_writer_partitions_by_date_and_hour(tmp_path):
+    frame = pd.DataFrame(
+        {
+            "timestamp": pd.to_datetime(["2026-10-01 09:59", "2026-10-01 10:00", "2026-10-02 10:30"], utc=True),
+            "prediction": [1.0, 2.0, 3.0],
+        }
+    )
+
+    ParquetLogWriter(str(tmp_path)).write(frame)
+
+    partitions = sorted(p.parent.relative_to(tmp_path).as_posix() for p in tmp_path.rglob("*.parquet"))
+    assert partitions == ["date=2026-10-01/hour=09", "date=2026-10-01/hour=10", "date=2026-10-02/hour=10"]
+    read = pd.read_parquet(tmp_path)
+    assert sorted(read["prediction"]) == [1.0, 2.0, 3.0]
+
+
+def test_sqlite_writer_appends(tmp_path):
+    path = str(tmp_path / "log" / "predictions.db")
+    writer = SQLiteLogWriter(path)
+    frame = pd.DataFrame({"station_id": ["s1"], "prediction": [1.0]})
+
+    writer.write(frame)
+    writer.write(frame)
+
+    with sqlite3.connect(path) as conn:
+        assert conn.execute("select count(*) from predictions").fetchone() == (2,)
@@ -0,0 +1,110 @@
+"""Reference profiles: building, saving and loading them from the registry."""
+import json
+import os
+import shutil
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+
+from utils.profiles import (
+    PROFILE_TAG,
+    build_profile,
+    load_profile,
+    load_registered_profile,
+    log_profile,
+    save_profile,
+)
+
+COLUMNS = ["temperature", "humidity"]
+
+
+def _data(n=2_000):
+    rng = np.random.default_rng(0)
+    data = pd.DataFrame({"temperature": rng.normal(20, 5, n), "humidity": rng.uniform(0, 1, n)})
+    data.loc[::100, "humidity"] = np.nan
+    return data
+
+
+def _assert_same_profile(loaded, profile):
+    assert loaded.columns == profile.columns
+    np.testing.assert_array_equal(loaded.sketch.edges, profile.sketch.edges)
+    np.testing.assert_array_equal(loaded.sketch.counts, profile.sketch.counts)
+    np.testing.assert_array_equal(loaded.sketch.missing, profile.sketch.missing)
+    pd.testing.assert_frame_equal(loaded.sample, profile.sample)
+    assert (loaded.model_name, loaded.model_version) == (profile.model_name, profile.model_version)
+
+
+def test_profiles_round_trip(tmp_path):
+    data = _data()
+    profile = build_profile(data, COLUMNS, sample_rows=500, model_name="s1", model_version="3")
+    path = str(tmp_path / "profiles" / "s1.json")
+
+    save_profile(profile, path)
+    loaded = load_profile(path)
+
+    _assert_same_profile(loaded, profile)
+    assert len(loaded.sample) == 500
+    assert loaded.rows == len(data) and loaded.sketch.missing.tolist() == [0, 20]
+    assert os.listdir(tmp_path / "profiles") == ["s1.json"]
+
+
+def test_a_matrix_is_profiled_like_a_frame():
+    data = _data()
+
+    from_frame = build_profile(data, COLUMNS, sample_rows=100)
+    from_matrix = build_profile(data[COLUMNS].to_numpy(), COLUMNS, sample_rows=100)
+
+    _assert_same_profile(from_matrix, from_frame)
+
+
+def test_a_missing_profile_loads_as_none(tmp_path):
+    assert load_profile(str(tmp_path / "missing.json")) is None
+
+
+class Registry:
+    """The parts of an MlflowClient profiles are logged to and loaded from."""
+
+    def __init__(self, root):
+        self.root = root
+        self.tags = {}
+        self.downloads = 0
+
+    def log_dict(self, run_id, data, artifact_file):
+        os.makedirs(os.path.join(self.root, run_id), exist_ok=True)
+        with open(os.path.join(self.root, run_id, artifact_file), "w") as f:
+            json.dump(data, f)
+
+    def set_model_version_tag(self, name, version, key, value):
+        self.tags.setdefault((name, version), {})[key] = value
+
+    def get_model_version_by_alias(self, name, alias):
+        version = "3" if name == "s1" else "1"
+        return SimpleNamespace(version=version, run_id=f"run-{name}", tags=self.tags.get((name, version), {}))
+
+    def download_artifacts(self, run_id, path, dst_path):
+        self.downloads += 1
+        return shutil.copy(os.path.join(self.root, run_id, path), dst_path)
+
+
+def test_registered_profiles_are_downloaded_once(tmp_path):
+    registry = Registry(str(tmp_path / "artifacts"))
+    profile = build_profile(_data(), COLUMNS, model_name="s1", model_version="3")
+    log_profile(registry, "s1", "3", "run-s1", profile)
+    cache_dir = str(tmp_path / "cache")
+
+    first = load_registered_profile(registry, "s1", cache_dir=cache_dir)
+    second = load_registered_profile(registry, "s1", cache_dir=cache_dir)
+
+    _assert_same_profile(first, profile)
+    _assert_same_profile(second, profile)
+    assert registry.tags[("s1", "3")] == {PROFILE_TAG: "reference_profile.json"}
+    assert registry.downloads == 1
+    assert os.listdir(cache_dir) == ["s1-v3.json"]
+
+
+def test_a_version_without_a_profile_loads_as_none(tmp_path):
+    registry = Registry(str(tmp_path / "artifacts"))
+
+    assert load_registered_profile(registry, "s2") is None
+    assert registry.downloads == 0
@@ -0,0 +1,109 @@
+"""The step profiler, its timeline and the profile_step decorator."""
+import json
+import threading
+import time
+
+import pytest
+
+from config import ProfilingConfig
+from utils.profiling import StepProfiler, active_profiler, profile_step
+
+
+def _busy(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+class Client:
+    def search(self, query):
+        return [query]
+
+    name = "registry"
+
+
+def _timeline(profiler):
+    (path,) = [p for p in profiler.paths if p.endswith(".json")]
+    with open(path) as f:
+        return json.load(f)
+
+
+def test_phases_stations_and_calls_are_recorded(tmp_path):
+    with StepProfiler("train_models", str(tmp_path)) as profiler:
+        with profiler.phase("fit"):
+            _busy(0.02)
+        with profiler.phase("fit"):
+            pass
+        profiler.station("train_and_log", "s1", 0.5)
+        profiler.station("train_and_log", "s2", 1.5)
+        client = profiler.client(Client(), "mlflow")
+        threads = [threading.Thread(target=client.search, args=("q",)) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert client.name == "registry"
+
+    timeline = _timeline(profiler)
+    assert timeline["step"] == "train_models"
+    assert timeline["phases"]["fit"] >= 0.02
+    assert timeline["stations"] == {"train_and_log": {"s1": 0.5, "s2": 1.5}}
+    assert timeline["calls"]["mlflow.search"]["count"] == 4
+    assert {"wall_seconds", "cpu_seconds", "peak_rss_mb"} <= set(timeline["summary"])
+    names = [event["name"] for event in timeline["traceEvents"]]
+    assert names.count("fit") == 2 and "train_and_log:s1" in names and "train_models" in names
+
+    metrics = profiler.metrics()
+    assert metrics["profile.train_models.stations.train_and_log.count"] == 2
+    assert metrics["profile.train_models.stations.train_and_log.mean_seconds"] == 1.0
+    assert metrics["profile.train_models.stations.train_and_log.max_seconds"] == 1.5
+    assert metrics["profile.train_models.calls.mlflow.search.count"] == 4
+    assert "profile.train_models.phase.fit_seconds" in metrics
+
+
+@pytest.mark.parametrize("mode, suffix", [("cprofile", ".prof"), ("sample", ".folded")])
+def test_profile_step_modes(tmp_path, mode, suffix):
+    with StepProfiler("step", str(tmp_path), mode, sample_interval=0.005) as profiler:
+        _busy(0.1)
+
+    assert [p[-len(suffix):] for p in profiler.paths[1:]] == [suffix]
+    if mode == "sample":
+        with open(profiler.paths[1]) as f:
+            assert "_busy (test_profiling.py" in f.read()
+
+
+def test_a_failed_step_is_recorded_and_raises(tmp_path):
+    with pytest.raises(ValueError):
+        with StepProfiler("step", str(tmp_path)) as profiler:
+            raise ValueError("bad data")
+
+    (step,) = [e for e in _timeline(profiler)["traceEvents"] if e["cat"] == "step"]
+    assert step["args"] == {"failed": True}
+
+
+def test_profile_step_is_opt_in(tmp_path):
+    seen = []
+
+    @profile_step
+    def train_models(data, config):
+        seen.append(active_profiler())
+        with active_profiler().phase("fit"):
+            return data * 2
+
+    off = ProfilingConfig(profile_dir=str(tmp_path))
+    on = ProfilingConfig(profiling=True, profile_dir=str(tmp_path), profile_step="train_models", profile_mode="cprofile")
+
+    assert train_models(1, config=off) == 2
+    assert train_models(2, on) == 4
+
+    assert not isinstance(seen[0], StepProfiler)
+    assert isinstance(seen[1], StepProfiler) and seen[1].mode == "cprofile"
+    assert not isinstance(active_profiler(), StepProfiler)
+    assert sorted(p.suffix for p in tmp_path.iterdir()) == [".json", ".prof"]
+
+
+def test_null_profiler_returns_the_client_itself():
+    client = Client()
+
+    assert active_profiler().client(client, "mlflow") is client
+    assert active_profiler().counted(client.search) == client.search
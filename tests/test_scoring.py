@@ -0,0 +1,50 @@
+"""Admission control and scoring on the dedicated scoring pool."""
+import numpy as np
+import pytest
+
+from src.serving import PoolSaturated, ScoringPool
+
+
+class Model:
+    def predict(self, X):
+        return X.sum(axis=1)
+
+
+def load_model(model_name, version):
+    return Model()
+
+
+def test_admission_beyond_max_pending_is_rejected_until_a_slot_frees():
+    pool = ScoringPool(max_pending=2)
+    pool.acquire()
+    pool.acquire()
+
+    with pytest.raises(PoolSaturated):
+        pool.acquire()
+    assert pool.describe()["pending"] == 2 and pool.describe()["rejected"] == 1
+
+    pool.release()
+    pool.acquire()
+    assert pool.describe()["pending"] == 2
+
+
+@pytest.mark.parametrize("kind", ["thread", "process"])
+def test_pool_scores_the_model(kind):
+    pool = ScoringPool(kind, workers=1, load_fn=load_model)
+    pool.start()
+    try:
+        preds = pool.submit("s1", "1", Model(), np.ones((3, 2))).result(timeout=30)
+    finally:
+        pool.shutdown()
+
+    np.testing.assert_array_equal(preds, [2.0, 2.0, 2.0])
+
+
+def test_submit_needs_a_started_pool():
+    with pytest.raises(RuntimeError):
+        ScoringPool().submit("s1", "1", Model(), np.ones((1, 2)))
+
+
+def test_process_pool_needs_a_load_fn():
+    with pytest.raises(ValueError):
+        ScoringPool("process")
@@ -0,0 +1,98 @@
+"""Hourly sketches of current data and their merge into rolling windows."""
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.drift import ColumnHistograms, update_by_station
+from utils.sketch_store import HourlySketchStore, merge_sketches, merge_station_sketches, sketch_key
+
+COLUMNS = ["temperature", "humidity"]
+
+
+def _data(rng, n):
+    return np.column_stack([rng.normal(20, 5, n), rng.exponential(0.5, n)])
+
+
+@pytest.fixture
+def reference():
+    return ColumnHistograms.from_reference(COLUMNS, _data(np.random.default_rng(0), 10_000))
+
+
+def _sketch(reference, X):
+    sketch = ColumnHistograms.empty(COLUMNS, reference.edges)
+    sketch.update(X)
+    return sketch
+
+
+def test_window_is_the_merge_of_its_hours(reference):
+    rng = np.random.default_rng(1)
+    hours = [_data(rng, n) for n in (100, 1, 2000)]
+
+    window = merge_sketches([_sketch(reference, X) for X in hours])
+
+    expected = _sketch(reference, np.concatenate(hours))
+    np.testing.assert_array_equal(window.counts, expected.counts)
+    np.testing.assert_array_equal(window.total, expected.total)
+    np.testing.assert_allclose(window.sum, expected.sum, rtol=1e-12)
+
+
+def test_hours_round_trip_and_prune(tmp_path, reference):
+    store = HourlySketchStore(str(tmp_path), "key")
+    rng = np.random.default_rng(2)
+    start = pd.Timestamp("2026-10-18 08:00")
+    sketches = {start + pd.Timedelta(hours=h): _sketch(reference, _data(rng, 50)) for h in range(3)}
+    for hour, sketch in sketches.items():
+        store.save(hour, sketch, {})
+
+    sketch, stations = store.load(start + pd.Timedelta(hours=1))
+
+    np.testing.assert_array_equal(sketch.counts, sketches[start + pd.Timedelta(hours=1)].counts)
+    assert stations == {}
+    assert store.load(start - pd.Timedelta(hours=1)) is None
+    assert store.hours() == list(sketches)
+
+    assert store.prune(start + pd.Timedelta(hours=2)) == 2
+    assert store.hours() == [start + pd.Timedelta(hours=2)]
+
+
+def test_station_sketches_merge_across_hours(reference):
+    rng = np.random.default_rng(3)
+    hours = []
+    for stations in (["s1", "s2", "s3"], ["s1"], ["s2", "s3"]):
+        X = _data(rng, 1000)
+        station_ids = rng.choice(stations, len(X))
+        sketches = {}
+        update_by_station(sketches, station_ids, X, lambda s: ColumnHistograms.empty(COLUMNS, reference.edges))
+        hours.append((X, station_ids, sketches))
+
+    merged = merge_station_sketches([sketches for _, _, sketches in hours])
+
+    X = np.concatenate([X for X, _, _ in hours])
+    station_ids = np.concatenate([s for _, s, _ in hours])
+    assert sorted(merged) == ["s1", "s2", "s3"]
+    for station, sketch in merged.items():
+        expected = _sketch(reference, X[station_ids == station])
+        np.testing.assert_array_equal(sketch.counts, expected.counts)
+        np.testing.assert_array_equal(sketch.total, expected.total)
+
+
+def test_station_sketches_round_trip_and_old_files_are_sketched_again(tmp_path, reference):
+    store = HourlySketchStore(str(tmp_path), "key")
+    hour = pd.Timestamp("2026-10-18 10:00")
+    current = _sketch(reference, _data(np.random.default_rng(4), 100))
+
+    store.save(hour, current, {"s1": current})
+    _, stations = store.load(hour)
+    np.testing.assert_array_equal(stations["s1"].counts, current.counts)
+
+    # Files from before station sketches are sketched again, not misread
+    with open(store.path(hour), "w") as f:
+        json.dump({"sketch": current.to_dict()}, f)
+    assert store.load(hour) is None
+
+
+def test_station_drift_gets_its_own_sketches(reference):
+    assert sketch_key("current", [reference]) == sketch_key("current", [reference])
+    assert sketch_key("current", [reference]) != sketch_key("current", [reference], by_station=True)
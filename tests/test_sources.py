@@ -0,0 +1,109 @@
+"""Source fetching, per-source cooldowns and high-water marks."""
+import json
+import threading
+import time
+
+import pandas as pd
+
+from utils.sources import FetchResult, SourceState, fetch_sources
+
+
+class Source:
+    def __init__(self, source_id):
+        self.source_id = source_id
+
+
+def _sources(*source_ids):
+    return {source_id: Source(source_id) for source_id in source_ids}
+
+
+def _hour(h):
+    return pd.Timestamp("2026-10-01", tz="UTC") + pd.Timedelta(hours=h)
+
+
+def test_watermarks_move_only_when_the_results_are_recorded(tmp_path):
+    path = str(tmp_path / "state.json")
+    state = SourceState(path)
+
+    results = fetch_sources(_sources("a"), lambda s: (5, 1, _hour(5)), state, cooldown_seconds=3600)
+
+    # A crash before the load is committed keeps the old high-water mark
+    assert results[0].status == "loaded" and results[0].watermark == _hour(5)
+    assert SourceState(path).watermark("a") is None
+    assert state.remaining("a", 3600) == 0
+
+    state.record(results)
+    assert SourceState(path).watermark("a") == _hour(5)
+    assert SourceState(path).remaining("a", 3600) > 0
+
+
+def test_watermarks_never_move_backwards(tmp_path):
+    state = SourceState(str(tmp_path / "state.json"))
+    state.record(fetch_sources(_sources("a"), lambda s: (5, 1, _hour(5)), state, 0))
+    # A backfill of older rows
+    state.record(fetch_sources(_sources("a"), lambda s: (2, 1, _hour(2)), state, 0))
+    # A source with no new rows
+    state.record(fetch_sources(_sources("a"), lambda s: (0, 0, None), state, 0))
+
+    assert SourceState(state.path).watermark("a") == _hour(5)
+
+
+def test_sources_in_cooldown_are_skipped(tmp_path):
+    state = SourceState(str(tmp_path / "state.json"))
+    state.record([FetchResult("a", "loaded", fetched_at=time.time())])
+    fetched = []
+
+    def _fetch(source):
+        fetched.append(source.source_id)
+        return 1, 1, None
+
+    results = fetch_sources(_sources("a", "b"), _fetch, state, cooldown_seconds=3600)
+
+    assert fetched == ["b"]
+    assert [r.status for r in results] == ["skipped", "loaded"]
+    assert results[0].detail.startswith("cooling down")
+    # Without a cooldown, e.g. in a backfill, every source is due
+    results = fetch_sources(_sources("a", "b"), _fetch, state, cooldown_seconds=0)
+    assert [r.status for r in results] == ["loaded", "loaded"]
+
+
+def test_failed_sources_start_no_cooldown(tmp_path):
+    state = SourceState(str(tmp_path / "state.json"))
+
+    def _fetch(source):
+        if source.source_id == "b":
+            raise ConnectionError("timed out")
+        return 3, 1, _hour(3)
+
+    results = fetch_sources(_sources("a", "b"), _fetch, state, cooldown_seconds=3600)
+    state.record(results)
+
+    assert [r.status for r in results] == ["loaded", "failed"]
+    assert results[1].detail == "timed out"
+    assert state.remaining("a", 3600) > 0
+    assert state.remaining("b", 3600) == 0 and state.watermark("b") is None
+
+
+def test_sources_are_fetched_concurrently_and_returned_in_order(tmp_path):
+    barrier = threading.Barrier(3, timeout=5)
+
+    def _fetch(source):
+        # Only passes once all three sources are fetched at the same time
+        barrier.wait()
+        return 1, 1, None
+
+    results = fetch_sources(
+        _sources("c", "a", "b"), _fetch, SourceState(str(tmp_path / "state.json")), 0, workers=3
+    )
+
+    assert [(r.source_id, r.status) for r in results] == [("c", "loaded"), ("a", "loaded"), ("b", "loaded")]
+
+
+def test_state_files_with_only_fetch_times_are_read(tmp_path):
+    path = tmp_path / "state.json"
+    path.write_text(json.dumps({"a": time.time()}))
+
+    state = SourceState(str(path))
+
+    assert state.remaining("a", 3600) > 0
+    assert state.watermark("a") is None
@@ -0,0 +1,100 @@
+"""Startup cost: the import time report of run.py and lazily imported steps."""
+import os
+import subprocess
+import sys
+
+import pytest
+
+from run import parse_importtime
+
+PIPELINES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src", "pipelines")
+
+
+def test_import_lines_are_parsed_with_their_depth():
+    lines = [
+        "import time:       280 |        280 |       _json\n",
+        "import time:       695 |        974 |     json.scanner\n",
+        "import time:       737 |       1711 |   json.decoder\n",
+        "import time:       385 |       2814 | json\n",
+    ]
+
+    assert [parse_importtime(line) for line in lines] == [
+        (280, 280, "_json", 3),
+        (695, 974, "json.scanner", 2),
+        (737, 1711, "json.decoder", 1),
+        (385, 2814, "json", 0),
+    ]
+
+
+@pytest.mark.parametrize(
+    "line",
+    [
+        "import time: self [us] | cumulative | imported package\n",
+        "import time: garbage\n",
+        "import time:       12 |  34\n",
+        "import time:   x |   34 | json\n",
+    ],
+)
+def test_header_and_garbage_lines_are_skipped(line):
+    assert parse_importtime(line) is None
+
+
+def test_lines_of_a_real_import_are_parsed():
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import json"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    entries = [parse_importtime(line) for line in result.stderr.splitlines(keepends=True)]
+    depths = {name: depth for _, _, name, depth in filter(None, entries)}
+    assert depths["json"] == 0 and depths["json.decoder"] == 1
+
+
+def _run_in_pipelines(code):
+    env = {**os.environ, "ENV": os.environ.get("ENV", "dev"), "STACK": os.environ.get("STACK", "local")}
+    return subprocess.run(
+        [sys.executable, "-c", code], cwd=PIPELINES, env=env, capture_output=True, text=True
+    )
+
+
+def test_importing_steps_imports_no_step_module():
+    result = _run_in_pipelines(
+        "import sys, steps\n"
+        "print(sorted(m for m in ('mlflow', 'evidently', 'zenml', 'steps.trainer') if m in sys.modules))"
+    )
+
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == "[]"
+
+
+def test_a_step_is_imported_on_first_access(tmp_path):
+    pytest.importorskip("zenml")
+    # ZenML resolves the source root from the main module, so run a script file
+    script = tmp_path / "access_step.py"
+    script.write_text(
+        "import sys\n"
+        f"sys.path.insert(0, {PIPELINES!r})\n"
+        "import steps\n"
+        "step = steps.train_models\n"
+        "print('steps.trainer' in sys.modules, 'mlflow' in sys.modules, 'evidently' in sys.modules)\n"
+    )
+
+    result = subprocess.run(
+        [sys.executable, str(script)],
+        env={**os.environ, "ENV": "dev", "STACK": "local"},
+        capture_output=True,
+        text=True,
+    )
+
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.split()[-3:] == ["True", "True", "False"]
+
+
+def test_unknown_steps_raise_attribute_error():
+    import steps
+
+    with pytest.raises(AttributeError, match="no attribute 'train_everything'"):
+        steps.train_everything
+    assert "train_models" in dir(steps)
@@ -0,0 +1,68 @@
+"""The batched station fit against a per-station least-squares solve."""
+import numpy as np
+import pytest
+
+from utils.linear import fit_stations
+
+
+def _lstsq(X, y):
+    """Weights and bias of ``y ~ X @ w + b`` from np.linalg.lstsq."""
+    solution = np.linalg.lstsq(np.column_stack([X, np.ones(len(X))]), y, rcond=None)[0]
+    return solution[:-1], solution[-1]
+
+
+def _stations(rng, sizes, n_features=4):
+    rows = []
+    for station, n in sizes.items():
+        # Offsets like pressure (~1013) make the uncentered problem ill-conditioned
+        X = rng.normal([20, 65, 1013, 5][:n_features], [5, 10, 5, 2][:n_features], (n, n_features))
+        y = X @ rng.normal(size=n_features) + rng.normal() + rng.normal(0, 0.5, n)
+        rows += [(station, x, t) for x, t in zip(X, y)]
+    # Stations interleaved, as rows arrive from several sources
+    rows = [rows[i] for i in rng.permutation(len(rows))]
+    stations = np.array([r[0] for r in rows])
+    return np.array([r[1] for r in rows]), np.array([r[2] for r in rows]), stations
+
+
+def test_matches_lstsq_per_station():
+    rng = np.random.default_rng(0)
+    X, y, station_ids = _stations(rng, {"s2": 500, "s1": 40, "s10": 5000, "s3": 6})
+
+    fit = fit_stations(X, y, station_ids)
+
+    assert fit.stations.tolist() == ["s1", "s10", "s2", "s3"]
+    for i, station in enumerate(fit.stations):
+        rows = station_ids == station
+        coefficients, bias = _lstsq(X[rows], y[rows])
+        np.testing.assert_allclose(fit.coefficients[i], coefficients, rtol=1e-6, atol=1e-8)
+        np.testing.assert_allclose(fit.bias[i], bias, rtol=1e-6, atol=1e-6)
+        assert fit.n_samples[i] == rows.sum()
+
+
+def test_recovers_exact_linear_target():
+    rng = np.random.default_rng(1)
+    X = rng.normal(size=(300, 3))
+    station_ids = np.repeat(["a", "b", "c"], 100)
+    weights = {"a": [1.0, -2.0, 0.5], "b": [0.0, 3.0, 1.0], "c": [-1.0, 0.0, 2.0]}
+    biases = {"a": 4.0, "b": -1.0, "c": 0.0}
+    y = np.array([X[i] @ weights[s] + biases[s] for i, s in enumerate(station_ids)])
+
+    fit = fit_stations(X, y, station_ids)
+
+    for i, station in enumerate(fit.stations):
+        np.testing.assert_allclose(fit.coefficients[i], weights[station], atol=1e-8)
+        assert fit.bias[i] == pytest.approx(biases[station], abs=1e-8)
+    codes = np.searchsorted(fit.stations, station_ids)
+    np.testing.assert_allclose(fit.predict(X, codes), y, atol=1e-8)
+
+
+def test_constant_feature_stays_solvable():
+    rng = np.random.default_rng(2)
+    X = rng.normal(size=(50, 2))
+    X[:, 1] = 7.0
+    y = 2 * X[:, 0] + 1
+
+    fit = fit_stations(X, y, np.full(50, "s"))
+
+    assert np.all(np.isfinite(fit.coefficients))
+    np.testing.assert_allclose(fit.predict(X, np.zeros(50, dtype=int)), y, atol=1e-6)
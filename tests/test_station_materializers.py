@@ -0,0 +1,91 @@
+"""Round trips of the station artifacts through their ZenML materializers."""
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("zenml")
+
+from materializers import StationFramesMaterializer, StationModelsMaterializer
+from utils.linear import MockModel
+from utils.station_artifacts import StationFrames, StationModels
+
+
+class LocalFiles:
+    """The part of an artifact store the materializers use, on a local directory."""
+
+    def open(self, path, mode="r"):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        return open(path, mode)
+
+
+def _round_trip(materializer_cls, data, uri):
+    materializer_cls(str(uri), artifact_store=LocalFiles()).save(data)
+    return materializer_cls(str(uri), artifact_store=LocalFiles()).load(type(data))
+
+
+def test_station_frames_round_trip(tmp_path):
+    rng = np.random.default_rng(0)
+    frames = {
+        # Station ids need not be valid file names
+        station: pd.DataFrame(
+            {
+                "humidity": rng.normal(65, 10, n),
+                "pressure": rng.normal(1013, 5, n),
+                "station_id": station,
+            },
+            index=np.arange(n) + 100,
+        )
+        for station, n in (("s1", 5), ("s/2", 3), ("s 3", 0))
+    }
+
+    loaded = _round_trip(StationFramesMaterializer, StationFrames(frames), tmp_path)
+
+    assert list(loaded) == list(frames)
+    assert "s/2" in loaded and "s4" not in loaded
+    for station, frame in frames.items():
+        pd.testing.assert_frame_equal(loaded[station], frame.reset_index(drop=True))
+    with pytest.raises(KeyError):
+        loaded["s4"]
+
+
+def test_station_frames_load_lazily(tmp_path):
+    frames = {f"s{i}": pd.DataFrame({"x": [float(i)]}) for i in range(3)}
+    StationFramesMaterializer(str(tmp_path), artifact_store=LocalFiles()).save(StationFrames(frames))
+    os.remove(tmp_path / "station-2.arrow")
+
+    loaded = StationFramesMaterializer(str(tmp_path), artifact_store=LocalFiles()).load(StationFrames)
+
+    assert len(loaded) == 3
+    assert loaded["s0"]["x"].tolist() == [0.0]
+    with pytest.raises(FileNotFoundError):
+        loaded["s2"]
+
+
+def test_station_models_round_trip(tmp_path):
+    rng = np.random.default_rng(0)
+    models = StationModels(
+        (
+            station,
+            MockModel(station, {"optimizer": "adam", "batch_size": 64}, rng.normal(size=4), rng.normal()),
+        )
+        for station in ("s1", "s2", "s3")
+    )
+
+    loaded = _round_trip(StationModelsMaterializer, models, tmp_path)
+
+    assert list(loaded) == list(models)
+    X = rng.normal(size=(10, 4))
+    for station, model in models.items():
+        assert loaded[station].station_id == station
+        assert loaded[station].model_params == model.model_params
+        np.testing.assert_array_equal(loaded[station].coefficients, model.coefficients)
+        assert loaded[station].bias == model.bias
+        np.testing.assert_array_equal(loaded[station].predict(X), model.predict(X))
+
+
+def test_station_models_round_trip_empty(tmp_path):
+    loaded = _round_trip(StationModelsMaterializer, StationModels(), tmp_path)
+
+    assert len(loaded) == 0
@@ -0,0 +1,132 @@
+"""Versioned appends to the station store and reads across versions."""
+import os
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from utils.station_store import (
+    StoreManifest,
+    append_to_store,
+    normalize_chunk,
+    prune_staging,
+    publish_staged,
+    read_store,
+    staging_dir,
+)
+
+
+def _chunk(station, start, hours, temperature):
+    return normalize_chunk(
+        pd.DataFrame(
+            {
+                "timestamp": pd.date_range(start, periods=hours, freq="h", tz="UTC"),
+                "station_id": station,
+                "temperature": temperature,
+                "humidity": 60.0,
+            }
+        ),
+        station,
+    )
+
+
+def _load(storage, manifest, chunks, backfill=False):
+    version = manifest.allocate()
+    rows = {}
+    for chunk in chunks:
+        station = chunk["station_id"].iloc[0]
+        rows[station] = rows.get(station, 0) + append_to_store(chunk, storage, version)
+    dates = sorted({d for c in chunks for d in c["timestamp"].dt.strftime("%Y-%m-%d")})
+    manifest.commit(version, rows, dates[0], dates[-1], backfill=backfill)
+    return version
+
+
+def test_rows_loaded_twice_are_read_once_in_their_latest_version(tmp_path):
+    storage = str(tmp_path)
+    manifest = StoreManifest(storage)
+    v1 = _load(storage, manifest, [_chunk("a", "2026-10-01", 48, 1.0), _chunk("b", "2026-10-01", 24, 1.0)])
+    # A backfill of the second day of "a" with corrected readings
+    v2 = _load(storage, manifest, [_chunk("a", "2026-10-02", 24, 2.0)], backfill=True)
+    # An interrupted load appended the same rows again under a later version
+    v3 = _load(storage, StoreManifest(storage), [_chunk("b", "2026-10-01", 24, 1.0)])
+
+    frame = read_store(storage)
+
+    assert v1 < v2 < v3
+    assert len(frame) == 72
+    assert not frame.duplicated(["station_id", "timestamp"]).any()
+    a = frame[frame["station_id"] == "a"].set_index("timestamp")["temperature"]
+    assert (a[:"2026-10-01 23:00"] == 1.0).all() and (a["2026-10-02":] == 2.0).all()
+
+    since = read_store(storage, since_version=v1)
+    assert len(since) == 48
+    assert read_store(storage, since_version=-1)["station_id"].unique().tolist() == ["b"]
+    assert len(read_store(storage, stations=["a"])) == 48
+
+
+def test_versions_are_never_reused(tmp_path):
+    storage = str(tmp_path)
+    first = StoreManifest(storage).allocate()
+    # Nothing was committed for the first version, e.g. a failed load
+    second = StoreManifest(storage).allocate()
+    _load(storage, StoreManifest(storage), [_chunk("a", "2026-10-01", 3, 1.0)])
+
+    assert first < second < StoreManifest(storage).latest_version
+
+
+def test_rows_from_before_the_manifest_are_version_0(tmp_path):
+    storage = str(tmp_path)
+    legacy = _chunk("a", "2026-10-01", 24, 0.0).drop(columns="station_id")
+    directory = os.path.join(storage, "station_id=a", "date=2026-10-01")
+    os.makedirs(directory)
+    pq.write_table(pa.Table.from_pandas(legacy, preserve_index=False), os.path.join(directory, "old.parquet"))
+
+    assert len(read_store(storage)) == 24
+
+    _load(storage, StoreManifest(storage), [_chunk("a", "2026-10-01", 12, 5.0)])
+    frame = read_store(storage)
+
+    assert len(frame) == 24
+    np.testing.assert_array_equal(frame.sort_values("timestamp")["temperature"], [5.0] * 12 + [0.0] * 12)
+
+
+def test_staged_rows_are_invisible_until_published(tmp_path):
+    storage = str(tmp_path)
+    manifest = StoreManifest(storage)
+    _load(storage, manifest, [_chunk("a", "2026-10-01", 2, 1.0)])
+    version = manifest.allocate()
+    staged = staging_dir(storage, version, "b")
+    append_to_store(_chunk("b", "2026-10-01", 5, 1.0), staged, version)
+
+    assert read_store(storage)["station_id"].unique().tolist() == ["a"]
+
+    assert publish_staged(staged, storage) == 1
+    assert not os.path.exists(staged)
+    manifest.commit(version, {"b": 5}, "2026-10-01", "2026-10-01")
+    assert len(read_store(storage, since_version=-1)) == 5
+
+
+def test_only_staged_chunks_of_dead_loads_are_pruned(tmp_path):
+    storage = str(tmp_path)
+    staged = {}
+    for version in (1, 2, 3, 5):
+        staged[version] = staging_dir(storage, version, "a")
+        append_to_store(_chunk("a", "2026-10-01", 2, 1.0), staged[version], version)
+    # A staging directory of the layout before per-version directories
+    legacy = os.path.join(storage, "_staging", "v0-a")
+    os.makedirs(legacy)
+    an_hour_ago = time.time() - 3600
+    for path in (legacy, *(staging_dir(storage, version) for version in (1, 2, 5))):
+        for directory, _, files in os.walk(path):
+            for name in [".", *files]:
+                os.utime(os.path.join(directory, name), (an_hour_ago, an_hour_ago))
+
+    # 2 was committed, 3 is still being written to, 5 is this load's
+    pruned = prune_staging(storage, committed={2}, before_version=5, stale_seconds=60)
+
+    assert pruned == [0, 1]
+    assert sorted(os.listdir(os.path.join(storage, "_staging"))) == ["v2", "v3", "v5"]
+    assert staging_dir(storage, 5) == os.path.dirname(staged[5])
+    assert prune_staging(str(tmp_path / "missing"), set(), 1) == []
@@ -0,0 +1,87 @@
+"""Cache keys of the step cache and the validation of its entries."""
+import os
+
+import numpy as np
+import pytest
+
+from utils.step_cache import StepCache, array_digest, file_signature, fingerprint
+
+
+def test_fingerprint_ignores_dict_order_only():
+    assert fingerprint({"a": 1, "b": [1, 2]}, "s1") == fingerprint({"b": [1, 2], "a": 1}, "s1")
+    assert fingerprint({"a": 1}, "s1") != fingerprint({"a": 1}, "s2")
+    assert fingerprint({"a": 1}) != fingerprint({"a": 1.5})
+
+
+def test_array_digest_covers_contents_dtype_and_shape():
+    X = np.arange(6, dtype=np.float64)
+
+    assert array_digest(X) == array_digest(X.copy())
+    assert array_digest(X) != array_digest(X.astype(np.float32))
+    assert array_digest(X) != array_digest(X.reshape(2, 3))
+    # A non-contiguous slice is hashed by value
+    assert array_digest(X.reshape(3, 2)[:, 0]) == array_digest(np.array([0.0, 2.0, 4.0]))
+
+
+@pytest.mark.parametrize("checksum", ["stat", "sha256"])
+def test_file_signature_changes_with_the_file(tmp_path, checksum):
+    path = tmp_path / "source.csv"
+    path.write_text("a,b\n1,2\n")
+    before = file_signature(str(path), checksum)
+
+    path.write_text("a,b\n1,2\n3,4\n")
+
+    assert file_signature(str(path), checksum) != before
+
+
+def test_hits_report_the_saved_seconds(tmp_path):
+    cache = StepCache(str(tmp_path), "step")
+    cache.put("k", {"version": 3}, seconds=2.5)
+
+    assert cache.get("k") == {"version": 3}
+    assert cache.get("other") is None
+    assert (cache.hits, cache.misses, cache.saved_seconds) == (1, 1, 2.5)
+
+
+def test_invalid_and_corrupt_entries_miss(tmp_path):
+    cache = StepCache(str(tmp_path), "step")
+    cache.put("k", {"version": 3}, seconds=1.0)
+    with open(os.path.join(cache.directory, "corrupt.json"), "w") as f:
+        f.write("{")
+
+    assert cache.get("k", valid=lambda payload: payload["version"] == 4) is None
+    assert cache.get("corrupt") is None
+    assert cache.misses == 2
+
+
+def test_disabled_cache_stores_nothing(tmp_path):
+    cache = StepCache(str(tmp_path), "step", enabled=False)
+    cache.put("k", {"version": 3}, seconds=1.0)
+
+    assert cache.get("k") is None
+    assert cache.get_many({"s1": "k"}) == {}
+    assert not os.path.exists(cache.directory)
+
+
+def test_get_many_validates_all_entries_in_one_call(tmp_path):
+    cache = StepCache(str(tmp_path), "train_models")
+    for station in ("s1", "s2", "s3"):
+        cache.put(f"key-{station}", {"run_id": f"run-{station}"}, seconds=1.0)
+    calls = []
+
+    def _registered(payloads):
+        calls.append(payloads)
+        return {s for s, p in payloads.items() if p["run_id"] != "run-s2"}
+
+    hits = cache.get_many({s: f"key-{s}" for s in ("s1", "s2", "s3", "s4")}, valid=_registered)
+
+    assert hits == {"s1": {"run_id": "run-s1"}, "s3": {"run_id": "run-s3"}}
+    assert calls == [{s: {"run_id": f"run-{s}"} for s in ("s1", "s2", "s3")}]
+    assert (cache.hits, cache.misses, cache.saved_seconds) == (2, 2, 2.0)
+
+
+def test_get_many_skips_validation_without_entries(tmp_path):
+    cache = StepCache(str(tmp_path), "train_models")
+
+    assert cache.get_many({"s1": "missing"}, valid=lambda payloads: 1 / 0) == {}
+    assert cache.misses == 1
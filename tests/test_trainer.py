@@ -0,0 +1,172 @@
+"""Per-station training runs, logged to a file-backed MLflow tracking store."""
+import os
+import threading
+
+import mlflow
+import mlflow.pyfunc
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("zenml")
+os.environ.setdefault("ENV", "dev")
+os.environ.setdefault("STACK", "local")
+
+from mlflow.store.artifact.local_artifact_repo import LocalArtifactRepository
+from mlflow.store.tracking.file_store import FileStore
+from mlflow.tracking import MlflowClient
+
+from config import TrainingPipelineConfig
+from steps import trainer
+from steps.trainer import station_seed, train_models, train_station
+from utils.training_store import write_training_data
+
+FEATURES = ["temperature", "humidity"]
+STATIONS = ["s1", "s2", "s3"]
+
+
+@pytest.fixture
+def tracking_uri(tmp_path):
+    previous = mlflow.get_tracking_uri()
+    uri = (tmp_path / "mlruns").as_uri()
+    mlflow.set_tracking_uri(uri)
+    yield uri
+    mlflow.set_tracking_uri(previous)
+
+
+@pytest.fixture
+def training_data(tmp_path):
+    rng = np.random.default_rng(1)
+    frames = []
+    for i, station in enumerate(STATIONS):
+        X = rng.normal(size=(40, len(FEATURES)))
+        frame = pd.DataFrame(X, columns=FEATURES)
+        frame["target"] = X @ np.array([1.0 + i, -1.0]) + i + rng.normal(0, 0.1, len(X))
+        frames.append((station, frame))
+    return write_training_data(frames, str(tmp_path / "training_data"), [*FEATURES, "target"])
+
+
+def _train(training_data, **config):
+    config = TrainingPipelineConfig(feature_columns=FEATURES, **config)
+    with mlflow.start_run():
+        return train_models.entrypoint(training_data, config)
+
+
+def _failing_station(*failing):
+    def _train_station(station, *args, **kwargs):
+        if station in failing:
+            raise RuntimeError(f"no model for {station}")
+        return train_station(station, *args, **kwargs)
+
+    return _train_station
+
+
+@pytest.fixture
+def no_wait(monkeypatch):
+    # The mock training time
+    monkeypatch.setattr(trainer.time, "sleep", lambda seconds: None)
+
+
+def test_station_seeds_are_stable_and_distinct():
+    assert station_seed(42, "s1") == station_seed(42, "s1")
+    assert len({station_seed(42, s) for s in STATIONS} | {station_seed(43, "s1")}) == 4
+
+
+def test_models_do_not_depend_on_the_training_pool(tracking_uri, training_data, no_wait):
+    results = {
+        (executor, workers): _train(
+            training_data, training_executor=executor, training_workers=workers
+        )
+        for executor in ("thread", "process")
+        for workers in (1, 4)
+    }
+
+    expected_models, expected_holdout = results["thread", 1]
+    assert list(expected_models) == STATIONS
+    for models, holdout in results.values():
+        assert list(models) == STATIONS
+        for station, model in models.items():
+            np.testing.assert_array_equal(model.coefficients, expected_models[station].coefficients)
+            assert model.bias == expected_models[station].bias
+            assert model.model_params == expected_models[station].model_params
+            pd.testing.assert_frame_equal(holdout[station], expected_holdout[station])
+    # Every pool logged one run per station
+    runs = mlflow.search_runs(search_all_experiments=True, filter_string="tags.mlflow.parentRunId != ''")
+    assert len(runs) == 4 * len(STATIONS)
+
+
+def test_a_failed_station_is_skipped(tracking_uri, training_data, no_wait, monkeypatch):
+    monkeypatch.setattr(trainer, "train_station", _failing_station("s2"))
+
+    models, holdout = _train(training_data, training_workers=2)
+
+    assert list(models) == ["s1", "s3"]
+    assert sorted(holdout) == ["s1", "s3"]
+
+
+def test_the_step_fails_only_when_every_station_fails(tracking_uri, training_data, no_wait, monkeypatch):
+    monkeypatch.setattr(trainer, "train_station", _failing_station(*STATIONS))
+
+    with pytest.raises(RuntimeError, match="Training failed for all stations"):
+        _train(training_data, training_workers=2)
+
+
+def _count_calls(monkeypatch, cls, calls):
+    """Record the public methods of ``cls`` called from outside the class."""
+    depth = threading.local()
+
+    def _counted(name, fn):
+        def call(*args, **kwargs):
+            outer = getattr(depth, "calls", 0)
+            if not outer:
+                calls.append(name)
+            depth.calls = outer + 1
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                depth.calls = outer
+
+        return call
+
+    for name in dir(cls):
+        fn = getattr(cls, name)
+        if not name.startswith("_") and callable(fn) and not isinstance(fn, type):
+            monkeypatch.setattr(cls, name, _counted(name, fn))
+
+
+def test_a_station_run_takes_five_store_calls_and_its_model_loads(tracking_uri, monkeypatch):
+    client = MlflowClient(tracking_uri)
+    experiment_id = client.create_experiment("training")
+    parent = client.create_run(experiment_id)
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(50, 3))
+    coefficients = np.array([1.0, -2.0, 0.5])
+    y = X @ coefficients + 3.0
+    store_calls, artifact_calls = [], []
+    _count_calls(monkeypatch, FileStore, store_calls)
+    _count_calls(monkeypatch, LocalArtifactRepository, artifact_calls)
+
+    model, run_id = train_station(
+        "s1", X, y, coefficients, 3.0, 42, parent.info.run_id, experiment_id, tracking_uri
+    )
+
+    # Flushing asynchronous logging is a no-op without it, not a round trip
+    assert [c for c in store_calls if c != "shut_down_async_logging"] == [
+        "create_run",
+        "log_batch",
+        "get_run",
+        "update_run_info",
+    ]
+    # The weights are copied into the model locally, the model is uploaded once
+    assert [c for c in artifact_calls if c.startswith("log_")] == ["log_artifacts"]
+    monkeypatch.undo()
+
+    run = client.get_run(run_id)
+    assert run.info.status == "FINISHED" and run.info.run_name == "s1"
+    assert run.data.tags["mlflow.parentRunId"] == parent.info.run_id
+    assert run.data.params["station_id"] == "s1"
+    assert run.data.metrics["train_loss"] == pytest.approx(0.0, abs=1e-20)
+    # Loading runs MockPyFuncWrapper.load_context on the shipped weights
+    loaded = mlflow.pyfunc.load_model(f"runs:/{run_id}/model")
+    np.testing.assert_allclose(loaded.predict(X), model.predict(X))
+    np.testing.assert_allclose(loaded.predict(X), y)
@@ -0,0 +1,90 @@
+"""Training data handed between steps as a memory-mapped Arrow file."""
+import os
+import socket
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.training_store import (
+    column_matrix,
+    open_training_data,
+    prune_training_data,
+    write_training_data,
+)
+
+COLUMNS = ["temperature", "target"]
+
+
+def _frames(counts):
+    rng = np.random.default_rng(0)
+    return [
+        (station, pd.DataFrame(rng.normal(size=(n, len(COLUMNS))), columns=COLUMNS).assign(extra=1))
+        for station, n in counts.items()
+    ]
+
+
+def test_stations_round_trip_in_their_own_batches(tmp_path):
+    frames = _frames({"s1": 5, "s2": 12, "s3": 3})
+
+    handle = write_training_data(frames, str(tmp_path), COLUMNS, max_batch_rows=5)
+
+    assert handle.stations == ["s1", "s2", "s3"]
+    assert handle.counts == [5, 12, 3] and handle.num_rows == 20
+    # s2 is split across three batches
+    assert handle.batches == [[0], [1, 2, 3], [4]]
+    table = open_training_data(handle)
+    assert table.column_names == COLUMNS
+    expected = pd.concat([frame[COLUMNS] for _, frame in frames], ignore_index=True)
+    np.testing.assert_array_equal(column_matrix(table, COLUMNS), expected.to_numpy())
+    assert list(handle.station_ids()) == ["s1"] * 5 + ["s2"] * 12 + ["s3"] * 3
+
+
+def test_a_subset_of_stations_and_columns_is_read(tmp_path):
+    frames = dict(_frames({"s1": 5, "s2": 12, "s3": 3}))
+    handle = write_training_data(frames.items(), str(tmp_path), COLUMNS, max_batch_rows=5)
+
+    table = open_training_data(handle, columns=["target"], stations=["s3", "s2"])
+
+    assert table.column_names == ["target"]
+    expected = np.concatenate([frames["s2"]["target"], frames["s3"]["target"]])
+    np.testing.assert_array_equal(column_matrix(table, ["target"])[:, 0], expected)
+    assert list(handle.station_ids(["s3", "s2"])) == ["s2"] * 12 + ["s3"] * 3
+
+
+def test_no_stations_write_an_empty_file(tmp_path):
+    handle = write_training_data([], str(tmp_path), COLUMNS)
+
+    assert handle.num_rows == 0
+    assert open_training_data(handle).num_rows == 0
+
+
+def test_pruning_keeps_recent_and_kept_files(tmp_path):
+    directory = str(tmp_path)
+    old, kept, recent = (
+        write_training_data(_frames({"s1": 2}), directory, COLUMNS).path for _ in range(3)
+    )
+    other = tmp_path / "notes.txt"
+    other.write_text("not training data")
+    two_days_ago = time.time() - 2 * 86400
+    for path in (old, kept, str(other)):
+        os.utime(path, (two_days_ago, two_days_ago))
+
+    assert prune_training_data(directory, keep_days=1, keep=[kept]) == 1
+
+    assert not os.path.exists(old)
+    assert os.path.exists(kept) and os.path.exists(recent) and other.exists()
+    assert prune_training_data(str(tmp_path / "missing"), keep_days=1) == 0
+
+
+def test_a_missing_file_names_both_hosts(tmp_path):
+    handle = write_training_data(_frames({"s1": 2}), str(tmp_path), COLUMNS)
+    os.remove(handle.path)
+    handle = handle.model_copy(update={"host": "trainer-1"})
+
+    with pytest.raises(FileNotFoundError) as error:
+        open_training_data(handle)
+
+    assert "written on trainer-1" in str(error.value)
+    assert f"this host ({socket.gethostname()})" in str(error.value)
@@ -0,0 +1,185 @@
+"""Retries of registry calls, idempotent registration and the child run lookup."""
+import os
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("zenml")
+os.environ.setdefault("ENV", "dev")
+os.environ.setdefault("STACK", "local")
+
+from mlflow.exceptions import MlflowException, RestException
+from mlflow.protos.databricks_pb2 import REQUEST_LIMIT_EXCEEDED
+from mlflow.store.entities.paged_list import PagedList
+
+from steps import validate_and_deploy
+from steps.validate_and_deploy import (
+    get_child_runs_by_name,
+    is_transient,
+    register_challenger,
+    with_retry,
+)
+
+
+def _server_error(error_code="INTERNAL_ERROR"):
+    return RestException({"error_code": error_code, "message": "registry unavailable"})
+
+
+def _flaky(*errors):
+    calls = []
+
+    def fn():
+        calls.append(1)
+        if len(calls) <= len(errors):
+            raise errors[len(calls) - 1]
+        return "ok"
+
+    return fn, calls
+
+
+def _run(run_id, run_name="", start_time=0, experiment_id="1"):
+    return SimpleNamespace(
+        info=SimpleNamespace(
+            run_id=run_id, run_name=run_name, start_time=start_time, experiment_id=experiment_id
+        )
+    )
+
+
+@pytest.mark.parametrize(
+    "error, transient",
+    [
+        (_server_error(), True),
+        (_server_error("TEMPORARILY_UNAVAILABLE"), True),
+        (MlflowException("rate limited", error_code=REQUEST_LIMIT_EXCEEDED), True),
+        (ConnectionError("connection refused"), True),
+        # A client-side failure defaults to INTERNAL_ERROR too
+        (MlflowException("bad model uri"), False),
+        (_server_error("RESOURCE_DOES_NOT_EXIST"), False),
+        (ValueError("bad value"), False),
+    ],
+)
+def test_only_server_and_connection_failures_are_transient(error, transient):
+    assert is_transient(error) is transient
+
+
+def test_transient_errors_are_retried():
+    fn, calls = _flaky(_server_error())
+
+    assert with_retry(fn, retries=3, backoff=0) == "ok"
+    assert len(calls) == 2
+
+
+def test_other_errors_are_raised_on_the_first_attempt():
+    fn, calls = _flaky(MlflowException("bad model uri"))
+
+    with pytest.raises(MlflowException, match="bad model uri"):
+        with_retry(fn, retries=3, backoff=0)
+    assert len(calls) == 1
+
+
+def test_retries_give_up_with_the_last_error():
+    fn, calls = _flaky(*[_server_error()] * 3)
+
+    with pytest.raises(RestException):
+        with_retry(fn, retries=2, backoff=0)
+    assert len(calls) == 3
+
+
+class Registry:
+    """The model registry part of an MlflowClient, in memory."""
+
+    def __init__(self):
+        self.versions = []
+        self.aliases = {}
+        self.searches = 0
+
+    def create(self, name, run_id):
+        version = SimpleNamespace(name=name, run_id=run_id, version=str(len(self.versions) + 1))
+        self.versions.append(version)
+        return version
+
+    def search_model_versions(self, filter_string):
+        self.searches += 1
+        return [v for v in self.versions if f"'{v.name}'" in filter_string and f"'{v.run_id}'" in filter_string]
+
+    def set_registered_model_alias(self, name, version, alias):
+        self.aliases[(name, alias)] = version
+
+
+def test_a_registration_that_timed_out_is_not_repeated(monkeypatch):
+    registry = Registry()
+    calls = []
+
+    def register_model(model_uri, name):
+        calls.append(model_uri)
+        version = registry.create(name, model_uri.split("/")[1])
+        if len(calls) == 1:
+            # The version was created, but the response never arrived
+            raise _server_error("TEMPORARILY_UNAVAILABLE")
+        return version
+
+    monkeypatch.setattr(validate_and_deploy.mlflow, "register_model", register_model)
+
+    version = register_challenger(registry, "s1", _run("r1"), retries=3, backoff=0)
+
+    assert version == "1"
+    assert len(calls) == 1 and len(registry.versions) == 1
+    assert registry.aliases == {("s1", "challenger"): "1"}
+
+
+def test_a_registration_that_failed_before_creating_a_version_is_repeated(monkeypatch):
+    registry = Registry()
+    calls = []
+
+    def register_model(model_uri, name):
+        calls.append(model_uri)
+        if len(calls) == 1:
+            raise ConnectionError("connection refused")
+        return registry.create(name, model_uri.split("/")[1])
+
+    monkeypatch.setattr(validate_and_deploy.mlflow, "register_model", register_model)
+
+    assert register_challenger(registry, "s1", _run("r1"), retries=3, backoff=0) == "1"
+    assert len(calls) == 2 and len(registry.versions) == 1
+    # The first attempt registers without looking for an existing version
+    assert registry.searches == 1
+
+
+class Runs:
+    """Child runs of a parent, returned in pages of ``page_size``."""
+
+    def __init__(self, runs, page_size):
+        self.runs = sorted(runs, key=lambda run: run.info.start_time)
+        self.page_size = page_size
+        self.filters = []
+
+    def get_run(self, run_id):
+        return _run(run_id, experiment_id="7")
+
+    def search_runs(self, experiment_ids, filter_string, max_results, order_by, page_token):
+        assert experiment_ids == ["7"]
+        self.filters.append(filter_string)
+        start = int(page_token or 0)
+        end = start + self.page_size
+        token = str(end) if end < len(self.runs) else None
+        return PagedList(self.runs[start:end], token)
+
+
+def test_child_runs_are_collected_over_all_pages():
+    runs = [_run(f"r{i}", f"s{i}", start_time=i) for i in range(5)]
+    client = Runs(runs, page_size=2)
+
+    found = get_child_runs_by_name(client, "parent")
+
+    assert {name: run.info.run_id for name, run in found.items()} == {f"s{i}": f"r{i}" for i in range(5)}
+    assert client.filters == ["tags.mlflow.parentRunId = 'parent'"] * 3
+
+
+def test_the_latest_run_of_a_station_wins():
+    # A retried station logs a second run with the same name, on a later page
+    runs = [_run("old", "s1", start_time=1), _run("r2", "s2", start_time=2), _run("new", "s1", start_time=3)]
+
+    found = get_child_runs_by_name(Runs(runs, page_size=2), "parent")
+
+    assert found["s1"].info.run_id == "new"
+    assert found["s2"].info.run_id == "r2"